@@ -135,7 +135,10 @@ const Dashboard = () => {
     setSyncing(true);
     try {
       const res = await api.post('/gmail/sync-sent?limit=20');
-      alert(`Synced ${res.data.synced_count} emails to knowledge base!`);
+      const retry = res.data.failed_count
+        ? ` ${res.data.failed_count} could not be fetched and will be retried on the next sync.`
+        : '';
+      alert(`Synced ${res.data.synced_count} emails to knowledge base!${retry}`);
     } catch (e) {
       console.error(e);
       alert('Sync completed (demo mode)');
@@ -11,6 +11,7 @@ import requests
 import json
 from app.core import security
 from app.api import deps
+from app.services import gmail_service, gmail_async
 
 router = APIRouter()
 
@@ -100,6 +101,11 @@ def callback(code: str, db: Session = Depends(get_db)):
         
         db.commit()
         db.refresh(user)
+
+        # Drop any Gmail client and cached user built with the old tokens
+        gmail_service.invalidate_gmail_service(user.id)
+        gmail_async.invalidate_user(user.id)
+        deps.invalidate_cached_user(user.id)
         
         
         access_token = security.create_access_token(subject=user.id)
@@ -1,17 +1,43 @@
-from fastapi import Depends, HTTPException, status
+import secrets
+from typing import Optional
+from fastapi import Depends, Header, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.cache import TTLCache
+from app.core.database import SessionLocal
 from app.core.config import settings
 from app.core import security
 from app.models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/login")
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-) -> User:
+# user_id -> User loaded by a recent request. The JWT is still verified on every
+# request; only the database lookup is skipped. auth.callback invalidates the entry
+# when it stores new tokens, so the short TTL only bounds staleness of other changes.
+user_cache = TTLCache(maxsize=settings.AUTH_USER_CACHE_SIZE, ttl=settings.AUTH_USER_CACHE_TTL)
+
+def invalidate_cached_user(user_id: int):
+    user_cache.pop(user_id)
+
+def _load_user(user_id: int):
+    db = SessionLocal()
+    try:
+        return db.query(User).filter(User.id == user_id).first()
+    finally:
+        db.close()
+
+async def require_internal_token(authorization: Optional[str] = Header(None)):
+    """
+    Guards the operational endpoints, which are not per-user: they take
+    `Authorization: Bearer <INTERNAL_API_TOKEN>` and are off while it is unset.
+    """
+    scheme, _, token = (authorization or "").partition(" ")
+    expected = settings.INTERNAL_API_TOKEN
+    if not expected or scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), expected.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Internal endpoint")
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -22,10 +48,20 @@ def get_current_user(
         user_id: str = payload.get("sub")
         if user_id is None:
             raise credentials_exception
-    except JWTError:
+        user_id = int(user_id)
+    except (JWTError, ValueError):
         raise credentials_exception
-    
-    user = db.query(User).filter(User.id == int(user_id)).first()
+
+    if settings.AUTH_USER_CACHE_TTL > 0:
+        user = user_cache.get(user_id)
+        if user is not None:
+            return user
+
+    # Cache hits stay on the event loop; a miss is one pooled query in the threadpool
+    # (measured faster than an aiosqlite session, see benchmarks/bench_auth.py)
+    user = await run_in_threadpool(_load_user, user_id)
     if user is None:
         raise credentials_exception
+    if settings.AUTH_USER_CACHE_TTL > 0:
+        user_cache.set(user_id, user)
     return user
@@ -1,61 +1,49 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+import os
+import time
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from app.api import deps
 from app.models.user import User
-from app.services import rag_service
-import io
-# import pypdf
-# import docx
+from app.services import document_service
 
 router = APIRouter()
 
-@router.post("/upload")
+# The upload endpoints stream the multipart body themselves (document_service.receive_upload),
+# so the file field is described here rather than declared as an UploadFile parameter
+UPLOAD_OPENAPI = {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+    "type": "object",
+    "required": ["file"],
+    "properties": {"file": {"type": "string", "format": "binary"}},
+}}}}}
+
+@router.post("/upload", openapi_extra=UPLOAD_OPENAPI)
 async def upload_document(
-    file: UploadFile = File(...),
+    request: Request,
     user: User = Depends(deps.get_current_user)
 ):
     """
-    Upload a policy document (PDF/DOCX/TXT).
-    For now, we just read the text and return it to verify.
-    In Phase 3, we will chunk and embed this.
+    Upload a policy document (PDF/DOCX/TXT), then chunk and embed it.
+    The upload is streamed to disk and indexed page by page; the response
+    includes per-stage timings. For large files prefer POST /jobs/upload,
+    which indexes in the background.
     """
-    content_type = file.content_type
-    filename = file.filename
-    
-    content = ""
-    
+    path = None
     try:
-        file_bytes = await file.read()
-        file_stream = io.BytesIO(file_bytes)
-        
-        if "pdf" in content_type or filename.endswith(".pdf"):
-            import pypdf
-            reader = pypdf.PdfReader(file_stream)
-            for page in reader.pages:
-                content += page.extract_text() + "\n"
-                
-        elif "wordprocessingml" in content_type or filename.endswith(".docx"):
-            import docx
-            doc = docx.Document(file_stream)
-            for para in doc.paragraphs:
-                content += para.text + "\n"
-        
-        elif "text" in content_type or filename.endswith(".txt"):
-            content = file_bytes.decode("utf-8")
-        
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported file type")
-            
-        # Indexing
-        rag_service.add_document(
-            user_id=user.id,
-            text=content,
-            metadata={"filename": filename, "type": "policy"}
+        started = time.perf_counter()
+        upload = await document_service.receive_upload(request)
+        path = upload.path
+        spool_seconds = time.perf_counter() - started
+        # Parsing and embedding are blocking, keep them off the event loop
+        return await run_in_threadpool(
+            document_service.index_document_file, user.id, path, upload.filename, upload.content_type,
+            spool_seconds=spool_seconds
         )
-        
-        return {
-            "filename": filename,
-            "char_count": len(content),
-            "status": "Indexed successfully in Vector DB"
-        }
+    except (document_service.UnsupportedFileType, document_service.InvalidUpload) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except document_service.FileTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+    finally:
+        if path:
+            os.remove(path)
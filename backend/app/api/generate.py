@@ -1,7 +1,17 @@
+import asyncio
+import json
+import time
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from app.api import deps
+from app.core import metrics
+from app.core.config import settings
 from app.models.user import User
-from app.services import rag_service, llm_service, cleaning_service
+from app.services import (
+    rag_service, llm_service, cleaning_service, context_service, response_cache, gmail_async, gmail_service
+)
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -15,19 +25,181 @@ def generate_reply_endpoint(
     user: User = Depends(deps.get_current_user)
 ):
     try:
-        # 1. Clean email
-        cleaned_text = cleaning_service.clean_email_body(request.email_text)
+        # 1. Clean email, 2. Retrieve and pack context, 3. Look for a cached draft
+        cleaned_text, documents, context_stats, lookup = _retrieve_context(user.id, request.email_text)
         
-        # 2. Retrieve Context
-        results = rag_service.query_similar(user.id, cleaned_text, n_results=3)
-        documents = results['documents'][0] if results['documents'] else []
-        
-        # 3. Generate with LLM
-        draft = llm_service.generate_draft(cleaned_text, documents)
+        # 4. Generate with LLM
+        cached = lookup is not None and lookup.hit
+        if cached:
+            draft = lookup.draft
+        else:
+            draft = llm_service.generate_draft(cleaned_text, documents)
+            response_cache.store_draft(user.id, lookup, draft)
         
         return {
             "draft": draft,
-            "context_used": documents
+            "context_used": documents,
+            "context_stats": context_stats,
+            "cached": cached
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _retrieve_context(user_id: int, email_text: str):
+    """
+    Cleans the email, retrieves similar chunks, packs them into the context token
+    budget and looks up a cached draft for the result.
+    Returns (cleaned_text, documents, context_stats, response cache lookup or None).
+    """
+    with metrics.span("generate.clean"):
+        cleaned_text = cleaning_service.clean_email_body(email_text)
+    with metrics.span("generate.retrieve"):
+        results = rag_service.query_similar(user_id, cleaned_text, n_results=settings.CONTEXT_N_RESULTS)
+    with metrics.span("generate.pack"):
+        documents, context_stats = context_service.pack_context(results)
+    with metrics.span("generate.cache_lookup"):
+        lookup = response_cache.lookup_draft(user_id, cleaned_text, documents)
+    return cleaned_text, documents, context_stats, lookup
+
+@router.post("/draft/stream")
+async def generate_reply_stream_endpoint(
+    request: GenerateRequest,
+    user: User = Depends(deps.get_current_user)
+):
+    """
+    Same as /draft, but streams the reply as server-sent events:
+    one `context` event, then `token` events as the LLM produces them,
+    then `done` (or `error`). A cached draft is sent as a single `token` event.
+    """
+    # Cleaning and retrieval are CPU/IO bound and synchronous, keep them off the event loop
+    try:
+        cleaned_text, documents, context_stats, lookup = await run_in_threadpool(
+            _retrieve_context, user.id, request.email_text
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
+
+    async def event_stream():
+        yield _sse("context", {"context_used": documents, "context_stats": context_stats})
+        if lookup is not None and lookup.hit:
+            yield _sse("token", {"token": lookup.draft})
+            yield _sse("done", {"cached": True})
+            return
+        tokens = []
+        try:
+            async for token in llm_service.stream_draft(cleaned_text, documents):
+                tokens.append(token)
+                yield _sse("token", {"token": token})
+        except Exception as e:
+            yield _sse("error", {"detail": f"Generation failed: {str(e)}"})
+            return
+        response_cache.store_draft(user.id, lookup, "".join(tokens))
+        yield _sse("done", {"cached": False})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+class BulkEmail(BaseModel):
+    id: Optional[str] = None
+    email_text: str
+
+class BulkGenerateRequest(BaseModel):
+    emails: list[BulkEmail] = []
+    message_ids: list[str] = []  # Gmail message ids, fetched and drafted like `emails`
+
+def _retrieve_contexts(user_id: int, email_texts: list[str]):
+    """
+    _retrieve_context for many emails: one cleaning pass, one embedding batch
+    and one multi-query Chroma call. Returns a (cleaned_text, documents, context_stats, lookup) per email.
+    """
+    with metrics.span("generate.clean"):
+        cleaned_texts = cleaning_service.clean_email_bodies(email_texts)
+    with metrics.span("generate.retrieve"):
+        results = rag_service.query_similar_many(user_id, cleaned_texts, n_results=settings.CONTEXT_N_RESULTS)
+    contexts = []
+    for cleaned_text, result in zip(cleaned_texts, results):
+        with metrics.span("generate.pack"):
+            documents, context_stats = context_service.pack_context(result)
+        with metrics.span("generate.cache_lookup"):
+            lookup = response_cache.lookup_draft(user_id, cleaned_text, documents)
+        contexts.append((cleaned_text, documents, context_stats, lookup))
+    return contexts
+
+@router.post("/draft/bulk")
+async def generate_bulk_drafts_endpoint(
+    request: BulkGenerateRequest,
+    user: User = Depends(deps.get_current_user)
+):
+    """
+    Drafts replies for many emails in one request, streamed as server-sent events:
+    a `draft` (or `error`) event per email as soon as its draft is ready, in
+    completion order and tagged with the email's index and id, then `done`.
+    At most BULK_DRAFT_LLM_CONCURRENCY LLM calls run at once; emails with a
+    cached draft skip the LLM.
+    """
+    total = len(request.emails) + len(request.message_ids)
+    if not total:
+        raise HTTPException(status_code=400, detail="No emails given")
+    if total > settings.BULK_DRAFT_MAX_EMAILS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BULK_DRAFT_MAX_EMAILS} emails per request")
+
+    started = time.perf_counter()
+    items = [(index, email.id, email.email_text) for index, email in enumerate(request.emails)]
+    not_found = []
+    try:
+        if request.message_ids:
+            messages = {m['id']: m for m in await gmail_async.get_messages(user, request.message_ids)}
+            for index, msg_id in enumerate(request.message_ids, start=len(request.emails)):
+                if msg_id in messages:
+                    items.append((index, msg_id, gmail_service.extract_email_body(messages[msg_id])))
+                else:
+                    not_found.append((index, msg_id))
+        contexts = await run_in_threadpool(_retrieve_contexts, user.id, [text for _, _, text in items])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
+
+    async def event_stream():
+        semaphore = asyncio.Semaphore(settings.BULK_DRAFT_LLM_CONCURRENCY)
+
+        async def draft_one(index, email_id, cleaned_text, documents, context_stats, lookup):
+            cached = lookup is not None and lookup.hit
+            if cached:
+                draft = lookup.draft
+            else:
+                async with semaphore:
+                    try:
+                        draft = await llm_service.agenerate_draft(cleaned_text, documents)
+                    except Exception as e:
+                        return "error", {"index": index, "id": email_id, "detail": f"Generation failed: {str(e)}"}
+                response_cache.store_draft(user.id, lookup, draft)
+            return "draft", {"index": index, "id": email_id, "draft": draft,
+                             "context_used": documents, "context_stats": context_stats, "cached": cached}
+
+        for index, msg_id in not_found:
+            yield _sse("error", {"index": index, "id": msg_id, "detail": "Message not found"})
+        tasks = [asyncio.ensure_future(draft_one(index, email_id, *context))
+                 for (index, email_id, _), context in zip(items, contexts)]
+        failed = len(not_found)
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                event, data = await next_done
+                failed += event == "error"
+                yield _sse(event, data)
+        finally:
+            # Client went away: stop the drafts still waiting for the LLM
+            for task in tasks:
+                task.cancel()
+        yield _sse("done", {"count": total, "failed": failed,
+                            "seconds": round(time.perf_counter() - started, 3)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
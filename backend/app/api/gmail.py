@@ -1,57 +1,62 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from app.api import deps
+from app.core.database import get_db
 from app.models.user import User
-from app.services import gmail_service, cleaning_service, rag_service
+from app.services import gmail_service, gmail_async, inbox_service, sync_service
 
 router = APIRouter()
 
 @router.get("/inbox")
-def get_inbox_emails(max_results: int = 10, user: User = Depends(deps.get_current_user)):
+async def get_inbox_emails(
+    request: Request,
+    response: Response,
+    max_results: int = 10,
+    page_token: Optional[str] = None,
+    user: User = Depends(deps.get_current_user)
+):
+    """
+    One inbox page (subject, sender, snippet), newest first.
+    The cursor of the next page is returned in the X-Next-Page-Token header; pass
+    it back as page_token. The ETag follows the user's mailbox historyId, so a
+    request with a matching If-None-Match gets 304 Not Modified. Responses are
+    marked private: shared caches must not serve one user's page to another.
+    """
     try:
-        service = gmail_service.get_gmail_service(user)
-        messages = gmail_service.list_emails(service, label_ids=['INBOX'], max_results=max_results)
-        
-        # Hydrate messages with snippet/subject for UI
-        email_list = []
-        for msg in messages:
-            details = gmail_service.get_email_details(service, msg['id'])
-            headers = details['payload']['headers']
-            subject = next((h['value'] for h in headers if h['name'] == 'Subject'), '(No Subject)')
-            sender = next((h['value'] for h in headers if h['name'] == 'From'), '(Unknown)')
-            
-            email_list.append({
-                "id": msg['id'],
-                "threadId": msg['threadId'],
-                "snippet": details.get('snippet', ''),
-                "subject": subject,
-                "sender": sender
-            })
-            
-        return email_list
+        history_id = await inbox_service.current_history_id(user)
+        etag = inbox_service.page_etag(user.id, history_id, max_results, page_token)
+        cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=cache_headers)
+
+        page = await inbox_service.get_inbox_page(user, max_results, page_token, history_id=history_id)
+        response.headers.update(cache_headers)
+        if page["next_page_token"]:
+            response.headers["X-Next-Page-Token"] = page["next_page_token"]
+        return page["emails"]
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error fetching emails: {str(e)}")
 
 @router.get("/sent")
-def get_sent_emails(max_results: int = 50, user: User = Depends(deps.get_current_user)):
+async def get_sent_emails(max_results: int = 50, user: User = Depends(deps.get_current_user)):
     # Used for training/ingestion
     try:
-        service = gmail_service.get_gmail_service(user)
-        messages = gmail_service.list_emails(service, label_ids=['SENT'], max_results=max_results)
+        listing = await gmail_async.list_messages(user, label_ids=['SENT'], max_results=max_results)
+        messages = listing.get('messages', [])
         # We might want the full body here later for RAG
         return messages
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error fetching sent emails: {str(e)}")
 
 @router.get("/email/{email_id}")
-def get_email_body(email_id: str, user: User = Depends(deps.get_current_user)):
+async def get_email_body(email_id: str, user: User = Depends(deps.get_current_user)):
     """
     Get the full body text of a specific email.
     This is used when generating replies to ensure we have the complete email content.
     """
     try:
-        service = gmail_service.get_gmail_service(user)
-        message = gmail_service.get_email_details(service, email_id)
+        message = await gmail_async.get_message(user, email_id)
         
         # Extract headers
         headers = message.get('payload', {}).get('headers', [])
@@ -79,10 +84,9 @@ class DraftRequest(BaseModel):
     body: str
 
 @router.post("/draft")
-def create_draft_endpoint(request: DraftRequest, user: User = Depends(deps.get_current_user)):
+async def create_draft_endpoint(request: DraftRequest, user: User = Depends(deps.get_current_user)):
     try:
-        service = gmail_service.get_gmail_service(user)
-        draft = gmail_service.create_draft(service, 'me', {
+        draft = await gmail_async.create_draft(user, {
             'recipient': request.recipient,
             'subject': request.subject,
             'body': request.body
@@ -92,64 +96,22 @@ def create_draft_endpoint(request: DraftRequest, user: User = Depends(deps.get_c
         raise HTTPException(status_code=500, detail=f"Failed to create draft: {str(e)}")
 
 @router.post("/sync-sent")
-def sync_sent_emails(limit: int = 20, user: User = Depends(deps.get_current_user)):
+def sync_sent_emails(
+    limit: int = 20,
+    full: bool = False,
+    user: User = Depends(deps.get_current_user),
+    db: Session = Depends(get_db)
+):
     """
     Fetches past sent emails, cleans them, and indexes them into the vector DB.
+    Incremental after the first sync; see sync_service.sync_sent_emails.
+    For large mailboxes prefer POST /jobs/sync-sent, which runs in the background.
+    409 if a sync (inline or a job) is already running for the user.
     """
     try:
-        service = gmail_service.get_gmail_service(user)
-        # 1. Fetch sent emails
-        messages = gmail_service.list_emails(service, label_ids=['SENT'], max_results=limit)
-        
-        count = 0
-        for msg in messages:
-            # 2. Get full content
-            full_msg = gmail_service.get_email_details(service, msg['id'])
-            
-            # Extract body
-            snippet = full_msg.get('snippet', '')
-            # payload.body.data is usually for text/plain parts
-            # This is simplified; real email parsing is complex (multipart etc)
-            # For know, let's use the snippet as a fallback if body parsing is hard, 
-            # but ideally we want the body. 
-            # Let's try to find text/plain part.
-            payload = full_msg['payload']
-            body_data = ""
-            
-            if 'parts' in payload:
-                for part in payload['parts']:
-                    if part['mimeType'] == 'text/plain':
-                        body_data = part['body'].get('data', '')
-                        break
-            else:
-                 body_data = payload['body'].get('data', '')
-                 
-            import base64
-            email_text = ""
-            if body_data:
-                try:
-                    email_text = base64.urlsafe_b64decode(body_data).decode('utf-8')
-                except:
-                    email_text = snippet
-            else:
-                email_text = snippet
-
-            # 3. Clean
-            cleaned_text = cleaning_service.clean_email_body(email_text)
-            
-            if len(cleaned_text) < 50: # Skip very short emails
-                continue
-                
-            # 4. Index
-            rag_service.add_document(
-                user_id=user.id,
-                text=cleaned_text,
-                metadata={"source": "sent_email", "email_id": msg['id']},
-                doc_id_prefix=f"email_{msg['id']}"
-            )
-            count += 1
-            
-        return {"status": "success", "synced_count": count}
-        
+        return sync_service.sync_sent_emails(db, user, limit=limit, full=full, wait=False)
+    except sync_service.SyncInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
+        db.rollback()
         raise HTTPException(status_code=500, detail=f"Sync failed: {str(e)}")
@@ -0,0 +1,81 @@
+import os
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.orm import Session
+from app.api import deps
+from app.api.documents import UPLOAD_OPENAPI
+from app.core.database import get_db
+from app.models.job import Job
+from app.models.user import User
+from app.services import document_service, job_service
+
+router = APIRouter()
+
+def _job_to_dict(job: Job) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "progress": job.progress or {},
+        "result": job.result,
+        "error": job.error,
+        "cancel_requested": job.cancel_requested,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at
+    }
+
+@router.post("/sync-sent", status_code=status.HTTP_202_ACCEPTED)
+def enqueue_sync_sent(
+    limit: int = 20,
+    full: bool = False,
+    user: User = Depends(deps.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Queues a sent-mail sync; poll GET /jobs/{id} for progress.
+    """
+    try:
+        job = job_service.enqueue_sync_sent(db, user, limit=limit, full=full)
+    except job_service.JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return _job_to_dict(job)
+
+@router.post("/upload", status_code=status.HTTP_202_ACCEPTED, openapi_extra=UPLOAD_OPENAPI)
+async def enqueue_upload(
+    request: Request,
+    user: User = Depends(deps.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Queues indexing of a policy document (PDF/DOCX/TXT); poll GET /jobs/{id} for progress.
+    """
+    try:
+        upload = await document_service.receive_upload(request)
+    except (document_service.UnsupportedFileType, document_service.InvalidUpload) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except document_service.FileTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    try:
+        job = job_service.enqueue_upload(db, user, upload.path, upload.filename, upload.content_type)
+    except job_service.JobQueueFull as e:
+        os.remove(upload.path)
+        raise HTTPException(status_code=429, detail=str(e))
+    return _job_to_dict(job)
+
+@router.get("")
+def list_jobs(limit: int = 20, user: User = Depends(deps.get_current_user), db: Session = Depends(get_db)):
+    return [_job_to_dict(job) for job in job_service.list_jobs(db, user.id, limit=limit)]
+
+@router.get("/{job_id}")
+def get_job(job_id: str, user: User = Depends(deps.get_current_user), db: Session = Depends(get_db)):
+    job = job_service.get_job(db, user.id, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_to_dict(job)
+
+@router.post("/{job_id}/cancel")
+def cancel_job(job_id: str, user: User = Depends(deps.get_current_user), db: Session = Depends(get_db)):
+    job = job_service.get_job(db, user.id, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_to_dict(job_service.cancel(db, job))
@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -8,15 +9,120 @@ class Settings(BaseSettings):
     
     # GROQ
     GROQ_API_KEY: str
+    GROQ_BASE_URL: Optional[str] = None  # None = Groq's public API
 
     # Google Auth
     GOOGLE_CLIENT_ID: str
     GOOGLE_CLIENT_SECRET: str
     GOOGLE_REDIRECT_URI: str = "https://hardikjain0083-email-rag.hf.space/api/v1/auth/callback"
     FRONTEND_URL: str = "https://email-rag-gilt.vercel.app"  # Frontend URL for OAuth callback
+    GOOGLE_TOKEN_URI: str = "https://oauth2.googleapis.com/token"
     
+    # Load the embedding model / Chroma / Groq clients in the background at startup
+    # instead of on the first request that needs them
+    WARMUP_ON_STARTUP: bool = False
+
+    # Bearer token for the operational endpoints (/warmup, /stats, /metrics); unset disables them
+    INTERNAL_API_TOKEN: Optional[str] = None
+
     # Database
     DATABASE_URL: str = "sqlite:///./autogmail.db"
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    SQLITE_WAL: bool = True
+    SQLITE_BUSY_TIMEOUT: float = 30.0  # seconds a writer waits for the database lock
+
+    # Authenticated users cached by get_current_user (0 disables the cache)
+    AUTH_USER_CACHE_TTL: int = 30  # seconds
+    AUTH_USER_CACHE_SIZE: int = 4096
+
+    # Async Gmail REST client (pooled httpx); base URLs are overridable for a local mock server
+    GMAIL_API_BASE_URL: str = "https://gmail.googleapis.com"
+    GMAIL_HTTP_MAX_CONNECTIONS: int = 100
+    GMAIL_HTTP_MAX_KEEPALIVE: int = 20
+    GMAIL_HTTP_TIMEOUT: float = 30.0  # seconds
+    GMAIL_MAX_CONCURRENT_PER_USER: int = 10  # in-flight Gmail calls per user
+    GMAIL_MAX_RETRIES: int = 5  # on 429 / rate-limit 403 / 5xx / network errors
+    GMAIL_BACKOFF_BASE: float = 0.5  # seconds, doubled per retry (plus jitter)
+    GMAIL_BACKOFF_MAX: float = 32.0
+
+    # Inbox pages cached per user, revalidated against the mailbox historyId
+    INBOX_CACHE_SIZE: int = 1024
+    INBOX_CACHE_TTL: int = 300  # seconds
+
+    # Gmail client cache
+    GMAIL_CLIENT_CACHE_SIZE: int = 256
+    GMAIL_CLIENT_CACHE_TTL: int = 1800  # seconds
+
+    # Vector store layout: "per_user" (one Chroma collection per user) or "shared"
+    # (all users in VECTOR_STORE_SHARDS collections, filtered by user_id metadata).
+    # Existing per-user data is moved with `python -m scripts.migrate_vector_store`.
+    VECTOR_STORE_LAYOUT: str = "per_user"
+    VECTOR_STORE_SHARDS: int = 16
+
+    # Small tenants in a local index (memory-mapped float16 matrix, exact top-k) instead of
+    # Chroma; a tenant moves to Chroma once it holds more than LOCAL_INDEX_MAX_CHUNKS chunks
+    LOCAL_INDEX_ENABLED: bool = False
+    LOCAL_INDEX_PATH: str = "./vector_index"
+    LOCAL_INDEX_MAX_CHUNKS: int = 10_000
+    LOCAL_INDEX_CACHE_MB: int = 256  # float32 copies of recently queried indexes kept in memory
+
+    # Embedding backend: "sentence-transformers" (PyTorch), "onnx" or "onnx-int8" (ONNX Runtime, no torch)
+    EMBEDDING_BACKEND: str = "sentence-transformers"
+    EMBEDDING_MODEL_PATH: Optional[str] = None  # local copy of the model repo; default downloads from the Hub
+    EMBEDDING_ONNX_FILE: Optional[str] = None  # ONNX file within the model repo; default depends on the backend
+    EMBEDDING_THREADS: int = 0  # ONNX Runtime intra-op threads, 0 = one per core
+
+    # Persistent embedding cache (content-addressed, on local disk)
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = "./embedding_cache.db"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 200_000
+
+    # Micro-batching of concurrent small encodes (queries, single documents)
+    EMBED_MICROBATCH_ENABLED: bool = True
+    EMBED_MICROBATCH_MAX_SIZE: int = 32  # texts per forward pass
+    EMBED_MICROBATCH_MAX_WAIT_MS: float = 5.0  # how long the first request waits for company
+
+    # In-process query embedding / retrieval result caches
+    QUERY_CACHE_SIZE: int = 2048
+    QUERY_CACHE_TTL: int = 600  # seconds
+
+    # Draft context: chunks retrieved, then merged / de-duplicated / fitted into the budget
+    CONTEXT_N_RESULTS: int = 3
+    CONTEXT_MAX_TOKENS: int = 1200
+    CONTEXT_DEDUP_THRESHOLD: float = 0.85  # shingle overlap above which a passage is dropped
+
+    # POST /generate/draft/bulk
+    BULK_DRAFT_MAX_EMAILS: int = 50
+    BULK_DRAFT_LLM_CONCURRENCY: int = 4  # concurrent LLM calls per bulk request
+
+    # Semantic cache of drafts: reuse a draft for a near-identical email with the same context
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_THRESHOLD: float = 0.95  # minimum cosine similarity of the cleaned emails
+    RESPONSE_CACHE_TTL: int = 86400  # seconds
+    RESPONSE_CACHE_MAX_PER_USER: int = 500
+    RESPONSE_CACHE_MAX_USERS: int = 1024
+
+    # Per-stage timings in a Server-Timing response header, for requests sending X-Request-Timing: 1
+    TIMING_HEADERS_ENABLED: bool = True
+
+    # HTML parser used by the email cleaner: "html.parser", "lxml" (faster, optional) or "auto"
+    CLEANER_HTML_BACKEND: str = "html.parser"
+
+    # Chunking, in embedding-model tokens (all-MiniLM-L6-v2 truncates at 256)
+    CHUNK_MAX_TOKENS_EMAIL: int = 240
+    CHUNK_MAX_TOKENS_POLICY: int = 200
+    CHUNK_OVERLAP_TOKENS_POLICY: int = 32
+
+    # Document uploads
+    MAX_UPLOAD_BYTES: int = 25 * 1024 * 1024
+    PDF_EXTRACT_WORKERS: int = 2  # processes; 0 = extract in the request thread
+    PDF_PAGES_PER_TASK: int = 8
+
+    # Background jobs (sync / document indexing)
+    JOBS_MAX_WORKERS: int = 4
+    JOBS_MAX_CONCURRENT_PER_USER: int = 1
+    JOBS_MAX_QUEUED_PER_USER: int = 10
 
     model_config = SettingsConfigDict(
         env_file=os.path.join(os.path.dirname(__file__), "../../.env"), 
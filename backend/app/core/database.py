@@ -1,12 +1,35 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import settings
 
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL or "sqlite:///./autogmail.db"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+_url = make_url(SQLALCHEMY_DATABASE_URL)
+IS_SQLITE = _url.get_backend_name() == "sqlite"
+_IN_MEMORY = IS_SQLITE and _url.database in (None, "", ":memory:")
+
+def _engine_options() -> dict:
+    if not IS_SQLITE:
+        return {"pool_size": settings.DB_POOL_SIZE, "max_overflow": settings.DB_MAX_OVERFLOW, "pool_pre_ping": True}
+    options = {"connect_args": {"check_same_thread": False, "timeout": settings.SQLITE_BUSY_TIMEOUT}}
+    if not _IN_MEMORY:
+        # SQLite connections are cheap but each one re-runs the PRAGMAs below; keep them pooled
+        options.update(pool_size=settings.DB_POOL_SIZE, max_overflow=settings.DB_MAX_OVERFLOW)
+    return options
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    if settings.SQLITE_WAL and not _IN_MEMORY:
+        # WAL lets readers (every authenticated request) proceed while a sync job writes
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT * 1000)}")
+    cursor.close()
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_options())
+if IS_SQLITE:
+    event.listen(engine, "connect", _set_sqlite_pragmas)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -0,0 +1,235 @@
+"""
+Lightweight in-process metrics, exported in the Prometheus text format on GET /metrics.
+
+    with metrics.span("generate.llm"):
+        ...
+
+records the stage duration in autogmail_stage_seconds{stage="generate.llm"}.
+When the current request opted in (header X-Request-Timing: 1, see
+TIMING_HEADERS_ENABLED), the stages it ran are also returned in its
+Server-Timing response header, summed per stage.
+
+Spans work in worker threads too: FastAPI runs sync endpoints and
+run_in_threadpool calls with a copy of the request's context. Spans in
+background jobs only feed the histograms.
+"""
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from app.core.config import settings
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+TIMING_REQUEST_HEADER = b"x-request-timing"
+
+_registry = []
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_value(value) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def _format_labels(names, values, extra: dict = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{value}"' for name, value in (extra or {}).items()]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}  # label values -> value
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._copy().items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _copy(self):
+        return dict(self._values)
+
+    def _samples(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per-bucket counts (last one is +Inf), sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return sum(state[0]) if state else 0
+
+    def _copy(self):
+        return {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+
+    def _samples(self, key, value):
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else _format_value(bound)
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, {'le': le})} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(round(total, 6))}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+def render() -> str:
+    """
+    All metrics in the Prometheus text exposition format (version 0.0.4).
+    """
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# -- metrics ----------------------------------------------------------------------
+
+http_request_seconds = Histogram(
+    "autogmail_http_request_seconds", "HTTP request latency by route template.",
+    ("method", "route", "status")
+)
+stage_seconds = Histogram(
+    "autogmail_stage_seconds", "Time spent per pipeline stage (generate, sync, upload, indexing).", ("stage",)
+)
+gmail_api_calls = Counter(
+    "autogmail_gmail_api_calls_total",
+    "Gmail API HTTP calls (a batch counts once) by client, endpoint and status.",
+    ("client", "endpoint", "status")
+)
+llm_requests = Counter("autogmail_llm_requests_total", "LLM completions by mode.", ("mode",))
+llm_tokens = Counter(
+    "autogmail_llm_tokens_total",
+    "LLM tokens by kind (streamed completions count one token per chunk).", ("kind",)
+)
+embedding_batch_size = Histogram(
+    "autogmail_embedding_batch_size", "Texts per embedding model call.", buckets=SIZE_BUCKETS
+)
+
+# -- spans ------------------------------------------------------------------------
+
+# Stages recorded for the current request, or None when it did not ask for timings
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+class span:
+    """
+    Context manager timing one stage; `.seconds` holds the duration afterwards.
+    """
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.seconds = 0.0
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self._started
+        stage_seconds.observe(self.seconds, stage=self.stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((self.stage, self.seconds))
+        return False
+
+def server_timing(timings, total: float) -> str:
+    """
+    Server-Timing header value: stages in first-seen order, durations summed, in ms.
+    """
+    summed = {}
+    for stage, seconds in timings:
+        summed[stage] = summed.get(stage, 0.0) + seconds
+    entries = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in summed.items()]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+def route_template(scope) -> str:
+    """
+    The matched route as a low-cardinality label: the request path with path
+    parameter values put back as {name} ("unmatched" for 404s). Built from the
+    path because route.path is relative to the router in newer FastAPI versions.
+    """
+    if scope.get("route") is None:
+        return "unmatched"
+    names = {str(value): name for name, value in scope.get("path_params", {}).items()}
+    return "/".join(f"{{{names[segment]}}}" if segment in names else segment
+                    for segment in scope["path"].split("/"))
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency per route, and the Server-Timing
+    header for requests that send X-Request-Timing: 1. Pure ASGI (not
+    BaseHTTPMiddleware), so streaming responses pass through untouched.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        opted_in = dict(scope["headers"]).get(TIMING_REQUEST_HEADER) in (b"1", b"true")
+        timings = [] if settings.TIMING_HEADERS_ENABLED and opted_in else None
+        token = _request_timings.set(timings)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if timings is not None:
+                    value = server_timing(timings, time.perf_counter() - started)
+                    message = {**message, "headers": [*message.get("headers", []),
+                                                      (b"server-timing", value.encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            http_request_seconds.observe(time.perf_counter() - started, method=scope["method"],
+                                         route=route_template(scope), status=str(status))
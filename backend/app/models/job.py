@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, JSON
+from app.core.database import Base
+from datetime import datetime
+
+class Job(Base):
+    """
+    A background sync or document-indexing job (see app.services.job_service).
+    status: queued -> running -> succeeded | failed | cancelled
+    """
+    __tablename__ = "jobs"
+
+    id = Column(String, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    kind = Column(String)  # "sync_sent" | "upload"
+    status = Column(String, default="queued", index=True)
+    progress = Column(JSON, default=dict)  # counters, e.g. messages_fetched, chunks_embedded, errors
+    result = Column(JSON)
+    error = Column(String)
+    cancel_requested = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
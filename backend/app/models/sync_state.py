@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
+from app.core.database import Base
+from datetime import datetime
+
+class GmailSyncState(Base):
+    """
+    Per-user cursor for incremental sent-mail sync.
+    history_id is the Gmail mailbox historyId at the end of the last sync.
+    """
+    __tablename__ = "gmail_sync_state"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    history_id = Column(String)
+    last_full_sync_at = Column(DateTime)
+    last_synced_at = Column(DateTime, default=datetime.utcnow)
+
+class IndexedMessage(Base):
+    """
+    Gmail message ids already processed by sync (indexed or skipped as too short),
+    so they are never fetched or embedded twice.
+    """
+    __tablename__ = "indexed_messages"
+    __table_args__ = (UniqueConstraint("user_id", "message_id", name="uq_indexed_message"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    message_id = Column(String, index=True)
+    indexed_at = Column(DateTime, default=datetime.utcnow)
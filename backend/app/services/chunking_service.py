@@ -0,0 +1,133 @@
+"""
+Boundary-aware chunking sized in embedding-model tokens.
+
+Text is split into paragraphs (blank lines), paragraphs into sentences, and
+sentences are packed greedily into chunks of at most `max_tokens` tokens.
+A new paragraph starts a new chunk when it does not fit in the current one.
+Sentences longer than the budget are split on word boundaries. Every step
+is a single pass over the text, so chunking is linear in its length.
+"""
+import re
+from dataclasses import dataclass
+from app.core.config import settings
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+_WHITESPACE_RE = re.compile(r"\s+")
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+@dataclass(frozen=True)
+class ChunkingConfig:
+    max_tokens: int
+    # Trailing sentences (up to this many tokens) repeated at the start of the next chunk
+    overlap_tokens: int = 0
+
+CHUNKING_CONFIGS = {
+    "sent_email": ChunkingConfig(max_tokens=settings.CHUNK_MAX_TOKENS_EMAIL, overlap_tokens=0),
+    "policy": ChunkingConfig(max_tokens=settings.CHUNK_MAX_TOKENS_POLICY,
+                             overlap_tokens=settings.CHUNK_OVERLAP_TOKENS_POLICY),
+}
+DEFAULT_CONFIG = CHUNKING_CONFIGS["policy"]
+
+def config_for(source: str) -> ChunkingConfig:
+    return CHUNKING_CONFIGS.get(source, DEFAULT_CONFIG)
+
+def approx_token_count(text: str) -> int:
+    """
+    Cheap WordPiece estimate: one token per word or punctuation mark, plus one
+    for every 8 characters of long words (which the tokenizer splits).
+    """
+    count = 0
+    for match in _TOKEN_RE.finditer(text):
+        count += 1 + (len(match.group()) - 1) // 8
+    return count
+
+def _split_long_sentence(sentence: str, max_tokens: int, count_tokens):
+    words = sentence.split()
+    piece, piece_tokens = [], 0
+    for word in words:
+        word_tokens = count_tokens(word)
+        if piece and piece_tokens + word_tokens > max_tokens:
+            yield " ".join(piece), piece_tokens
+            piece, piece_tokens = [], 0
+        piece.append(word)
+        piece_tokens += word_tokens
+    if piece:
+        yield " ".join(piece), piece_tokens
+
+def _paragraphs(text: str, max_tokens: int, count_tokens):
+    """
+    Yields each paragraph as a list of (sentence, token_count) units.
+    """
+    for paragraph in _PARAGRAPH_RE.split(text):
+        units = []
+        for sentence in _SENTENCE_END_RE.split(paragraph):
+            sentence = _WHITESPACE_RE.sub(" ", sentence).strip()
+            if not sentence:
+                continue
+            tokens = count_tokens(sentence)
+            if tokens <= max_tokens:
+                units.append((sentence, tokens))
+            else:
+                units.extend(_split_long_sentence(sentence, max_tokens, count_tokens))
+        if units:
+            yield units
+
+def chunk_text(text: str, config: ChunkingConfig = DEFAULT_CONFIG, count_tokens=approx_token_count):
+    """
+    Splits text into chunks of at most config.max_tokens tokens (as measured
+    by `count_tokens`), preferring paragraph, then sentence boundaries.
+    """
+    if not text or not text.strip():
+        return []
+
+    max_tokens = config.max_tokens
+    chunks = []
+    current = []  # (sentence, tokens, starts_paragraph)
+    current_tokens = 0
+    fresh = 0  # units added since the last flush (excludes carried overlap)
+
+    def flush():
+        nonlocal current, current_tokens, fresh
+        parts = []
+        for i, (sentence, _, starts_paragraph) in enumerate(current):
+            if i:
+                parts.append("\n\n" if starts_paragraph else " ")
+            parts.append(sentence)
+        chunks.append("".join(parts))
+
+        carried, carried_tokens = [], 0
+        if config.overlap_tokens:
+            # Carry whole trailing sentences that fit in the overlap budget
+            for unit in reversed(current):
+                if carried_tokens + unit[1] > config.overlap_tokens:
+                    break
+                carried.append(unit)
+                carried_tokens += unit[1]
+            carried.reverse()
+        current, current_tokens, fresh = carried, carried_tokens, 0
+
+    def add(sentence, tokens, starts_paragraph):
+        nonlocal current_tokens, fresh
+        if current and current_tokens + tokens > max_tokens:
+            if fresh:
+                flush()
+            # Drop the carried overlap if it would not leave room for this sentence
+            if current_tokens + tokens > max_tokens:
+                current.clear()
+                current_tokens = 0
+        current.append((sentence, tokens, starts_paragraph))
+        current_tokens += tokens
+        fresh += 1
+
+    for units in _paragraphs(text, max_tokens, count_tokens):
+        paragraph_tokens = sum(tokens for _, tokens in units)
+        # Start a paragraph in a fresh chunk rather than splitting it, when it fits in one
+        if fresh and paragraph_tokens <= max_tokens and current_tokens + paragraph_tokens > max_tokens:
+            flush()
+        for i, (sentence, tokens) in enumerate(units):
+            add(sentence, tokens, i == 0)
+
+    if fresh:
+        flush()
+    return chunks
@@ -1,30 +1,90 @@
 from bs4 import BeautifulSoup
 import re
+from app.core.config import settings
+
+# Anything that could make an HTML parser change the text: a tag, comment,
+# doctype or processing instruction opener, or an entity reference.
+# Bodies without these are plain text and skip HTML parsing entirely.
+_HTML_HINT_RE = re.compile(r"<[a-zA-Z!/?]|&")
+_BLANK_LINES_RE = re.compile(r'\n\s*\n')
+_ON_WROTE_RE = re.compile(r'On .* wrote:')
+
+def _available_html_backend(name: str) -> str:
+    """
+    Resolves CLEANER_HTML_BACKEND to an installed backend, falling back to
+    the stdlib-based html.parser.
+    """
+    if name in ("lxml", "auto"):
+        try:
+            import lxml  # noqa: F401
+            return "lxml"
+        except ImportError:
+            if name == "lxml":
+                print("Warning: lxml is not installed, falling back to html.parser for email cleaning.")
+    return "html.parser"
+
+class EmailCleaner:
+    """
+    Strips HTML, removes common signatures and quoted replies.
+    Plain-text bodies take a fast path that never builds a parse tree;
+    HTML bodies are parsed with `html_backend` ("html.parser", "lxml" or "auto").
+    """
+    def __init__(self, html_backend: str = "html.parser"):
+        self.html_backend = _available_html_backend(html_backend)
+
+    @staticmethod
+    def looks_like_html(text: str) -> bool:
+        return _HTML_HINT_RE.search(text) is not None
+
+    def to_text(self, content: str) -> str:
+        if not self.looks_like_html(content):
+            return content
+        soup = BeautifulSoup(content, self.html_backend)
+        return soup.get_text(separator="\n")
+
+    def clean(self, html_content: str) -> str:
+        if not html_content:
+            return ""
+
+        text = self.to_text(html_content)
+
+        # Remove multiple newlines
+        text = _BLANK_LINES_RE.sub('\n\n', text)
+
+        # Try to identify quoted text (On ... wrote: or >)
+        # This is a naive implementation; production needs a robust parser
+        cleaned_lines = []
+        for line in text.split('\n'):
+            if line.lstrip().startswith('>'):
+                continue
+            # Cheap substring checks first, the regex only confirms candidates
+            if line.startswith('On ') and 'wrote:' in line and _ON_WROTE_RE.match(line):
+                break # Assume everything after this is quoted
+            if line.startswith('From: '): # Forwarded/Reply headers
+                break
+            cleaned_lines.append(line)
+
+        return "\n".join(cleaned_lines).strip()
+
+    def clean_many(self, bodies) -> list[str]:
+        """
+        Cleans a batch of bodies; identical bodies (common in threads) are cleaned once.
+        """
+        cleaned = {}
+        results = []
+        for body in bodies:
+            if body not in cleaned:
+                cleaned[body] = self.clean(body)
+            results.append(cleaned[body])
+        return results
+
+default_cleaner = EmailCleaner(html_backend=settings.CLEANER_HTML_BACKEND)
 
 def clean_email_body(html_content: str) -> str:
     """
     Strips HTML, removes common signatures and quoted replies.
     """
-    if not html_content:
-        return ""
-        
-    soup = BeautifulSoup(html_content, "html.parser")
-    text = soup.get_text(separator="\n")
-    
-    # Remove multiple newlines
-    text = re.sub(r'\n\s*\n', '\n\n', text)
-    
-    # Try to identify quoted text (On ... wrote: or >)
-    # This is a naive implementation; production needs a robust parser
-    lines = text.split('\n')
-    cleaned_lines = []
-    for line in lines:
-        if line.strip().startswith('>'):
-            continue
-        if re.match(r'On .* wrote:', line):
-            break # Assume everything after this is quoted
-        if re.match(r'From: .*', line): # Forwarded/Reply headers
-            break
-        cleaned_lines.append(line)
-        
-    return "\n".join(cleaned_lines).strip()
+    return default_cleaner.clean(html_content)
+
+def clean_email_bodies(bodies) -> list[str]:
+    return default_cleaner.clean_many(bodies)
@@ -0,0 +1,179 @@
+"""
+Assembles retrieved chunks into the LLM context.
+
+query_similar returns chunks ranked by similarity. Before they reach the prompt:
+  1. chunks that are neighbours in the same source (ids "<prefix>_<n>" and
+     "<prefix>_<n+1>") are merged into one passage, dropping the text the
+     second repeats from the end of the first (chunk overlap);
+  2. passages that are near-duplicates of (or contained in) a better-ranked
+     passage are dropped - the same reply is often indexed from several emails;
+  3. passages are added in rank order while they fit in the token budget.
+Token counts use the cheap WordPiece estimate, which is close enough for budgeting.
+"""
+import re
+import threading
+from dataclasses import dataclass
+from app.core.config import settings
+from app.services.chunking_service import approx_token_count
+
+_CHUNK_ID_RE = re.compile(r"^(.*)_(\d+)$")
+_WORD_RE = re.compile(r"\w+")
+MIN_OVERLAP_CHARS = 20  # shorter suffix/prefix matches are treated as coincidence
+MAX_OVERLAP_CHARS = 1000
+
+@dataclass
+class Passage:
+    text: str
+    rank: int  # best (lowest) retrieval rank among its chunks
+    source: str = None
+    first_index: int = None
+    last_index: int = None
+
+def _parse_chunk_id(chunk_id: str):
+    match = _CHUNK_ID_RE.match(chunk_id or "")
+    if not match:
+        return None, None
+    return match.group(1), int(match.group(2))
+
+def _strip_overlap(previous: str, following: str) -> str:
+    """
+    Returns `following` without the longest prefix it shares with the end of `previous`.
+    """
+    longest = min(len(previous), len(following), MAX_OVERLAP_CHARS)
+    for size in range(longest, MIN_OVERLAP_CHARS - 1, -1):
+        if previous.endswith(following[:size]):
+            return following[size:].lstrip()
+    return following
+
+def _merge_neighbours(passages: list[Passage]) -> list[Passage]:
+    by_source = {}
+    merged = []
+    for passage in passages:
+        if passage.source is None:
+            merged.append(passage)
+        else:
+            by_source.setdefault(passage.source, []).append(passage)
+
+    for group in by_source.values():
+        group.sort(key=lambda p: p.first_index)
+        current = group[0]
+        for passage in group[1:]:
+            if passage.first_index == current.last_index + 1:
+                rest = _strip_overlap(current.text, passage.text)
+                if rest:
+                    current.text = current.text + "\n" + rest
+                current.last_index = passage.last_index
+                current.rank = min(current.rank, passage.rank)
+            elif passage.first_index > current.last_index:
+                merged.append(current)
+                current = passage
+            # else: the same chunk returned twice, keep the first copy
+        merged.append(current)
+    merged.sort(key=lambda p: p.rank)
+    return merged
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= size:
+        return {tuple(words)}
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def _is_near_duplicate(shingles: set, kept: list[set], threshold: float) -> bool:
+    for other in kept:
+        overlap = len(shingles & other)
+        if not overlap:
+            continue
+        # Contained in a kept passage, or similar to it as a whole
+        if overlap / len(shingles) >= threshold or overlap / len(shingles | other) >= threshold:
+            return True
+    return False
+
+def _truncate(text: str, max_tokens: int, count_tokens) -> str:
+    words, used = [], 0
+    for word in text.split(" "):
+        tokens = count_tokens(word)
+        if used + tokens > max_tokens:
+            break
+        words.append(word)
+        used += tokens
+    return " ".join(words)
+
+class _Totals:
+    """Process-wide counters, reported by GET /stats."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.tokens_retrieved = 0
+        self.tokens_used = 0
+
+    def record(self, stats: dict):
+        with self.lock:
+            self.requests += 1
+            self.tokens_retrieved += stats["tokens_retrieved"]
+            self.tokens_used += stats["tokens_used"]
+
+_totals = _Totals()
+
+def pack_context(results: dict, max_tokens: int = None, dedup_threshold: float = None,
+                 count_tokens=approx_token_count):
+    """
+    Turns query_similar results into the list of context strings for the prompt.
+    Returns (documents, stats) where stats reports chunks and tokens before and
+    after packing, and tokens_saved.
+    """
+    max_tokens = settings.CONTEXT_MAX_TOKENS if max_tokens is None else max_tokens
+    dedup_threshold = settings.CONTEXT_DEDUP_THRESHOLD if dedup_threshold is None else dedup_threshold
+
+    documents = results["documents"][0] if results.get("documents") else []
+    ids = results["ids"][0] if results.get("ids") else [None] * len(documents)
+
+    passages = []
+    for rank, (chunk_id, text) in enumerate(zip(ids, documents)):
+        if not text:
+            continue
+        source, index = _parse_chunk_id(chunk_id)
+        passages.append(Passage(text=text, rank=rank, source=source, first_index=index, last_index=index))
+    tokens_retrieved = sum(count_tokens(p.text) for p in passages)
+    stats = {"chunks_retrieved": len(passages), "merged": 0, "duplicates_dropped": 0,
+             "over_budget_dropped": 0, "truncated": 0}
+
+    merged = _merge_neighbours(passages)
+    stats["merged"] = len(passages) - len(merged)
+
+    packed, kept_shingles, used = [], [], 0
+    for passage in merged:
+        shingles = _shingles(passage.text)
+        if _is_near_duplicate(shingles, kept_shingles, dedup_threshold):
+            stats["duplicates_dropped"] += 1
+            continue
+        tokens = count_tokens(passage.text)
+        if used + tokens > max_tokens:
+            if packed:
+                stats["over_budget_dropped"] += 1
+                continue
+            # Never send an empty context because the best passage alone is too long
+            passage.text = _truncate(passage.text, max_tokens, count_tokens)
+            tokens = count_tokens(passage.text)
+            stats["truncated"] += 1
+        packed.append(passage.text)
+        kept_shingles.append(shingles)
+        used += tokens
+
+    stats.update({
+        "chunks_used": len(packed),
+        "tokens_retrieved": tokens_retrieved,
+        "tokens_used": used,
+        "tokens_saved": tokens_retrieved - used,
+    })
+    _totals.record(stats)
+    return packed, stats
+
+def context_stats() -> dict:
+    with _totals.lock:
+        return {
+            "requests": _totals.requests,
+            "tokens_retrieved": _totals.tokens_retrieved,
+            "tokens_used": _totals.tokens_used,
+            "tokens_saved": _totals.tokens_retrieved - _totals.tokens_used,
+            "max_tokens": settings.CONTEXT_MAX_TOKENS,
+        }
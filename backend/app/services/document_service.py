@@ -0,0 +1,304 @@
+"""
+Streaming ingestion of uploaded policy documents (PDF/DOCX/TXT).
+
+Uploads are streamed from the multipart request body straight into a
+temporary file (written once, never fully in memory), with a size limit
+checked against Content-Length before anything is read. Text is then produced section by section: PDF
+pages are extracted in a process pool, in page batches, and fed to
+rag_service.add_documents_bulk as they complete. Chunking and embedding
+start before extraction has finished, and peak memory stays bounded.
+"""
+import codecs
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from app.core import metrics
+from app.core.config import settings
+from app.services import pdf_worker, rag_service
+
+MULTIPART_OVERHEAD_BYTES = 64 * 1024  # boundaries and part headers allowed on top of MAX_UPLOAD_BYTES
+TEXT_SECTION_CHARS = 64 * 1024  # TXT/DOCX text is indexed in sections of about this size
+
+class UnsupportedFileType(ValueError):
+    pass
+
+class FileTooLarge(ValueError):
+    pass
+
+class InvalidUpload(ValueError):
+    pass
+
+@dataclass
+class Upload:
+    path: str
+    size: int
+    filename: str
+    content_type: str
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+def _get_pdf_pool():
+    global _pdf_pool
+    if _pdf_pool is None:
+        with _pdf_pool_lock:
+            if _pdf_pool is None:
+                # spawn, not fork: forking a threaded server process is unsafe
+                _pdf_pool = ProcessPoolExecutor(
+                    max_workers=settings.PDF_EXTRACT_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _pdf_pool
+
+def detect_file_type(filename: str, content_type: str) -> str:
+    content_type = content_type or ""
+    filename = filename or ""
+    if "pdf" in content_type or filename.endswith(".pdf"):
+        return "pdf"
+    elif "wordprocessingml" in content_type or filename.endswith(".docx"):
+        return "docx"
+    elif "text" in content_type or filename.endswith(".txt"):
+        return "txt"
+    raise UnsupportedFileType("Unsupported file type")
+
+class _UploadWriter:
+    """
+    python-multipart callbacks: keeps the current part's headers and queues the
+    data of the `field` file part for writing to the spool file.
+    """
+    def __init__(self, field: str, max_bytes: int):
+        self.field = field.encode()
+        self.max_bytes = max_bytes
+        self.upload = None
+        self.pending = []
+        self._out = None
+        self._writing = False
+        self._headers = {}
+        self._header_name = b""
+        self._header_value = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self):
+        self._headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        # Only the first `field` file part is kept; other fields are ignored
+        self._writing = self.upload is None and options.get(b"name") == self.field and b"filename" in options
+        if not self._writing:
+            return
+        filename = options[b"filename"].decode("utf-8", errors="replace")
+        content_type = self._headers.get(b"content-type", b"").decode("latin-1")
+        detect_file_type(filename, content_type)  # before any data is written
+        fd, path = tempfile.mkstemp(prefix="upload_", suffix=os.path.splitext(filename)[1])
+        self._out = os.fdopen(fd, "wb")
+        self.upload = Upload(path=path, size=0, filename=filename, content_type=content_type)
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if not self._writing:
+            return
+        self.upload.size += end - start
+        if self.upload.size > self.max_bytes:
+            raise FileTooLarge(f"File exceeds the {self.max_bytes} byte upload limit")
+        self.pending.append(data[start:end])
+
+    def on_part_end(self):
+        self._writing = False
+
+    def flush(self):
+        pieces, self.pending = self.pending, []
+        self._out.write(b"".join(pieces))
+
+    def close(self):
+        if self._out:
+            self._out.close()
+
+    def discard(self):
+        self.close()
+        if self.upload and os.path.exists(self.upload.path):
+            os.remove(self.upload.path)
+
+async def receive_upload(request: Request, field: str = "file", max_bytes: int = None) -> Upload:
+    """
+    Streams a multipart/form-data upload from the request body into a temporary
+    file: the `field` file part is written once, as it arrives. Oversized uploads
+    are rejected from Content-Length before the body is read, or as soon as the
+    part passes the limit; the file type is checked from the part headers.
+    The caller deletes upload.path.
+    """
+    max_bytes = max_bytes or settings.MAX_UPLOAD_BYTES
+    content_type, params = parse_options_header(request.headers.get("content-type"))
+    if content_type != b"multipart/form-data" or not params.get(b"boundary"):
+        raise InvalidUpload("Expected a multipart/form-data upload")
+    limit = max_bytes + MULTIPART_OVERHEAD_BYTES
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > limit:
+        raise FileTooLarge(f"File exceeds the {max_bytes} byte upload limit")
+
+    writer = _UploadWriter(field, max_bytes)
+    parser = MultipartParser(params[b"boundary"], writer.callbacks())
+    received = 0
+    try:
+        with metrics.span("upload.spool"):
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > limit:
+                    raise FileTooLarge(f"File exceeds the {max_bytes} byte upload limit")
+                parser.write(chunk)
+                if writer.pending:
+                    await run_in_threadpool(writer.flush)
+            parser.finalize()
+            writer.close()
+    except MultipartParseError as e:
+        writer.discard()
+        raise InvalidUpload(f"Malformed multipart body: {e}")
+    except BaseException:
+        writer.discard()
+        raise
+    if writer.upload is None:
+        raise InvalidUpload(f"No '{field}' file in the upload")
+    return writer.upload
+
+def _pdf_sections(path: str):
+    """
+    Yields (label, text) per batch of PDF pages, in page order, while later
+    batches are still being extracted by the process pool.
+    """
+    n_pages = pdf_worker.count_pages(path)
+    per_task = settings.PDF_PAGES_PER_TASK
+    ranges = [(start, min(start + per_task, n_pages)) for start in range(0, n_pages, per_task)]
+
+    if settings.PDF_EXTRACT_WORKERS <= 0:
+        for start, end in ranges:
+            yield f"pages {start + 1}-{end}", pdf_worker.extract_pages(path, start, end)
+        return
+
+    pool = _get_pdf_pool()
+    # Bounded window of in-flight batches keeps memory flat on huge PDFs
+    window = max(2, settings.PDF_EXTRACT_WORKERS * 2)
+    pending = deque()
+    next_range = 0
+    try:
+        while next_range < len(ranges) or pending:
+            while next_range < len(ranges) and len(pending) < window:
+                start, end = ranges[next_range]
+                pending.append((start, end, pool.submit(pdf_worker.extract_pages, path, start, end)))
+                next_range += 1
+            start, end, future = pending.popleft()
+            yield f"pages {start + 1}-{end}", future.result()
+    finally:
+        for _, _, future in pending:
+            future.cancel()
+
+def _docx_sections(path: str):
+    import docx
+    doc = docx.Document(path)
+    section, size = [], 0
+    for para in doc.paragraphs:
+        section.append(para.text + "\n")
+        size += len(para.text) + 1
+        if size >= TEXT_SECTION_CHARS:
+            yield "paragraphs", "".join(section)
+            section, size = [], 0
+    if section:
+        yield "paragraphs", "".join(section)
+
+def _txt_sections(path: str):
+    # Incremental decoder so multi-byte characters split across reads decode correctly
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    with open(path, "rb") as f:
+        while True:
+            raw = f.read(TEXT_SECTION_CHARS)
+            text = decoder.decode(raw, final=not raw)
+            if text:
+                yield "text", text
+            if not raw:
+                break
+
+def iter_sections(path: str, file_type: str):
+    if file_type == "pdf":
+        return _pdf_sections(path)
+    if file_type == "docx":
+        return _docx_sections(path)
+    return _txt_sections(path)
+
+def index_document_file(user_id: int, path: str, filename: str, content_type: str,
+                        progress=None, spool_seconds: float = None) -> dict:
+    """
+    Extracts, chunks and indexes a spooled document into the user's collection,
+    section by section. Blocking; run it in a worker thread.
+    progress: optional callable receiving counter increments (sections_extracted=..., chunks_embedded=...)
+    """
+    file_type = detect_file_type(filename, content_type)
+    char_count = 0
+    # Chunk ids "<upload>_<section>_<n>" let retrieval recognize neighbouring chunks
+    upload_id = uuid.uuid4().hex
+
+    def documents():
+        nonlocal char_count
+        for section_idx, (label, text) in enumerate(iter_sections(path, file_type)):
+            char_count += len(text)
+            if progress:
+                progress(sections_extracted=1)
+            yield {
+                "text": text,
+                "metadata": {"filename": filename, "type": "policy", "section": label},
+                "doc_id_prefix": f"doc_{upload_id}_{section_idx}"
+            }
+
+    started = time.perf_counter()
+    with metrics.span("upload.index"):
+        index_stats = rag_service.add_documents_bulk(
+            user_id, documents(),
+            on_batch=(lambda n_chunks: progress(chunks_embedded=n_chunks)) if progress else None
+        )
+    timings = {
+        # Time indexing sat waiting on extraction; extraction overlapping embedding is not counted
+        "extract_wait": index_stats["source_seconds"],
+        "chunk": index_stats["chunk_seconds"],
+        "embed": index_stats["encode_seconds"],
+        "upsert": index_stats["upsert_seconds"],
+        "total": round(time.perf_counter() - started + (spool_seconds or 0), 3),
+    }
+    if spool_seconds is not None:
+        timings = {"spool": round(spool_seconds, 3), **timings}
+
+    return {
+        "filename": filename,
+        "char_count": char_count,
+        "sections": index_stats["documents"],
+        "chunks_indexed": index_stats["chunks"],
+        "chunks_per_sec": index_stats["chunks_per_sec"],
+        "timings": timings,
+        "status": "Indexed successfully in Vector DB"
+    }
@@ -0,0 +1,197 @@
+"""
+Embedding backends behind one interface, selected with EMBEDDING_BACKEND:
+
+- "sentence-transformers": SentenceTransformer on PyTorch (the original path).
+- "onnx": the same model exported to ONNX, run with ONNX Runtime and the Rust
+  `tokenizers` library. No torch import, so a much smaller process and a
+  faster cold start; vectors match the PyTorch ones to float precision.
+- "onnx-int8": the dynamically int8-quantized ONNX export. Faster still on
+  CPU, at a small cost in vector agreement. Check it with compare_backends
+  (see benchmarks/bench_embedding_backends.py) before pointing it at a
+  collection indexed by another backend.
+
+The ONNX files come from the model's Hugging Face repo (sentence-transformers
+ships onnx/model.onnx and quantized variants), or from EMBEDDING_MODEL_PATH
+for offline deployments: a directory holding the same files.
+
+Every backend exposes encode(texts, batch_size) -> float32 array of
+L2-normalised vectors. Chunking counts tokens with load_tokenizer(), which
+reads only the model's tokenizer.json, so it never needs the model loaded.
+"""
+import importlib.util
+import os
+import platform
+import numpy as np
+
+MAX_SEQ_LENGTH = 256  # all-MiniLM-L6-v2 was trained on (and truncates at) 256 tokens
+
+REQUIRED_PACKAGES = {
+    "sentence-transformers": ("sentence_transformers", "tokenizers", "huggingface_hub"),
+    "onnx": ("onnxruntime", "tokenizers", "huggingface_hub"),
+    "onnx-int8": ("onnxruntime", "tokenizers", "huggingface_hub"),
+}
+
+def backend_available(name: str) -> bool:
+    packages = REQUIRED_PACKAGES.get(name)
+    return packages is not None and all(importlib.util.find_spec(package) is not None for package in packages)
+
+def cache_model_name(backend: str, model_name: str) -> str:
+    """
+    Model name the embedding cache keys on. The PyTorch and fp32 ONNX vectors
+    are interchangeable, int8 ones are not.
+    """
+    return f"{model_name}@int8" if backend == "onnx-int8" else model_name
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+class EmbeddingBackend:
+    name = ""
+
+    def encode(self, texts: list[str], batch_size: int = 32) -> np.ndarray:
+        raise NotImplementedError
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    name = "sentence-transformers"
+
+    def __init__(self, model_name: str, model_path: str = None, **kwargs):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_path or model_name)
+
+    def encode(self, texts: list[str], batch_size: int = 32) -> np.ndarray:
+        return self.model.encode(texts, batch_size=batch_size, normalize_embeddings=True)
+
+def _resolve(model_name: str, model_path: str, filename: str) -> str:
+    if model_path:
+        return os.path.join(model_path, filename)
+    from huggingface_hub import hf_hub_download
+    repo_id = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+    return hf_hub_download(repo_id, filename)
+
+class TextTokenizer:
+    """
+    tokenize(text) like on a transformers tokenizer: word pieces, no special
+    tokens, no truncation (counts must be exact, not capped at MAX_SEQ_LENGTH).
+    """
+    def __init__(self, tokenizer):
+        tokenizer.no_truncation()
+        tokenizer.no_padding()
+        self._tokenizer = tokenizer
+
+    def tokenize(self, text: str) -> list[str]:
+        return self._tokenizer.encode(text, add_special_tokens=False).tokens
+
+def load_tokenizer(model_name: str, model_path: str = None) -> TextTokenizer:
+    """
+    The model's tokenizer on its own (tokenizer.json, the same for every backend).
+    """
+    from tokenizers import Tokenizer
+    return TextTokenizer(Tokenizer.from_file(_resolve(model_name, model_path, "tokenizer.json")))
+
+class OnnxBackend(EmbeddingBackend):
+    """
+    BERT-style encoder on ONNX Runtime: tokenize, run, mean-pool over the
+    attention mask, L2-normalise (the Transformer/Pooling/Normalize stack of
+    the sentence-transformers model).
+    """
+    name = "onnx"
+    default_file = "onnx/model.onnx"
+
+    def __init__(self, model_name: str, model_path: str = None, model_file: str = None, threads: int = 0):
+        import onnxruntime
+        from tokenizers import Tokenizer
+        model_file = model_file or self.default_file
+        self._tokenizer = Tokenizer.from_file(_resolve(model_name, model_path, "tokenizer.json"))
+        self._tokenizer.enable_truncation(MAX_SEQ_LENGTH)
+        pad_id = self._tokenizer.token_to_id("[PAD]") or 0
+        self._tokenizer.enable_padding(pad_id=pad_id, pad_token="[PAD]")
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(
+            _resolve(model_name, model_path, model_file), options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def _encode_batch(self, texts: list[str]) -> np.ndarray:
+        encodings = self._tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        token_embeddings = self.session.run(None, feeds)[0]
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return _normalize(pooled.astype(np.float32))
+
+    def encode(self, texts: list[str], batch_size: int = 32) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        # Length-sorted batches pad less (sentence-transformers does the same)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = [None] * len(texts)
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            for i, vector in zip(batch, self._encode_batch([texts[i] for i in batch])):
+                vectors[i] = vector
+        return np.stack(vectors)
+
+def _int8_file() -> str:
+    machine = platform.machine().lower()
+    if machine in ("arm64", "aarch64"):
+        return "onnx/model_qint8_arm64.onnx"
+    return "onnx/model_quint8_avx2.onnx"  # any x86-64 CPU with AVX2
+
+class OnnxInt8Backend(OnnxBackend):
+    name = "onnx-int8"
+    default_file = _int8_file()
+
+BACKENDS = {
+    backend.name: backend for backend in (SentenceTransformerBackend, OnnxBackend, OnnxInt8Backend)
+}
+
+def load_backend(name: str, model_name: str, model_path: str = None, model_file: str = None,
+                 threads: int = 0) -> EmbeddingBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{name}', expected one of {', '.join(BACKENDS)}")
+    return BACKENDS[name](model_name, model_path=model_path, model_file=model_file, threads=threads)
+
+def compare_vectors(reference, candidate) -> dict:
+    """
+    Consistency of two backends' vectors for the same texts: cosine similarity
+    of each text's two vectors, and how often both agree on every text's
+    nearest neighbour among the others (what retrieval actually depends on).
+    """
+    a = _normalize(np.asarray(reference, dtype=np.float32))
+    b = _normalize(np.asarray(candidate, dtype=np.float32))
+    cosines = (a * b).sum(axis=1)
+    report = {
+        "texts": len(a),
+        "mean_cosine": round(float(cosines.mean()), 5),
+        "min_cosine": round(float(cosines.min()), 5),
+    }
+    if len(a) > 1:
+        neighbours = []
+        for vectors in (a, b):
+            similarities = vectors @ vectors.T
+            np.fill_diagonal(similarities, -np.inf)
+            neighbours.append(similarities.argmax(axis=1))
+        report["top1_agreement"] = round(float((neighbours[0] == neighbours[1]).mean()), 4)
+    return report
+
+def compare_backends(reference: EmbeddingBackend, candidate: EmbeddingBackend, texts: list[str],
+                     batch_size: int = 32) -> dict:
+    """
+    compare_vectors on both backends' encodings of `texts`.
+    """
+    return {
+        "reference": reference.name,
+        "candidate": candidate.name,
+        **compare_vectors(reference.encode(texts, batch_size=batch_size),
+                          candidate.encode(texts, batch_size=batch_size)),
+    }
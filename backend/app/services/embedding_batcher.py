@@ -0,0 +1,105 @@
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+class MicroBatcher:
+    """
+    Coalesces concurrent encode calls into shared model forward passes.
+    Callers block in submit() while a single worker thread drains the queue:
+    it takes the first waiting request, then keeps collecting requests until
+    max_batch_size texts are gathered or max_wait seconds have passed, runs
+    encode_fn once on all of them and hands each caller back its own vectors.
+    """
+    def __init__(self, encode_fn, max_batch_size: int = 32, max_wait: float = 0.005):
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = Counter()  # texts per forward pass -> number of passes
+        self.requests = 0
+        self.batches = 0
+        self.texts = 0
+        self.max_queue_depth = 0
+        self.queue_wait_seconds = 0.0
+        self.encode_seconds = 0.0
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._worker, name="embedding-batcher", daemon=True)
+                    self._thread.start()
+
+    def submit(self, texts: list[str]) -> list[list[float]]:
+        """
+        Encodes texts as part of the next micro-batch; blocks until done.
+        """
+        if not texts:
+            return []
+        self._ensure_started()
+        future = Future()
+        self._queue.put((texts, future, time.perf_counter()))
+        with self._stats_lock:
+            self.requests += 1
+            self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return future.result()
+
+    def _collect(self):
+        first = self._queue.get()
+        batch, size = [first], len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _worker(self):
+        while True:
+            batch = self._collect()
+            texts = [text for item_texts, _, _ in batch for text in item_texts]
+            started = time.perf_counter()
+            try:
+                vectors = self.encode_fn(texts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            finished = time.perf_counter()
+
+            offset = 0
+            for item_texts, future, _ in batch:
+                future.set_result(vectors[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+
+            with self._stats_lock:
+                self.batches += 1
+                self.texts += len(texts)
+                self._batch_sizes[len(texts)] += 1
+                self.encode_seconds += finished - started
+                self.queue_wait_seconds += sum(started - enqueued for _, _, enqueued in batch)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "requests": self.requests,
+                "batches": self.batches,
+                "texts": self.texts,
+                "mean_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+                "max_batch_size": max(self._batch_sizes, default=0),
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+                "mean_queue_wait_ms": round(self.queue_wait_seconds / self.requests * 1000, 3) if self.requests else 0.0,
+                "encode_seconds": round(self.encode_seconds, 3),
+                "config": {"max_batch_size": self.max_batch_size, "max_wait_ms": self.max_wait * 1000},
+            }
@@ -0,0 +1,253 @@
+"""
+Async Gmail REST client for async route handlers.
+
+All calls share one pooled httpx.AsyncClient, so connections (and TLS sessions)
+are reused across requests and users. Per user, at most
+GMAIL_MAX_CONCURRENT_PER_USER calls are in flight. Rate-limit responses (429, or
+403 with reason rateLimitExceeded / userRateLimitExceeded) and transient errors
+are retried with exponential backoff plus jitter, honouring Retry-After; a
+rate-limited user is held back as a whole until the backoff has passed, instead
+of every in-flight call hitting the quota again. A 401 refreshes the access
+token once and retries.
+
+GMAIL_API_BASE_URL and GOOGLE_TOKEN_URI can point at a local mock server
+(see benchmarks/fake_gmail_server.py).
+"""
+import asyncio
+import random
+import time
+from collections import Counter
+import httpx
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.user import User
+from app.services import gmail_service
+
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+RATE_LIMIT_REASONS = ("rateLimitExceeded", "userRateLimitExceeded")
+
+class GmailAPIError(Exception):
+    def __init__(self, status_code: int, reason: str = "", message: str = ""):
+        super().__init__(f"Gmail API error {status_code}: {message or reason}")
+        self.status_code = status_code
+        self.reason = reason
+
+class _UserState:
+    """
+    Per-user tokens, concurrency limit and rate-limit cooldown.
+    """
+    def __init__(self, user: User):
+        self.user_id = user.id
+        self.access_token = user.access_token
+        self.refresh_token = user.refresh_token
+        self.semaphore = asyncio.Semaphore(settings.GMAIL_MAX_CONCURRENT_PER_USER)
+        self.refresh_lock = asyncio.Lock()
+        self.blocked_until = 0.0  # time.monotonic() before which no call is sent
+
+_user_states = TTLCache(maxsize=settings.GMAIL_CLIENT_CACHE_SIZE, ttl=settings.GMAIL_CLIENT_CACHE_TTL)
+_http_client = None
+_http_client_loop = None
+_stats = Counter()
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    The shared pooled client. It belongs to the running event loop; if called
+    from a different loop (e.g. tests), a new client and fresh user states are created.
+    """
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client_loop is not loop:
+        _http_client = httpx.AsyncClient(
+            base_url=settings.GMAIL_API_BASE_URL,
+            timeout=settings.GMAIL_HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.GMAIL_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.GMAIL_HTTP_MAX_KEEPALIVE,
+            ),
+        )
+        _http_client_loop = loop
+        # Semaphores and locks are bound to the loop they were first used on
+        _user_states.clear()
+    return _http_client
+
+async def aclose():
+    """
+    Closes the shared client; called on application shutdown.
+    """
+    global _http_client, _http_client_loop
+    if _http_client is not None:
+        await _http_client.aclose()
+    _http_client = _http_client_loop = None
+
+def invalidate_user(user_id: int):
+    """
+    Drops a user's cached tokens, e.g. after they re-authenticate.
+    """
+    _user_states.pop(user_id)
+
+def _state(user: User) -> _UserState:
+    state = _user_states.get(user.id)
+    if state is None or state.refresh_token != user.refresh_token:
+        state = _UserState(user)
+        _user_states.set(user.id, state)
+    return state
+
+def _backoff(attempt: int) -> float:
+    delay = min(settings.GMAIL_BACKOFF_MAX, settings.GMAIL_BACKOFF_BASE * 2 ** (attempt - 1))
+    return delay + random.uniform(0, settings.GMAIL_BACKOFF_BASE)
+
+def _retry_after(response: httpx.Response):
+    try:
+        return min(settings.GMAIL_BACKOFF_MAX, float(response.headers["Retry-After"]))
+    except (KeyError, ValueError):
+        return None
+
+def _error_details(response: httpx.Response):
+    """
+    (reason, message) from a Google API error body.
+    """
+    try:
+        error = response.json().get("error", {})
+    except ValueError:
+        return "", response.text[:200]
+    if not isinstance(error, dict):
+        return str(error), ""
+    errors = error.get("errors") or [{}]
+    return errors[0].get("reason") or error.get("status", ""), error.get("message", "")
+
+def _endpoint(path: str) -> str:
+    """
+    Metrics label for an API path, without message ids: "messages/{id}", "profile", ...
+    """
+    resource, _, rest = path.partition("/")
+    return f"{resource}/{{id}}" if rest else resource
+
+def _is_rate_limited(status_code: int, reason: str) -> bool:
+    return status_code == 429 or (status_code == 403 and reason in RATE_LIMIT_REASONS)
+
+async def _refresh_access_token(state: _UserState, stale_token: str):
+    async with state.refresh_lock:
+        if state.access_token != stale_token:
+            return  # another call refreshed it while we waited
+        response = await get_http_client().post(settings.GOOGLE_TOKEN_URI, data={
+            "client_id": settings.GOOGLE_CLIENT_ID,
+            "client_secret": settings.GOOGLE_CLIENT_SECRET,
+            "refresh_token": state.refresh_token,
+            "grant_type": "refresh_token",
+        })
+        if response.status_code != 200:
+            raise GmailAPIError(401, "invalid_grant", "Could not refresh Gmail access token")
+        state.access_token = response.json()["access_token"]
+        _stats["token_refreshes"] += 1
+    await asyncio.to_thread(gmail_service.save_access_token, state.user_id, state.access_token)
+
+async def _request(user: User, method: str, path: str, params: dict = None, json: dict = None) -> dict:
+    client = get_http_client()  # first, it may reset the user states
+    state = _state(user)
+    attempt = 0
+    refreshed = False
+    async with state.semaphore:
+        while True:
+            wait = state.blocked_until - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            token = state.access_token
+            _stats["requests"] += 1
+            try:
+                response = await client.request(
+                    method, f"/gmail/v1/users/me/{path}", params=params, json=json,
+                    headers={"Authorization": f"Bearer {token}"}
+                )
+            except httpx.TransportError as e:
+                metrics.gmail_api_calls.inc(client="async", endpoint=_endpoint(path), status="error")
+                if attempt >= settings.GMAIL_MAX_RETRIES:
+                    raise GmailAPIError(503, "transportError", str(e)) from e
+                attempt += 1
+                _stats["retries"] += 1
+                await asyncio.sleep(_backoff(attempt))
+                continue
+
+            metrics.gmail_api_calls.inc(client="async", endpoint=_endpoint(path), status=response.status_code)
+            if response.status_code < 400:
+                return response.json()
+
+            reason, message = _error_details(response)
+            if response.status_code == 401 and not refreshed and state.refresh_token:
+                refreshed = True
+                await _refresh_access_token(state, token)
+                continue
+
+            rate_limited = _is_rate_limited(response.status_code, reason)
+            if (rate_limited or response.status_code in RETRYABLE_STATUSES) and attempt < settings.GMAIL_MAX_RETRIES:
+                attempt += 1
+                _stats["retries"] += 1
+                delay = _retry_after(response) or _backoff(attempt)
+                if rate_limited:
+                    # The quota is per user: pause all of this user's calls, not just this one
+                    _stats["rate_limited"] += 1
+                    state.blocked_until = max(state.blocked_until, time.monotonic() + delay)
+                await asyncio.sleep(delay)
+                continue
+            raise GmailAPIError(response.status_code, reason, message)
+
+# -- API ------------------------------------------------------------------------
+
+async def list_messages(user: User, label_ids=("INBOX",), max_results: int = 10,
+                        page_token: str = None, query: str = None) -> dict:
+    """
+    messages.list; returns the raw response ('messages', 'nextPageToken', 'resultSizeEstimate').
+    """
+    params = {"labelIds": list(label_ids), "maxResults": max_results}
+    if page_token:
+        params["pageToken"] = page_token
+    if query:
+        params["q"] = query
+    return await _request(user, "GET", "messages", params=params)
+
+async def get_message(user: User, msg_id: str, format: str = "full", metadata_headers=None) -> dict:
+    params = {"format": format}
+    if metadata_headers:
+        params["metadataHeaders"] = list(metadata_headers)
+    return await _request(user, "GET", f"messages/{msg_id}", params=params)
+
+async def get_messages(user: User, msg_ids, format: str = "full", metadata_headers=None) -> list:
+    """
+    Fetches many messages concurrently (bounded by the per-user limit).
+    Like gmail_service.get_email_details_batch, messages that still fail after
+    retries are left out and the rest are returned in the order of `msg_ids`.
+    """
+    msg_ids = list(dict.fromkeys(msg_ids))
+    results = await asyncio.gather(
+        *(get_message(user, msg_id, format, metadata_headers) for msg_id in msg_ids),
+        return_exceptions=True
+    )
+    messages = []
+    failed = 0
+    for result in results:
+        if isinstance(result, GmailAPIError):
+            if result.status_code != 404:
+                failed += 1
+        elif isinstance(result, Exception):
+            raise result
+        else:
+            messages.append(result)
+    if failed:
+        print(f"Warning: giving up on {failed} Gmail messages after {settings.GMAIL_MAX_RETRIES} retries")
+    return messages
+
+async def get_profile(user: User) -> dict:
+    return await _request(user, "GET", "profile")
+
+async def create_draft(user: User, message_body: dict) -> dict:
+    """
+    drafts.create; message_body: dict with 'recipient', 'subject', 'body'
+    """
+    return await _request(user, "POST", "drafts", json=gmail_service.build_draft_body(message_body))
+
+def client_stats() -> dict:
+    return {
+        **{key: _stats[key] for key in ("requests", "retries", "rate_limited", "token_refreshes")},
+        "users": len(_user_states),
+        "max_concurrent_per_user": settings.GMAIL_MAX_CONCURRENT_PER_USER,
+    }
@@ -1,82 +1,279 @@
+import json
+import threading
+import time
+import httplib2
+import google_auth_httplib2
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.http import HttpRequest
 from app.models.user import User
+from app.core import metrics
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services import mime_service
+
+GMAIL_SCOPES = ['https://www.googleapis.com/auth/gmail.readonly', 'https://www.googleapis.com/auth/gmail.modify']
+
+# Ready-to-use Gmail clients keyed by user id
+_client_cache = TTLCache(maxsize=settings.GMAIL_CLIENT_CACHE_SIZE, ttl=settings.GMAIL_CLIENT_CACHE_TTL)
+_discovery_doc = None
+_discovery_lock = threading.Lock()
+
+# Gmail accepts up to 100 calls per batch, but recommends 50 or fewer
+# to avoid per-user rate limiting.
+GMAIL_BATCH_SIZE = 50
+BATCH_MAX_RETRIES = 3
+BATCH_RETRY_BACKOFF = 0.5  # seconds, doubled after every retry round
+# Errors that will not go away by retrying the same request
+NON_RETRYABLE_STATUSES = (400, 401, 404)
+
+class HistoryExpiredError(Exception):
+    """Raised when a stored historyId is too old for history.list (HTTP 404)."""
+
+def http_status(error):
+    """
+    Best-effort HTTP status of a Gmail client error (googleapiclient HttpError or fakes).
+    """
+    status = getattr(error, 'status_code', None) or getattr(error, 'status', None)
+    if status is None and getattr(error, 'resp', None) is not None:
+        status = getattr(error.resp, 'status', None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+class _PersistingCredentials(Credentials):
+    """
+    Credentials that report every token refresh, so the new access token can be
+    written back to the user row instead of being refreshed again next time.
+    """
+    on_refresh = None
+
+    def refresh(self, request):
+        super().refresh(request)
+        if self.on_refresh:
+            self.on_refresh(self)
+
+def _gmail_discovery_doc():
+    """
+    Parsed Gmail discovery document, loaded once from the copy bundled with
+    google-api-python-client (no network fetch, no re-parsing per client).
+    """
+    global _discovery_doc
+    if _discovery_doc is None:
+        with _discovery_lock:
+            if _discovery_doc is None:
+                _discovery_doc = json.loads(get_static_doc('gmail', 'v1'))
+    return _discovery_doc
+
+def _thread_local_request_builder(creds):
+    """
+    httplib2 connections are not thread-safe, so a cached client gives each
+    worker thread its own authorized connection (reused across that thread's calls).
+    """
+    local = threading.local()
+
+    def request_builder(http, *args, **kwargs):
+        thread_http = getattr(local, 'http', None)
+        if thread_http is None:
+            thread_http = local.http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http())
+        return HttpRequest(thread_http, *args, **kwargs)
+
+    return request_builder
+
+def save_access_token(user_id: int, access_token: str):
+    """
+    Writes a refreshed access token back to the user row.
+    """
+    db = SessionLocal()
+    try:
+        db.query(User).filter(User.id == user_id).update({User.access_token: access_token})
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Warning: could not persist refreshed token for user {user_id}: {e}")
+    finally:
+        db.close()
+
+def _persist_refreshed_token(user_id: int):
+    def callback(creds):
+        save_access_token(user_id, creds.token)
+    return callback
 
 def get_gmail_service(user: User):
     """
-    Constructs a Gmail API service instance for the given user.
-    Handles token refresh if expired (assuming refresh_token is valid).
+    Returns a Gmail API service instance for the given user.
+    Clients are cached per user (LRU + TTL); a cached client keeps its
+    refreshed credentials, and every refresh is persisted to User.access_token.
     """
-    creds = Credentials(
+    entry = _client_cache.get(user.id)
+    if entry and entry['refresh_token'] == user.refresh_token:
+        return entry['service']
+
+    creds = _PersistingCredentials(
         token=user.access_token,
         refresh_token=user.refresh_token,
-        token_uri="https://oauth2.googleapis.com/token",
+        token_uri=settings.GOOGLE_TOKEN_URI,
         client_id=settings.GOOGLE_CLIENT_ID,
         client_secret=settings.GOOGLE_CLIENT_SECRET,
-        scopes=['https://www.googleapis.com/auth/gmail.readonly', 'https://www.googleapis.com/auth/gmail.modify']
+        scopes=GMAIL_SCOPES
     )
-    
-    return build('gmail', 'v1', credentials=creds)
+    creds.on_refresh = _persist_refreshed_token(user.id)
+
+    service = build_from_document(
+        _gmail_discovery_doc(),
+        credentials=creds,
+        requestBuilder=_thread_local_request_builder(creds)
+    )
+    _client_cache.set(user.id, {'service': service, 'refresh_token': user.refresh_token})
+    return service
+
+def invalidate_gmail_service(user_id: int):
+    """
+    Drops the cached client for a user, e.g. after they re-authenticate.
+    """
+    _client_cache.pop(user_id)
+
+def _execute(request, endpoint: str):
+    """
+    Executes a client request (or batch), counting it in the Gmail API call metrics.
+    """
+    try:
+        response = request.execute()
+    except Exception as e:
+        metrics.gmail_api_calls.inc(client="googleapiclient", endpoint=endpoint, status=http_status(e) or "error")
+        raise
+    metrics.gmail_api_calls.inc(client="googleapiclient", endpoint=endpoint, status=200)
+    return response
 
 def list_emails(service, label_ids=['INBOX'], max_results=10):
-    results = service.users().messages().list(userId='me', labelIds=label_ids, maxResults=max_results).execute()
+    results = _execute(
+        service.users().messages().list(userId='me', labelIds=label_ids, maxResults=max_results), "messages"
+    )
     messages = results.get('messages', [])
     return messages
 
 def get_email_details(service, msg_id):
-    message = service.users().messages().get(userId='me', id=msg_id, format='full').execute()
+    message = _execute(service.users().messages().get(userId='me', id=msg_id, format='full'), "messages/{id}")
     return message
 
-def extract_email_body(message):
+def get_email_details_batch(service, msg_ids, format='full', batch_size=GMAIL_BATCH_SIZE,
+                            max_retries=BATCH_MAX_RETRIES, failed_ids=None):
     """
-    Extracts the full text body from a Gmail message.
-    Handles both simple and multipart messages.
+    Fetches many messages using the Gmail batch endpoint, one HTTP round trip
+    per `batch_size` messages instead of one per message.
+    Items that fail are retried (with backoff) in a new batch; messages that
+    still fail after `max_retries` rounds are left out of the result and, if
+    `failed_ids` (a list) is given, appended to it. Messages that are gone
+    (404 and other non-retryable errors) are just left out.
+    Returns the messages in the same order as `msg_ids`.
     """
-    import base64
-    payload = message.get('payload', {})
-    body_text = ""
-    
-    # Check if message has parts (multipart)
-    if 'parts' in payload:
-        for part in payload['parts']:
-            mime_type = part.get('mimeType', '')
-            body_data = part.get('body', {}).get('data', '')
-            
-            # Prefer text/plain, but also accept text/html
-            if mime_type == 'text/plain' and body_data:
-                try:
-                    body_text = base64.urlsafe_b64decode(body_data).decode('utf-8')
-                    break  # Found plain text, use it
-                except:
-                    pass
-            elif mime_type == 'text/html' and body_data and not body_text:
-                # Fallback to HTML if no plain text found
-                try:
-                    html_text = base64.urlsafe_b64decode(body_data).decode('utf-8')
-                    # Simple HTML stripping (you might want to use BeautifulSoup)
-                    from app.services.cleaning_service import clean_email_body
-                    body_text = clean_email_body(html_text)
-                except:
-                    pass
-    else:
-        # Simple message without parts
-        body_data = payload.get('body', {}).get('data', '')
-        if body_data:
+    msg_ids = list(dict.fromkeys(msg_ids))  # batch request ids must be unique
+    results = {}
+    pending = msg_ids
+    attempt = 0
+
+    while pending:
+        failed = []
+
+        def callback(request_id, response, exception):
+            if exception is not None:
+                if http_status(exception) not in NON_RETRYABLE_STATUSES:
+                    failed.append(request_id)
+            else:
+                results[request_id] = response
+
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            batch = service.new_batch_http_request(callback=callback)
+            for msg_id in chunk:
+                batch.add(
+                    service.users().messages().get(userId='me', id=msg_id, format=format),
+                    request_id=msg_id
+                )
             try:
-                body_text = base64.urlsafe_b64decode(body_data).decode('utf-8')
-            except:
-                pass
-    
-    # Fallback to snippet if body extraction failed
-    if not body_text:
-        body_text = message.get('snippet', '')
-    
-    return body_text
+                _execute(batch, "batch")
+            except Exception:
+                # The whole batch failed (network error, 5xx on the batch endpoint)
+                failed.extend([m for m in chunk if m not in results and m not in failed])
 
-def create_draft(service, user_id, message_body):
+        if not failed:
+            break
+        attempt += 1
+        if attempt > max_retries:
+            print(f"Warning: giving up on {len(failed)} Gmail messages after {max_retries} retries")
+            if failed_ids is not None:
+                failed_ids.extend(failed)
+            break
+        time.sleep(BATCH_RETRY_BACKOFF * (2 ** (attempt - 1)))
+        pending = failed
+
+    return [results[msg_id] for msg_id in msg_ids if msg_id in results]
+
+def get_history_id(service):
     """
-    Creates a draft email in Gmail.
+    Returns the mailbox's current historyId, used as the cursor after a full sync.
+    """
+    profile = _execute(service.users().getProfile(userId='me'), "profile")
+    return profile.get('historyId')
+
+def list_new_message_ids(service, start_history_id, label_id='SENT'):
+    """
+    Lists ids of messages added under `label_id` since `start_history_id`.
+    Returns (message_ids, latest_history_id).
+    Raises HistoryExpiredError if the cursor is too old and a full sync is needed.
+    """
+    message_ids = []
+    latest_history_id = start_history_id
+    page_token = None
+
+    while True:
+        try:
+            response = _execute(service.users().history().list(
+                userId='me',
+                startHistoryId=start_history_id,
+                labelId=label_id,
+                historyTypes=['messageAdded'],
+                pageToken=page_token
+            ), "history")
+        except Exception as e:
+            if http_status(e) == 404:
+                raise HistoryExpiredError(str(e))
+            raise
+
+        for record in response.get('history', []):
+            for added in record.get('messagesAdded', []):
+                msg = added.get('message', {})
+                if label_id in msg.get('labelIds', [label_id]):
+                    message_ids.append(msg['id'])
+
+        latest_history_id = response.get('historyId', latest_history_id)
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            break
+
+    return list(dict.fromkeys(message_ids)), latest_history_id
+
+def extract_email_body(message):
+    """
+    Extracts the full text body from a Gmail message (format='full' or 'raw'),
+    see mime_service. HTML-only bodies are returned as cleaned text.
+    """
+    found = mime_service.find_body(message)
+    if found is None or not found[1].strip():
+        return message.get('snippet', '')
+    mime_type, body_text = found
+    if mime_type == 'text/html':
+        from app.services.cleaning_service import clean_email_body
+        body_text = clean_email_body(body_text)
+    # Fallback to snippet if the body had no text
+    return body_text or message.get('snippet', '')
+
+def build_draft_body(message_body):
+    """
+    Request body for drafts.create.
     message_body: dict with 'recipient', 'subject', 'body'
     """
     from email.mime.text import MIMEText
@@ -88,7 +285,13 @@ def create_draft(service, user_id, message_body):
     
     # Encode the message
     raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
-    body = {'message': {'raw': raw_message}}
+    return {'message': {'raw': raw_message}}
 
-    draft = service.users().drafts().create(userId=user_id, body=body).execute()
+def create_draft(service, user_id, message_body):
+    """
+    Creates a draft email in Gmail.
+    message_body: dict with 'recipient', 'subject', 'body'
+    """
+    body = build_draft_body(message_body)
+    draft = _execute(service.users().drafts().create(userId=user_id, body=body), "drafts")
     return draft
@@ -0,0 +1,80 @@
+"""
+Inbox listing for the dashboard.
+
+Messages are fetched with format='metadata' and only the headers the list shows,
+so Gmail returns no body parts. Pages are cached per user, tagged with the
+mailbox historyId they were built at: a request first reads the current
+historyId (one small profile call) and serves the cached page when it has not
+changed. Any mailbox change moves the historyId and drops the user's pages.
+"""
+import hashlib
+import hmac
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.user import User
+from app.services import gmail_async
+
+INBOX_HEADERS = ("Subject", "From")
+
+# (user_id, max_results, page_token) -> page dict
+_page_cache = TTLCache(maxsize=settings.INBOX_CACHE_SIZE, ttl=settings.INBOX_CACHE_TTL)
+
+def _header(headers, name: str, default: str) -> str:
+    return next((h['value'] for h in headers if h['name'].lower() == name.lower()), default)
+
+def summarize(message: dict) -> dict:
+    headers = message.get('payload', {}).get('headers', [])
+    return {
+        "id": message['id'],
+        "threadId": message['threadId'],
+        "snippet": message.get('snippet', ''),
+        "subject": _header(headers, 'Subject', '(No Subject)'),
+        "sender": _header(headers, 'From', '(Unknown)'),
+    }
+
+def page_etag(user_id: int, history_id: str, max_results: int, page_token: str = None) -> str:
+    """
+    ETag of an inbox page: it can only change when the mailbox historyId does.
+    Keyed on the user too (two mailboxes can share a historyId), as an HMAC so
+    neither the user id nor the historyId is exposed.
+    """
+    page = f"{user_id}:{history_id}:{max_results}:{page_token or ''}".encode()
+    return f'"{hmac.new(settings.SECRET_KEY.encode(), page, hashlib.sha256).hexdigest()[:32]}"'
+
+async def current_history_id(user: User) -> str:
+    return (await gmail_async.get_profile(user)).get('historyId')
+
+async def get_inbox_page(user: User, max_results: int = 10, page_token: str = None,
+                         history_id: str = None) -> dict:
+    """
+    Returns {"emails", "next_page_token", "history_id", "max_results", "page_token", "cached"}.
+    history_id: the mailbox's current historyId if the caller already read it.
+    """
+    if history_id is None:
+        history_id = await current_history_id(user)
+    key = (user.id, max_results, page_token)
+    page = _page_cache.get(key)
+    if page is not None and page["history_id"] == history_id:
+        return {**page, "cached": True}
+    if page is not None:
+        # The mailbox changed: every cached page of this user is stale
+        invalidate_user(user.id)
+
+    listing = await gmail_async.list_messages(user, label_ids=['INBOX'], max_results=max_results,
+                                              page_token=page_token)
+    messages = await gmail_async.get_messages(
+        user, [msg['id'] for msg in listing.get('messages', [])],
+        format='metadata', metadata_headers=INBOX_HEADERS
+    )
+    page = {
+        "emails": [summarize(message) for message in messages],
+        "next_page_token": listing.get('nextPageToken'),
+        "history_id": history_id,
+        "max_results": max_results,
+        "page_token": page_token,
+    }
+    _page_cache.set(key, page)
+    return {**page, "cached": False}
+
+def invalidate_user(user_id: int):
+    _page_cache.invalidate_where(lambda key: key[0] == user_id)
@@ -0,0 +1,244 @@
+"""
+In-process background jobs for sent-mail sync and document indexing.
+
+Jobs are persisted in the `jobs` table and executed on a bounded thread pool.
+The dispatcher enforces a global limit (JOBS_MAX_WORKERS) and a per-user limit
+(JOBS_MAX_CONCURRENT_PER_USER), so one large mailbox cannot take every worker.
+Cancellation is cooperative: job code calls ctx.progress()/ctx.check_cancelled()
+between stages and the job stops at the next check.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.job import Job
+from app.models.user import User
+from app.services import sync_service, document_service
+
+ACTIVE_STATUSES = ("queued", "running")
+PROGRESS_SAVE_INTERVAL = 0.5  # seconds between progress writes to the jobs table
+
+class JobCancelled(Exception):
+    pass
+
+class JobQueueFull(Exception):
+    pass
+
+_executor = ThreadPoolExecutor(max_workers=settings.JOBS_MAX_WORKERS, thread_name_prefix="job")
+_lock = threading.Lock()
+_pending = deque()  # (job_id, user_id, fn), FIFO
+_running_per_user = Counter()
+_running_total = 0
+_running = set()  # ids of jobs submitted to the executor and not yet finished
+_cancel_requested = set()  # only ever ids in _running
+_cleanups = {}  # job_id -> callable run once the job finishes or is cancelled while queued
+
+class JobContext:
+    """
+    Handed to job functions to report progress counters and observe cancellation.
+    """
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.counters = Counter()
+        self._last_saved = 0.0
+
+    def progress(self, **counts):
+        self.counters.update(counts)
+        if time.monotonic() - self._last_saved >= PROGRESS_SAVE_INTERVAL:
+            self.save_progress()
+        self.check_cancelled()
+
+    def check_cancelled(self):
+        if self.job_id in _cancel_requested:
+            raise JobCancelled()
+
+    def save_progress(self):
+        self._last_saved = time.monotonic()
+        _update_job(self.job_id, progress=dict(self.counters))
+
+def _update_job(job_id: str, **fields):
+    db = SessionLocal()
+    try:
+        db.query(Job).filter(Job.id == job_id).update(fields)
+        db.commit()
+    finally:
+        db.close()
+
+def _run_cleanup(job_id: str):
+    cleanup = _cleanups.pop(job_id, None)
+    if cleanup:
+        try:
+            cleanup()
+        except Exception as e:
+            print(f"Warning: cleanup for job {job_id} failed: {e}")
+
+def _dispatch():
+    """
+    Starts as many pending jobs as the global and per-user limits allow.
+    Must be called with _lock held.
+    """
+    global _running_total
+    skipped = deque()
+    while _pending and _running_total < settings.JOBS_MAX_WORKERS:
+        job_id, user_id, fn = _pending.popleft()
+        if _running_per_user[user_id] >= settings.JOBS_MAX_CONCURRENT_PER_USER:
+            skipped.append((job_id, user_id, fn))
+            continue
+        _running_per_user[user_id] += 1
+        _running_total += 1
+        _running.add(job_id)
+        _executor.submit(_run, job_id, user_id, fn)
+    # Jobs of users at their limit keep their place in the queue
+    _pending.extendleft(reversed(skipped))
+
+def _run(job_id: str, user_id: int, fn):
+    global _running_total
+    ctx = JobContext(job_id)
+    try:
+        ctx.check_cancelled()
+        _update_job(job_id, status="running", started_at=datetime.utcnow())
+        result = fn(ctx)
+        _update_job(job_id, status="succeeded", result=result, progress=dict(ctx.counters),
+                    finished_at=datetime.utcnow())
+    except JobCancelled:
+        _update_job(job_id, status="cancelled", progress=dict(ctx.counters), finished_at=datetime.utcnow())
+    except Exception as e:
+        ctx.counters["errors"] += 1
+        _update_job(job_id, status="failed", error=str(e), progress=dict(ctx.counters),
+                    finished_at=datetime.utcnow())
+    finally:
+        _run_cleanup(job_id)
+        with _lock:
+            _cancel_requested.discard(job_id)
+            _running.discard(job_id)
+            _running_per_user[user_id] -= 1
+            if _running_per_user[user_id] <= 0:
+                del _running_per_user[user_id]
+            _running_total -= 1
+            _dispatch()
+
+def submit(db: Session, user_id: int, kind: str, fn, cleanup=None) -> Job:
+    """
+    Persists a queued job and schedules `fn(ctx)` to run in the background.
+    fn's return value (JSON-serializable) becomes the job result.
+    cleanup: optional callable run exactly once when the job ends or is cancelled before starting.
+    """
+    with _lock:
+        queued = sum(1 for _, uid, _ in _pending if uid == user_id)
+    if queued >= settings.JOBS_MAX_QUEUED_PER_USER:
+        raise JobQueueFull(f"Too many queued jobs (limit {settings.JOBS_MAX_QUEUED_PER_USER})")
+
+    job = Job(id=uuid.uuid4().hex, user_id=user_id, kind=kind, status="queued", progress={})
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    if cleanup:
+        _cleanups[job.id] = cleanup
+    with _lock:
+        _pending.append((job.id, user_id, fn))
+        _dispatch()
+    return job
+
+def cancel(db: Session, job: Job) -> Job:
+    """
+    Cancels a queued job immediately, or asks a running one to stop at its next checkpoint.
+    A job that has already finished (even since `job` was loaded) is returned unchanged.
+    """
+    if job.status not in ACTIVE_STATUSES:
+        return job
+    with _lock:
+        queued = [entry for entry in _pending if entry[0] == job.id]
+        for entry in queued:
+            _pending.remove(entry)
+        running = not queued and job.id in _running
+        if running:
+            _cancel_requested.add(job.id)
+    if queued:
+        _run_cleanup(job.id)
+        job.status = "cancelled"
+        job.finished_at = datetime.utcnow()
+        job.cancel_requested = True
+    elif running:
+        # Conditional, so a job completing right now is not flagged after the fact
+        db.query(Job).filter(Job.id == job.id, Job.status.in_(ACTIVE_STATUSES)).update(
+            {Job.cancel_requested: True}, synchronize_session=False
+        )
+    db.commit()
+    db.refresh(job)
+    return job
+
+def get_job(db: Session, user_id: int, job_id: str):
+    return db.query(Job).filter(Job.id == job_id, Job.user_id == user_id).first()
+
+def list_jobs(db: Session, user_id: int, limit: int = 20):
+    return db.query(Job).filter(Job.user_id == user_id).order_by(Job.created_at.desc()).limit(limit).all()
+
+def mark_interrupted_jobs():
+    """
+    Jobs only live in this process; anything still queued/running from a
+    previous process can never finish, so mark it failed at startup.
+    """
+    db = SessionLocal()
+    try:
+        db.query(Job).filter(Job.status.in_(ACTIVE_STATUSES)).update(
+            {Job.status: "failed", Job.error: "Interrupted by server restart", Job.finished_at: datetime.utcnow()},
+            synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+def runner_stats() -> dict:
+    with _lock:
+        return {
+            "queued": len(_pending),
+            "running": _running_total,
+            "running_per_user": dict(_running_per_user),
+            "max_workers": settings.JOBS_MAX_WORKERS,
+            "max_concurrent_per_user": settings.JOBS_MAX_CONCURRENT_PER_USER,
+        }
+
+# -- job types ----------------------------------------------------------------
+
+def enqueue_sync_sent(db: Session, user: User, limit: int = 20, full: bool = False) -> Job:
+    user_id = user.id
+
+    def run(ctx: JobContext):
+        job_db = SessionLocal()
+        try:
+            job_user = job_db.query(User).filter(User.id == user_id).first()
+            return sync_service.sync_sent_emails(
+                job_db, job_user, limit=limit, full=full,
+                progress=ctx.progress, check_cancelled=ctx.check_cancelled
+            )
+        except Exception:
+            job_db.rollback()
+            raise
+        finally:
+            job_db.close()
+
+    return submit(db, user_id, "sync_sent", run)
+
+def enqueue_upload(db: Session, user: User, path: str, filename: str, content_type: str) -> Job:
+    """
+    Queues indexing of an upload already spooled to `path`; the file is deleted afterwards.
+    """
+    user_id = user.id
+
+    def run(ctx: JobContext):
+        return document_service.index_document_file(
+            user_id, path, filename, content_type, progress=ctx.progress
+        )
+
+    def remove_file():
+        if os.path.exists(path):
+            os.remove(path)
+
+    return submit(db, user_id, "upload", run, cleanup=remove_file)
@@ -1,7 +1,36 @@
-from groq import Groq
+import threading
+from app.core import metrics
 from app.core.config import settings
 
-groq_client = Groq(api_key=settings.GROQ_API_KEY)
+LLM_MODEL = "llama-3.3-70b-versatile"
+
+# Clients are created on first use. GROQ_BASE_URL lets them point at a local
+# fake server (see benchmarks/fake_llm.py).
+groq_client = None
+async_groq_client = None
+_init_lock = threading.Lock()
+
+def get_groq_client():
+    global groq_client
+    if groq_client is None:
+        with _init_lock:
+            if groq_client is None:
+                from groq import Groq
+                groq_client = Groq(api_key=settings.GROQ_API_KEY, base_url=settings.GROQ_BASE_URL)
+    return groq_client
+
+def get_async_groq_client():
+    global async_groq_client
+    if async_groq_client is None:
+        with _init_lock:
+            if async_groq_client is None:
+                from groq import AsyncGroq
+                async_groq_client = AsyncGroq(api_key=settings.GROQ_API_KEY, base_url=settings.GROQ_BASE_URL)
+    return async_groq_client
+
+def warmup():
+    get_groq_client()
+    get_async_groq_client()
 
 SYSTEM_PROMPT = """You are an expert email drafting assistant for a company. 
 Your goal is to draft a reply to the customer's email based STRICTLY on the provided POLICY CONTEXT.
@@ -21,24 +50,67 @@ CUSTOMER EMAIL:
 DRAFT REPLY:
 """
 
-def generate_draft(email_body: str, context_chunks: list[str]) -> str:
+def build_messages(email_body: str, context_chunks: list[str]) -> list[dict]:
     context_text = "\n\n".join(context_chunks)
     
     # Construct prompt
     prompt = SYSTEM_PROMPT.format(context=context_text, email_body=email_body)
     
-    chat_completion = groq_client.chat.completions.create(
-        messages=[
-            {
-                "role": "system",
-                "content": "You are a helpful email assistant."
-            },
-            {
-                "role": "user",
-                "content": prompt,
-            }
-        ],
-        model="llama-3.3-70b-versatile",
-    )
+    return [
+        {
+            "role": "system",
+            "content": "You are a helpful email assistant."
+        },
+        {
+            "role": "user",
+            "content": prompt,
+        }
+    ]
+
+def _record_usage(chat_completion, mode: str):
+    metrics.llm_requests.inc(mode=mode)
+    usage = getattr(chat_completion, "usage", None)
+    if usage is not None:
+        metrics.llm_tokens.inc(usage.prompt_tokens or 0, kind="prompt")
+        metrics.llm_tokens.inc(usage.completion_tokens or 0, kind="completion")
+
+def generate_draft(email_body: str, context_chunks: list[str]) -> str:
+    with metrics.span("llm.completion"):
+        chat_completion = get_groq_client().chat.completions.create(
+            messages=build_messages(email_body, context_chunks),
+            model=LLM_MODEL,
+        )
+    _record_usage(chat_completion, "sync")
     
     return chat_completion.choices[0].message.content
+
+async def agenerate_draft(email_body: str, context_chunks: list[str]) -> str:
+    """
+    generate_draft on the async client, for running many drafts concurrently.
+    """
+    with metrics.span("llm.completion"):
+        chat_completion = await get_async_groq_client().chat.completions.create(
+            messages=build_messages(email_body, context_chunks),
+            model=LLM_MODEL,
+        )
+    _record_usage(chat_completion, "async")
+    return chat_completion.choices[0].message.content
+
+async def stream_draft(email_body: str, context_chunks: list[str]):
+    """
+    Async generator yielding the draft piece by piece as Groq streams it back.
+    """
+    metrics.llm_requests.inc(mode="stream")
+    with metrics.span("llm.stream"):
+        stream = await get_async_groq_client().chat.completions.create(
+            messages=build_messages(email_body, context_chunks),
+            model=LLM_MODEL,
+            stream=True,
+        )
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                metrics.llm_tokens.inc(kind="completion")
+                yield delta
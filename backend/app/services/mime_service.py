@@ -0,0 +1,143 @@
+"""
+Body extraction for Gmail messages, from either API format:
+
+- format='full': the JSON-expanded MIME tree in `payload`, nested to any depth,
+  with each part's body base64url-encoded (transfer encoding already undone).
+- format='raw': the RFC 2822 message itself, base64url-encoded in `raw`, parsed
+  with the stdlib email package.
+
+Both walk the MIME tree depth-first as a generator, skipping attachments and
+attached messages, stop at the first text/plain part (the first text/html part
+is kept as the fallback), and decode only the part they select, in its
+declared charset.
+"""
+import base64
+import binascii
+import codecs
+import re
+from email.parser import BytesParser
+
+TEXT_TYPES = ("text/plain", "text/html")
+_CHARSET_RE = re.compile(r'charset\s*=\s*"?([^";\s]+)', re.IGNORECASE)
+# Labels whose bytes are usually a superset in practice (what browsers decode them as)
+_CHARSET_ALIASES = {
+    "iso-8859-1": "windows-1252",
+    "latin1": "windows-1252",
+    "latin-1": "windows-1252",
+    "gb2312": "gb18030",
+    "gbk": "gb18030",
+    "ks_c_5601-1987": "cp949",
+}
+# Labels that promise nothing: try UTF-8 (commonly mislabelled as ASCII) before windows-1252
+_UNDECLARED = ("", "us-ascii", "ascii", "unknown-8bit", "x-unknown", "default")
+_parser = BytesParser()
+
+def decode_text(data: bytes, charset: str = None) -> str:
+    """
+    Decodes a part body in its declared charset; unknown charsets fall back to UTF-8.
+    """
+    charset = (charset or "").strip().strip('"').lower()
+    if charset in _UNDECLARED:
+        try:
+            return data.decode("utf-8")
+        except UnicodeDecodeError:
+            return data.decode("windows-1252", errors="replace")
+    try:
+        codec = codecs.lookup(_CHARSET_ALIASES.get(charset, charset)).name
+    except LookupError:
+        codec = "utf-8"
+    return data.decode(codec, errors="replace")
+
+def _b64decode(data: str) -> bytes:
+    try:
+        # Gmail sometimes drops the padding
+        return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+    except (binascii.Error, ValueError):
+        return b""
+
+def _select(text_parts):
+    # First text/plain wins; otherwise the first text/html
+    html = None
+    for mime_type, part in text_parts:
+        if mime_type == "text/plain":
+            return mime_type, part
+        if html is None:
+            html = (mime_type, part)
+    return html
+
+# -- format='full' ----------------------------------------------------------------
+
+def _header(part: dict, name: str) -> str:
+    name = name.lower()
+    for header in part.get("headers", ()):
+        if header.get("name", "").lower() == name:
+            return header.get("value", "")
+    return ""
+
+def _payload_text_parts(part: dict):
+    """
+    (mime type, part) of every inline text part in a payload tree, in document order.
+    """
+    mime_type = part.get("mimeType", "").lower()
+    if mime_type.startswith("multipart/"):
+        for child in part.get("parts", ()):
+            yield from _payload_text_parts(child)
+    elif mime_type in TEXT_TYPES and part.get("body", {}).get("data") and not part.get("filename") \
+            and not _header(part, "Content-Disposition").lower().startswith("attachment"):
+        yield mime_type, part
+
+def _payload_body(payload: dict):
+    found = _select(_payload_text_parts(payload))
+    if found is None:
+        return None
+    mime_type, part = found
+    match = _CHARSET_RE.search(_header(part, "Content-Type"))
+    return mime_type, decode_text(_b64decode(part["body"]["data"]), match.group(1) if match else None)
+
+# -- format='raw' -----------------------------------------------------------------
+
+def _mime_text_parts(message):
+    """
+    Same as _payload_text_parts, for an email.message.Message.
+    """
+    maintype = message.get_content_maintype()
+    if maintype == "multipart":
+        for child in message.get_payload():
+            yield from _mime_text_parts(child)
+    elif maintype != "message" and message.get_content_type() in TEXT_TYPES \
+            and message.get_content_disposition() != "attachment" and not message.get_filename():
+        yield message.get_content_type(), message
+
+def parse_raw(raw: str):
+    """
+    The email.message.Message of a format='raw' message's `raw` field.
+    """
+    return _parser.parsebytes(_b64decode(raw))
+
+def _raw_body(raw: str):
+    found = _select(_mime_text_parts(parse_raw(raw)))
+    if found is None:
+        return None
+    mime_type, part = found
+    return mime_type, decode_text(part.get_payload(decode=True) or b"", part.get_content_charset())
+
+# -- API --------------------------------------------------------------------------
+
+def find_body(message: dict):
+    """
+    (mime type, text) of a Gmail message's body, from `raw` when the message was
+    fetched with format='raw', else from `payload`. None when it has no inline
+    text part (e.g. the body is only available as an attachment).
+    """
+    if message.get("raw"):
+        return _raw_body(message["raw"])
+    return _payload_body(message.get("payload", {}))
+
+def extract_body(message: dict) -> str:
+    """
+    Body text of a Gmail message (HTML left as is), or its snippet when there is none.
+    """
+    found = find_body(message)
+    if found is None or not found[1].strip():
+        return message.get("snippet", "")
+    return found[1]
@@ -0,0 +1,16 @@
+"""
+PDF text extraction run inside worker processes.
+Kept free of app imports so spawned workers start quickly.
+"""
+
+def count_pages(path: str) -> int:
+    import pypdf
+    return len(pypdf.PdfReader(path).pages)
+
+def extract_pages(path: str, start: int, end: int) -> str:
+    """
+    Extracts the text of pages [start, end) of the PDF at `path`.
+    """
+    import pypdf
+    reader = pypdf.PdfReader(path)
+    return "".join((reader.pages[i].extract_text() or "") + "\n" for i in range(start, end))
@@ -1,30 +1,407 @@
+import importlib.util
+import os
+import re
+import threading
+import time
 import uuid
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.services import chunking_service, embedding_backends, response_cache
+from app.services.embedding_batcher import MicroBatcher
+from app.services.embedding_cache import EmbeddingCache
+from app.services.vector_index import LocalVectorIndex, MatrixCache
 
-# Optional ML imports - handle gracefully if not available
-try:
-    import chromadb
-    from chromadb.config import Settings
-    from sentence_transformers import SentenceTransformer
-    ML_AVAILABLE = True
-    
-    # Initialize components globally to avoid reloading
-    # In production, this might be a separate service or singleton class
-    chroma_client = chromadb.PersistentClient(path="./chroma_db")
-    embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-except ImportError as e:
-    ML_AVAILABLE = False
-    chroma_client = None
-    embedding_model = None
-    print(f"Warning: ML packages not available. RAG features will be disabled. Error: {e}")
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# In-process caches for /generate/draft: query embeddings keyed on the cleaned
+# text, and query_similar results keyed on (user_id, text, n_results).
+# A user's results are dropped whenever their collection is written to.
+query_embedding_cache = TTLCache(maxsize=settings.QUERY_CACHE_SIZE, ttl=settings.QUERY_CACHE_TTL)
+query_result_cache = TTLCache(maxsize=settings.QUERY_CACHE_SIZE, ttl=settings.QUERY_CACHE_TTL)
+_collection_versions = {}  # user_id -> write counter, guards against caching stale results
+_collection_versions_lock = threading.Lock()  # also held while results are cached, see _cache_results
+
+# Optional ML packages - detected without importing them, since importing
+# sentence-transformers (torch) and chromadb alone takes seconds.
+ML_AVAILABLE = (
+    importlib.util.find_spec("chromadb") is not None
+    and embedding_backends.backend_available(settings.EMBEDDING_BACKEND)
+)
+if settings.EMBEDDING_BACKEND not in embedding_backends.BACKENDS:
+    print(f"Warning: unknown EMBEDDING_BACKEND '{settings.EMBEDDING_BACKEND}'. RAG features will be disabled.")
+elif not ML_AVAILABLE:
+    print("Warning: ML packages not available. RAG features will be disabled.")
+
+# Heavy components are created on first use (or by warmup()), not at import,
+# so health checks and auth routes never pay for them.
+chroma_client = None
+embedding_model = None
+tokenizer = None
+embedding_cache = None
+_embedding_cache_ready = False
+_init_lock = threading.Lock()
+
+def get_chroma_client():
+    global chroma_client
+    if chroma_client is None:
+        with _init_lock:
+            if chroma_client is None:
+                import chromadb
+                chroma_client = chromadb.PersistentClient(path="./chroma_db")
+    return chroma_client
+
+def get_embedding_model():
+    """
+    The configured embedding backend (EMBEDDING_BACKEND), see embedding_backends.
+    """
+    global embedding_model
+    if embedding_model is None:
+        with _init_lock:
+            if embedding_model is None:
+                embedding_model = embedding_backends.load_backend(
+                    settings.EMBEDDING_BACKEND, EMBEDDING_MODEL_NAME,
+                    model_path=settings.EMBEDDING_MODEL_PATH,
+                    model_file=settings.EMBEDDING_ONNX_FILE,
+                    threads=settings.EMBEDDING_THREADS
+                )
+    return embedding_model
+
+def get_tokenizer():
+    """
+    The embedding model's tokenizer, loaded on its own (one small file) so
+    chunking never depends on the model being loaded.
+    """
+    global tokenizer
+    if tokenizer is None:
+        with _init_lock:
+            if tokenizer is None:
+                tokenizer = embedding_backends.load_tokenizer(
+                    EMBEDDING_MODEL_NAME, model_path=settings.EMBEDDING_MODEL_PATH
+                )
+    return tokenizer
+
+def get_embedding_cache():
+    """
+    Returns the persistent embedding cache, or None when it is disabled.
+    """
+    global embedding_cache, _embedding_cache_ready
+    if not _embedding_cache_ready:
+        with _init_lock:
+            if not _embedding_cache_ready:
+                if embedding_cache is None and settings.EMBEDDING_CACHE_ENABLED:
+                    embedding_cache = EmbeddingCache(
+                        settings.EMBEDDING_CACHE_PATH,
+                        model_name=embedding_backends.cache_model_name(settings.EMBEDDING_BACKEND, EMBEDDING_MODEL_NAME),
+                        max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES
+                    )
+                _embedding_cache_ready = True
+    return embedding_cache
+
+def warmup() -> dict:
+    """
+    Loads the embedding model and opens Chroma ahead of the first real request.
+    Returns seconds spent per component.
+    """
+    timings = {}
+    if not ML_AVAILABLE:
+        return timings
+    for name, init in (("chroma", get_chroma_client), ("tokenizer", get_tokenizer),
+                       ("embedding_model", get_embedding_model), ("embedding_cache", get_embedding_cache)):
+        started = time.perf_counter()
+        init()
+        timings[name] = round(time.perf_counter() - started, 3)
+    # First forward pass allocates buffers; do it here rather than on a user request
+    started = time.perf_counter()
+    get_embedding_model().encode(["warmup"])
+    timings["first_encode"] = round(time.perf_counter() - started, 3)
+    return timings
+
+# Storage layout (VECTOR_STORE_LAYOUT):
+#   "per_user" - one collection per user, user_<id>_docs
+#   "shared"   - all users in VECTOR_STORE_SHARDS shared collections, docs_shard_<n>;
+#                chunks carry a user_id metadata field that every query filters on,
+#                and chunk ids are prefixed with u<id>_ so they cannot collide.
+PER_USER_COLLECTION_RE = re.compile(r"^user_(\d+)_docs$")
+_collections = {}  # (client id, collection name) -> collection handle
+_collections_lock = threading.Lock()
+
+def shared_layout() -> bool:
+    return settings.VECTOR_STORE_LAYOUT == "shared"
+
+def collection_name(user_id: int, shared: bool = None) -> str:
+    if shared_layout() if shared is None else shared:
+        return f"docs_shard_{user_id % settings.VECTOR_STORE_SHARDS}"
+    return f"user_{user_id}_docs"
+
+def _cached_collection(name: str):
+    # get_or_create_collection is a round trip to Chroma's sysdb; do it once per name
+    client = get_chroma_client()
+    key = (id(client), name)
+    collection = _collections.get(key)
+    if collection is None:
+        with _collections_lock:
+            collection = _collections.get(key)
+            if collection is None:
+                collection = client.get_or_create_collection(name=name)
+                _collections[key] = collection
+    return collection
+
+def _forget_collection(name: str):
+    with _collections_lock:
+        for key in [key for key in _collections if key[1] == name]:
+            del _collections[key]
 
 def get_collection(user_id: int):
     """
-    Get or create a collection for a specific user.
+    Get or create the collection holding a specific user's chunks.
     """
     if not ML_AVAILABLE:
-        raise ImportError("ML packages (chromadb, sentence-transformers) are not installed. Please install them to use RAG features.")
-    collection_name = f"user_{user_id}_docs"
-    return chroma_client.get_or_create_collection(name=collection_name)
+        raise ImportError(f"ML packages (chromadb, {settings.EMBEDDING_BACKEND} backend) are not installed. Please install them to use RAG features.")
+    return _cached_collection(collection_name(user_id))
+
+# Small tenants (LOCAL_INDEX_ENABLED): a per-user LocalVectorIndex (memory-mapped
+# float16 matrix, exact top-k) under LOCAL_INDEX_PATH/user_<id> instead of Chroma.
+# A tenant whose index grows past LOCAL_INDEX_MAX_CHUNKS is copied into its
+# Chroma collection (HNSW) and stays there; a "chroma" marker file records it.
+# Tenants that already had chunks in Chroma when the index was enabled stay on Chroma.
+# The local index holds plain chunk ids and metadata; the VECTOR_STORE_LAYOUT tenant
+# prefix / user_id field is only added on the way into Chroma.
+ON_CHROMA_MARKER = "chroma"
+LOCAL_INDEX_DIR_RE = re.compile(r"^user_(\d+)$")
+_local_indexes = {}  # user_id -> LocalVectorIndex, or None for a tenant on Chroma
+_local_indexes_lock = threading.Lock()
+matrix_cache = MatrixCache(settings.LOCAL_INDEX_CACHE_MB * 1024 * 1024)
+
+def _local_index_path(user_id: int) -> str:
+    return os.path.join(settings.LOCAL_INDEX_PATH, f"user_{user_id}")
+
+def _chroma_has_chunks(user_id: int) -> bool:
+    client = get_chroma_client()
+    name = collection_name(user_id)
+    if name not in _list_collection_names(client):
+        return False
+    page = _cached_collection(name).get(where=_tenant_filter(user_id), limit=1, include=[])
+    return bool(page["ids"])
+
+def _open_local_index(user_id: int):
+    path = _local_index_path(user_id)
+    if os.path.exists(os.path.join(path, ON_CHROMA_MARKER)):
+        return None
+    if not LocalVectorIndex.exists(path) and _chroma_has_chunks(user_id):
+        _mark_on_chroma(path)
+        return None
+    return LocalVectorIndex(path, matrix_cache=matrix_cache)
+
+def _mark_on_chroma(path: str):
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, ON_CHROMA_MARKER), "w"):
+        pass
+
+def local_index(user_id: int):
+    """
+    The user's LocalVectorIndex, or None when their chunks live in Chroma.
+    """
+    if not settings.LOCAL_INDEX_ENABLED:
+        return None
+    with _local_indexes_lock:
+        if user_id not in _local_indexes:
+            _local_indexes[user_id] = _open_local_index(user_id)
+        return _local_indexes[user_id]
+
+def _chroma_upsert(user_id: int, ids: list[str], embeddings, documents: list[str], metadatas: list[dict]):
+    collection = get_collection(user_id)
+    ids = _tenant_ids(user_id, ids)
+    metadatas = [_tenant_metadata(user_id, metadata or {}) for metadata in metadatas]
+    batch_size = _upsert_batch_size()
+    for start in range(0, len(ids), batch_size):
+        end = start + batch_size
+        collection.upsert(ids=ids[start:end], embeddings=embeddings[start:end],
+                          documents=documents[start:end], metadatas=metadatas[start:end])
+
+def _move_to_chroma(user_id: int, index: LocalVectorIndex):
+    # Called with index.lock held: copy every chunk, then retire the local index
+    for page in index.pages(_upsert_batch_size()):
+        _chroma_upsert(user_id, **page)
+    _mark_on_chroma(index.path)
+    with _local_indexes_lock:
+        _local_indexes[user_id] = None
+    index.destroy()
+
+def _upsert(user_id: int, ids: list[str], embeddings, documents: list[str], metadatas: list[dict]):
+    """
+    Writes chunks to the user's local index or Chroma collection, moving the
+    tenant to Chroma once the local index outgrows LOCAL_INDEX_MAX_CHUNKS.
+    """
+    index = local_index(user_id)
+    if index is not None:
+        with index.lock:
+            if not index.closed:
+                index.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+                if index.count() > settings.LOCAL_INDEX_MAX_CHUNKS:
+                    _move_to_chroma(user_id, index)
+                return
+    _chroma_upsert(user_id, ids, embeddings, documents, metadatas)
+
+def _query(user_id: int, query_embeddings, n_results: int) -> dict:
+    index = local_index(user_id)
+    if index is not None:
+        with index.lock:
+            if not index.closed:
+                return index.query(query_embeddings, n_results=n_results)
+    return get_collection(user_id).query(
+        query_embeddings=query_embeddings,
+        n_results=n_results,
+        where=_tenant_filter(user_id)
+    )
+
+def delete_chunks(user_id: int, ids: list[str]):
+    """
+    Removes chunks from the user's vector store by id (as passed to add_document,
+    e.g. email_<id>_<n>).
+    """
+    if not ML_AVAILABLE or not ids:
+        return
+    index = local_index(user_id)
+    deleted = False
+    if index is not None:
+        with index.lock:
+            if not index.closed:
+                index.delete(ids)
+                deleted = True
+    if not deleted:
+        get_collection(user_id).delete(ids=_tenant_ids(user_id, ids))
+    invalidate_user_cache(user_id)
+
+def vector_store_stats() -> dict:
+    """
+    Local index usage (open tenant indexes, float32 matrix cache), for monitoring.
+    """
+    if not settings.LOCAL_INDEX_ENABLED:
+        return {"local_index_enabled": False}
+    with _local_indexes_lock:
+        indexes = list(_local_indexes.values())
+    return {
+        "local_index_enabled": True,
+        "local_tenants": sum(1 for index in indexes if index is not None),
+        "chroma_tenants": sum(1 for index in indexes if index is None),
+        "max_local_chunks": settings.LOCAL_INDEX_MAX_CHUNKS,
+        "matrix_cache": matrix_cache.stats(),
+    }
+
+def _tenant_filter(user_id: int):
+    return {"user_id": user_id} if shared_layout() else None
+
+def _tenant_metadata(user_id: int, metadata: dict) -> dict:
+    return {**metadata, "user_id": user_id} if shared_layout() else metadata
+
+def _tenant_ids(user_id: int, ids: list[str]) -> list[str]:
+    return [f"u{user_id}_{chunk_id}" for chunk_id in ids] if shared_layout() else ids
+
+# Bulk indexing: chunks are encoded EMBED_BATCH_SIZE at a time and written to
+# Chroma in upserts of up to UPSERT_BATCH_SIZE chunks.
+EMBED_BATCH_SIZE = 64
+UPSERT_BATCH_SIZE = 1024
+
+def _model_encode(texts: list[str], batch_size: int = EMBED_BATCH_SIZE) -> list[list[float]]:
+    metrics.embedding_batch_size.observe(len(texts))
+    return get_embedding_model().encode(texts, batch_size=batch_size).tolist()
+
+# Small encodes from concurrent requests (query_similar, add_document) are
+# coalesced into shared forward passes instead of many batch-of-one passes.
+# Bulk indexing already encodes large batches and calls the model directly.
+embedding_batcher = MicroBatcher(
+    _model_encode,
+    max_batch_size=settings.EMBED_MICROBATCH_MAX_SIZE,
+    max_wait=settings.EMBED_MICROBATCH_MAX_WAIT_MS / 1000
+)
+
+def encode(texts: list[str], batch_size: int = EMBED_BATCH_SIZE, micro_batch: bool = False) -> list[list[float]]:
+    """
+    Embeds texts, reusing cached vectors for text that was already encoded
+    and running the model only on the misses.
+    micro_batch: send the misses through the shared micro-batcher (for small,
+    latency-sensitive calls) rather than running the model in this thread.
+    """
+    if not texts:
+        return []
+    if micro_batch and settings.EMBED_MICROBATCH_ENABLED:
+        run_model = embedding_batcher.submit
+    else:
+        run_model = lambda batch: _model_encode(batch, batch_size=batch_size)
+    cache = get_embedding_cache()
+    if cache is None:
+        return run_model(texts)
+
+    vectors = cache.get_many(texts)
+    missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+    if missing:
+        encoded = run_model(missing)
+        cache.put_many(missing, encoded)
+        by_text = dict(zip(missing, encoded))
+        vectors = [vector if vector is not None else by_text[text] for text, vector in zip(texts, vectors)]
+    return vectors
+
+def embedding_cache_stats() -> dict:
+    """
+    Hit/miss counters of the persistent embedding cache, for monitoring.
+    """
+    if not _embedding_cache_ready:
+        return {"enabled": settings.EMBEDDING_CACHE_ENABLED, "initialized": False}
+    if embedding_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **embedding_cache.stats()}
+
+def embedding_batcher_stats() -> dict:
+    """
+    Queue depth and batch-size counters of the micro-batcher, for monitoring.
+    """
+    return {"enabled": settings.EMBED_MICROBATCH_ENABLED, **embedding_batcher.stats()}
+
+def invalidate_user_cache(user_id: int):
+    """
+    Drops cached query results and drafts for a user; called after every write to their collection.
+    """
+    with _collection_versions_lock:
+        _collection_versions[user_id] = _collection_versions.get(user_id, 0) + 1
+        query_result_cache.invalidate_where(lambda key: key[0] == user_id)
+    response_cache.invalidate_user(user_id)
+
+def _cache_results(user_id: int, version: int, results: dict):
+    """
+    Caches query results ({cache key: result}) unless the user's collection was
+    written to since `version` was read. Under the same lock as the
+    invalidation, so a write cannot slip in between the check and the set.
+    """
+    with _collection_versions_lock:
+        if _collection_versions.get(user_id, 0) == version:
+            for key, result in results.items():
+                query_result_cache.set(key, result)
+
+def count_tokens(text: str) -> int:
+    """
+    Token count under the embedding model's tokenizer. Always that tokenizer,
+    never an estimate, so chunk boundaries (and with them chunk ids and
+    embedding cache keys) are the same whatever has been loaded.
+    """
+    return len(get_tokenizer().tokenize(text))
+
+def _chunking_source(metadata: dict) -> str:
+    if metadata.get("source") == "sent_email":
+        return "sent_email"
+    if metadata.get("type") == "policy":
+        return "policy"
+    return "default"
+
+def _chunk_text(text: str, metadata: dict):
+    # Paragraph/sentence-aware chunks sized in model tokens, tuned per source
+    config = chunking_service.config_for(_chunking_source(metadata))
+    return chunking_service.chunk_text(text, config=config, count_tokens=count_tokens)
+
+def _chunk_ids(n_chunks: int, doc_id_prefix: str = None):
+    if doc_id_prefix:
+        return [f"{doc_id_prefix}_{chunk_idx}" for chunk_idx in range(n_chunks)]
+    return [str(uuid.uuid4()) for _ in range(n_chunks)]
 
 def add_document(user_id: int, text: str, metadata: dict, doc_id_prefix: str = None):
     """
@@ -34,58 +411,233 @@ def add_document(user_id: int, text: str, metadata: dict, doc_id_prefix: str = N
     if not ML_AVAILABLE:
         print("Warning: RAG features not available. Document not indexed.")
         return 0
-    collection = get_collection(user_id)
-    
-    # Simple chunking by 1000 chars for now
-    # A real generic chunker is complex, keeping it simple
-    chunk_size = 1000
-    overlap = 100
-    
-    chunks = []
-    ids = []
-    metadatas = []
     
-    start = 0
-    chunk_idx = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end]
-        chunks.append(chunk)
-        
-        if doc_id_prefix:
-            ids.append(f"{doc_id_prefix}_{chunk_idx}")
-        else:
-            ids.append(str(uuid.uuid4()))
-            
-        metadatas.append(metadata)
-        start += (chunk_size - overlap)
-        chunk_idx += 1
+    chunks = _chunk_text(text, metadata)
+    ids = _chunk_ids(len(chunks), doc_id_prefix)
+    metadatas = [metadata] * len(chunks)
         
     if chunks:
-        # Generate embeddings explicitly
-        embeddings = embedding_model.encode(chunks).tolist()
+        # Generate embeddings explicitly (cached chunks skip the model)
+        embeddings = encode(chunks, micro_batch=True)
         
         # Use upsert to handle updates/deduplication
-        collection.upsert(
-            embeddings=embeddings,
-            documents=chunks,
-            metadatas=metadatas,
-            ids=ids
-        )
+        _upsert(user_id, ids=ids, embeddings=embeddings, documents=chunks, metadatas=metadatas)
+        invalidate_user_cache(user_id)
     return len(chunks)
 
+def _upsert_batch_size():
+    # Chroma rejects upserts above its own max batch size (depends on the SQLite build)
+    max_batch = getattr(get_chroma_client(), "get_max_batch_size", None)
+    if max_batch:
+        try:
+            return min(UPSERT_BATCH_SIZE, max_batch())
+        except Exception:
+            pass
+    return UPSERT_BATCH_SIZE
+
+def add_documents_bulk(user_id: int, documents, embed_batch_size: int = EMBED_BATCH_SIZE, on_batch=None):
+    """
+    Chunks and indexes many documents at once.
+    documents: iterable of dicts with 'text', 'metadata' and optional 'doc_id_prefix'
+    (same meaning as the add_document arguments). It is consumed lazily: chunks
+    are buffered until UPSERT_BATCH_SIZE, then encoded in large batches and
+    written in a single upsert, so the model never runs on tiny per-email batches.
+    on_batch: optional callable receiving the chunk count after every upsert.
+    Returns indexing stats: documents, chunks, seconds, chunks_per_sec, and the
+    time spent per stage (waiting on `documents`, chunking, encoding, upserting).
+    """
+    stats = {"documents": 0, "chunks": 0, "seconds": 0.0, "chunks_per_sec": 0.0,
+             "source_seconds": 0.0, "chunk_seconds": 0.0, "encode_seconds": 0.0, "upsert_seconds": 0.0}
+    if not ML_AVAILABLE:
+        print("Warning: RAG features not available. Documents not indexed.")
+        return stats
+
+    started = time.perf_counter()
+    upsert_size = UPSERT_BATCH_SIZE if local_index(user_id) is not None else _upsert_batch_size()
+    chunks, ids, metadatas = [], [], []
+
+    def flush(n):
+        batch_chunks, batch_ids, batch_metadatas = chunks[:n], ids[:n], metadatas[:n]
+        del chunks[:n], ids[:n], metadatas[:n]
+        with metrics.span("index.embed") as stage:
+            embeddings = encode(batch_chunks, batch_size=embed_batch_size)
+        stats["encode_seconds"] += stage.seconds
+        with metrics.span("index.upsert") as stage:
+            _upsert(user_id, ids=batch_ids, embeddings=embeddings, documents=batch_chunks, metadatas=batch_metadatas)
+        stats["upsert_seconds"] += stage.seconds
+        stats["chunks"] += len(batch_chunks)
+        if on_batch:
+            on_batch(len(batch_chunks))
+
+    documents = iter(documents)
+    try:
+        while True:
+            # Documents may be produced lazily (e.g. PDF pages being extracted)
+            with metrics.span("index.source") as stage:
+                doc = next(documents, None)
+            stats["source_seconds"] += stage.seconds
+            if doc is None:
+                break
+            with metrics.span("index.chunk") as stage:
+                doc_chunks = _chunk_text(doc["text"], doc["metadata"])
+            stats["chunk_seconds"] += stage.seconds
+            stats["documents"] += 1
+            chunks.extend(doc_chunks)
+            ids.extend(_chunk_ids(len(doc_chunks), doc.get("doc_id_prefix")))
+            metadatas.extend([doc["metadata"]] * len(doc_chunks))
+            while len(chunks) >= upsert_size:
+                flush(upsert_size)
+        if chunks:
+            flush(len(chunks))
+    finally:
+        # Also runs when on_batch aborts the indexing part-way through
+        if stats["chunks"]:
+            invalidate_user_cache(user_id)
+
+    for key in ("source_seconds", "chunk_seconds", "encode_seconds", "upsert_seconds"):
+        stats[key] = round(stats[key], 3)
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    if stats["seconds"]:
+        stats["chunks_per_sec"] = round(stats["chunks"] / stats["seconds"], 1)
+    return stats
+
+def embed_query(query_text: str):
+    """
+    Embedding of a query text, served from the query embedding cache when possible.
+    """
+    query_embedding = query_embedding_cache.get(query_text)
+    if query_embedding is None:
+        query_embedding = encode([query_text], micro_batch=True)
+        query_embedding_cache.set(query_text, query_embedding)
+    return query_embedding[0]
+
 def query_similar(user_id: int, query_text: str, n_results: int = 3):
     """
-    Query the user's collection.
+    Query the user's vector store (local index or Chroma collection).
     """
     if not ML_AVAILABLE:
         # Return empty results if ML is not available
         return {"documents": [[]], "metadatas": [[]], "distances": [[]]}
-    collection = get_collection(user_id)
-    query_embedding = embedding_model.encode([query_text]).tolist()
-    
-    results = collection.query(
-        query_embeddings=query_embedding,
-        n_results=n_results
-    )
+    cache_key = (user_id, query_text, n_results)
+    results = query_result_cache.get(cache_key)
+    if results is not None:
+        return results
+    version = _collection_versions.get(user_id, 0)
+
+    with metrics.span("rag.embed_query"):
+        query_embedding = embed_query(query_text)
+    with metrics.span("rag.query"):
+        results = _query(user_id, [query_embedding], n_results)
+    # Skip caching if the collection was written to while we were querying
+    _cache_results(user_id, version, {cache_key: results})
+    return results
+
+_PER_QUERY_KEYS = ("ids", "documents", "metadatas", "distances", "embeddings", "uris", "data")
+
+def _split_results(results: dict, i: int) -> dict:
+    # Row i of a multi-query result, in the single-query shape query_similar returns
+    return {key: [value[i]] if key in _PER_QUERY_KEYS and value is not None else value
+            for key, value in results.items()}
+
+def query_similar_many(user_id: int, query_texts: list[str], n_results: int = 3) -> list[dict]:
+    """
+    query_similar for many texts at once: cache misses are embedded in one batch
+    and retrieved with a single multi-query Chroma call.
+    Returns one result dict per text, in order, shaped like query_similar's.
+    """
+    if not ML_AVAILABLE:
+        return [{"documents": [[]], "metadatas": [[]], "distances": [[]]} for _ in query_texts]
+    results = [query_result_cache.get((user_id, text, n_results)) for text in query_texts]
+    missing = list(dict.fromkeys(text for text, result in zip(query_texts, results) if result is None))
+    if missing:
+        version = _collection_versions.get(user_id, 0)
+        cached = {text: query_embedding_cache.get(text) for text in missing}
+        to_encode = [text for text, embedding in cached.items() if embedding is None]
+        if to_encode:
+            # One batch for every uncached query (same [vector] shape query_similar caches)
+            with metrics.span("rag.embed_query"):
+                encoded = encode(to_encode)
+            for text, vector in zip(to_encode, encoded):
+                cached[text] = [vector]
+                query_embedding_cache.set(text, [vector])
+
+        with metrics.span("rag.query"):
+            batch = _query(user_id, [cached[text][0] for text in missing], n_results)
+        fetched = {text: _split_results(batch, i) for i, text in enumerate(missing)}
+        _cache_results(user_id, version, {(user_id, text, n_results): result for text, result in fetched.items()})
+        results = [result if result is not None else fetched[text] for text, result in zip(query_texts, results)]
     return results
+
+def _list_collection_names(client) -> list[str]:
+    # Chroma < 0.6 returns Collection objects, newer versions return names
+    return [getattr(collection, "name", collection) for collection in client.list_collections()]
+
+def migrate_to_shared_layout(delete_source: bool = False, page_size: int = 1000, log=print) -> dict:
+    """
+    Copies every per-user collection (user_<id>_docs) into the shared shards,
+    reusing the stored embeddings. Safe to re-run: chunks are upserted under
+    their tenant-prefixed ids. With delete_source, each per-user collection is
+    deleted once it has been copied.
+    """
+    if not ML_AVAILABLE:
+        raise ImportError("ML packages (chromadb, sentence-transformers) are not installed. Please install them to use RAG features.")
+    client = get_chroma_client()
+    stats = {"collections": 0, "chunks": 0, "deleted": 0}
+    page_size = min(page_size, _upsert_batch_size())
+    for name in _list_collection_names(client):
+        match = PER_USER_COLLECTION_RE.match(name)
+        if not match:
+            continue
+        user_id = int(match.group(1))
+        source = client.get_collection(name=name)
+        target = _cached_collection(collection_name(user_id, shared=True))
+        copied = 0
+        while True:
+            page = source.get(include=["embeddings", "documents", "metadatas"], limit=page_size, offset=copied)
+            if not page["ids"]:
+                break
+            target.upsert(
+                ids=[f"u{user_id}_{chunk_id}" for chunk_id in page["ids"]],
+                embeddings=page["embeddings"],
+                documents=page["documents"],
+                metadatas=[{**(metadata or {}), "user_id": user_id} for metadata in page["metadatas"]],
+            )
+            copied += len(page["ids"])
+        stats["collections"] += 1
+        stats["chunks"] += copied
+        if delete_source:
+            client.delete_collection(name=name)
+            _forget_collection(name)
+            stats["deleted"] += 1
+        invalidate_user_cache(user_id)
+        log(f"{name}: {copied} chunks -> {collection_name(user_id, shared=True)}")
+    return stats
+
+def move_local_indexes_to_chroma(log=print) -> dict:
+    """
+    Copies every tenant's local index into Chroma and retires it (as happens
+    on its own past LOCAL_INDEX_MAX_CHUNKS). Run before turning LOCAL_INDEX_ENABLED off.
+    """
+    if not ML_AVAILABLE:
+        raise ImportError(f"ML packages (chromadb, {settings.EMBEDDING_BACKEND} backend) are not installed. Please install them to use RAG features.")
+    stats = {"tenants": 0, "chunks": 0}
+    root = settings.LOCAL_INDEX_PATH
+    for name in sorted(os.listdir(root)) if os.path.isdir(root) else []:
+        match = LOCAL_INDEX_DIR_RE.match(name)
+        path = os.path.join(root, name)
+        if not match or not LocalVectorIndex.exists(path) or os.path.exists(os.path.join(path, ON_CHROMA_MARKER)):
+            continue
+        user_id = int(match.group(1))
+        with _local_indexes_lock:
+            index = _local_indexes.get(user_id) or LocalVectorIndex(path, matrix_cache=matrix_cache)
+            _local_indexes[user_id] = index
+        with index.lock:
+            if index.closed:
+                continue
+            chunks = index.count()
+            _move_to_chroma(user_id, index)
+        invalidate_user_cache(user_id)
+        stats["tenants"] += 1
+        stats["chunks"] += chunks
+        log(f"{name}: {chunks} chunks -> {collection_name(user_id)}")
+    return stats
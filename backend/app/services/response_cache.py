@@ -0,0 +1,151 @@
+"""
+Per-user semantic cache of generated drafts.
+
+An entry is keyed by the embedding of the cleaned incoming email and a
+fingerprint of the context the draft was generated from. A new email gets the
+cached draft when its context fingerprint matches and the cosine similarity of
+the embeddings is at least RESPONSE_CACHE_THRESHOLD - near-identical refund or
+shipping questions then skip the LLM call. Entries expire after
+RESPONSE_CACHE_TTL seconds, each user keeps at most RESPONSE_CACHE_MAX_PER_USER
+(least recently used evicted first), and a user's entries are dropped whenever
+their indexed documents change (see rag_service.invalidate_user_cache).
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+import numpy as np
+from app.core.config import settings
+
+@dataclass
+class _Entry:
+    vector: np.ndarray  # unit length
+    fingerprint: str
+    draft: str
+    created_at: float
+    last_used: float
+    hits: int = 0
+
+@dataclass
+class DraftLookup:
+    """
+    Result of lookup_draft; pass it to store_draft after generating on a miss.
+    """
+    embedding: np.ndarray
+    fingerprint: str
+    draft: str = None
+    similarity: float = None
+
+    @property
+    def hit(self) -> bool:
+        return self.draft is not None
+
+def context_fingerprint(documents: list[str]) -> str:
+    return hashlib.sha256("\x00".join(documents).encode("utf-8")).hexdigest()[:32]
+
+def _unit(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+class SemanticResponseCache:
+    def __init__(self, threshold: float = 0.95, ttl: float = 86400, max_entries_per_user: int = 500,
+                 max_users: int = 1024):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries_per_user = max_entries_per_user
+        self.max_users = max_users
+        self.hits = 0
+        self.misses = 0
+        self._users = OrderedDict()  # user_id -> list[_Entry], least recently used user first
+        self._lock = threading.Lock()
+
+    def lookup(self, user_id: int, embedding, fingerprint: str):
+        """
+        Returns (draft, similarity) of the best matching live entry, or (None, best similarity or None).
+        """
+        query = _unit(embedding)
+        now = time.monotonic()
+        with self._lock:
+            entries = self._users.get(user_id)
+            if entries:
+                entries[:] = [e for e in entries if now - e.created_at < self.ttl]
+            candidates = [e for e in entries or () if e.fingerprint == fingerprint]
+            if not candidates:
+                self.misses += 1
+                return None, None
+            similarities = np.stack([e.vector for e in candidates]) @ query
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                self.misses += 1
+                return None, similarity
+            entry = candidates[best]
+            entry.last_used = now
+            entry.hits += 1
+            self._users.move_to_end(user_id)
+            self.hits += 1
+            return entry.draft, similarity
+
+    def store(self, user_id: int, embedding, fingerprint: str, draft: str):
+        now = time.monotonic()
+        with self._lock:
+            entries = self._users.setdefault(user_id, [])
+            entries.append(_Entry(_unit(embedding), fingerprint, draft, created_at=now, last_used=now))
+            if len(entries) > self.max_entries_per_user:
+                entries.remove(min(entries, key=lambda e: e.last_used))
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "users": len(self._users),
+                "entries": sum(len(entries) for entries in self._users.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "threshold": self.threshold,
+            }
+
+response_cache = SemanticResponseCache(
+    threshold=settings.RESPONSE_CACHE_THRESHOLD,
+    ttl=settings.RESPONSE_CACHE_TTL,
+    max_entries_per_user=settings.RESPONSE_CACHE_MAX_PER_USER,
+    max_users=settings.RESPONSE_CACHE_MAX_USERS,
+)
+
+def lookup_draft(user_id: int, cleaned_text: str, documents: list[str]):
+    """
+    Looks up a cached draft for this email and context. Returns a DraftLookup,
+    or None when the cache is disabled or embeddings are unavailable.
+    """
+    from app.services import rag_service
+    if not settings.RESPONSE_CACHE_ENABLED or not rag_service.ML_AVAILABLE or not cleaned_text:
+        return None
+    # Normally a query-embedding cache hit: retrieval just embedded the same text
+    lookup = DraftLookup(embedding=_unit(rag_service.embed_query(cleaned_text)),
+                         fingerprint=context_fingerprint(documents))
+    lookup.draft, lookup.similarity = response_cache.lookup(user_id, lookup.embedding, lookup.fingerprint)
+    return lookup
+
+def store_draft(user_id: int, lookup, draft: str):
+    if lookup is not None and draft:
+        response_cache.store(user_id, lookup.embedding, lookup.fingerprint, draft)
+
+def invalidate_user(user_id: int):
+    response_cache.invalidate_user(user_id)
+
+def cache_stats() -> dict:
+    return {"enabled": settings.RESPONSE_CACHE_ENABLED, **response_cache.stats()}
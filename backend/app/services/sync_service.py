@@ -0,0 +1,173 @@
+import threading
+from datetime import datetime
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.core import metrics
+from app.models.user import User
+from app.models.sync_state import GmailSyncState, IndexedMessage
+from app.services import gmail_service, cleaning_service, mime_service, rag_service
+
+# One sync at a time per user in this process (inline endpoint and jobs alike);
+# across processes, _mark_indexed's insert-or-ignore (SQLite, PostgreSQL) keeps concurrent syncs safe.
+_user_locks = {}  # user_id -> threading.Lock
+_user_locks_guard = threading.Lock()
+_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+LOCK_POLL_INTERVAL = 0.5  # seconds between cancellation checks while waiting for the lock
+
+class SyncInProgressError(Exception):
+    pass
+
+def _user_lock(user_id: int) -> threading.Lock:
+    with _user_locks_guard:
+        return _user_locks.setdefault(user_id, threading.Lock())
+
+def _mark_indexed(db: Session, user_id: int, message_ids: list[str]):
+    """
+    Records message ids as processed, skipping ids another sync already recorded
+    (instead of failing the commit on uq_indexed_message).
+    """
+    if not message_ids:
+        return
+    insert = _INSERTS.get(db.get_bind().dialect.name)
+    if insert is None:
+        # Other databases: insert only the ids not stored yet (the per-user lock
+        # still serializes syncs within this process)
+        stored = {
+            row.message_id for row in db.query(IndexedMessage.message_id).filter(
+                IndexedMessage.user_id == user_id,
+                IndexedMessage.message_id.in_(message_ids)
+            )
+        }
+        db.add_all(IndexedMessage(user_id=user_id, message_id=message_id)
+                   for message_id in dict.fromkeys(message_ids) if message_id not in stored)
+        return
+    db.execute(
+        insert(IndexedMessage).on_conflict_do_nothing(index_elements=["user_id", "message_id"]),
+        [{"user_id": user_id, "message_id": message_id} for message_id in message_ids]
+    )
+
+def _report(progress, **counts):
+    if progress:
+        progress(**counts)
+
+def _never_cancelled():
+    return None
+
+def sync_sent_emails(db: Session, user: User, limit: int = 20, full: bool = False,
+                     progress=None, check_cancelled=_never_cancelled, wait: bool = True):
+    """
+    Fetches past sent emails, cleans them, and indexes them into the vector DB.
+    After the first (full) sync, only messages added to SENT since the stored
+    historyId cursor are processed. `full=True` forces a backfill of the last
+    `limit` sent emails.
+    If some messages still fail to fetch after retries, the cursor is not
+    advanced and the result has status "partial" with their failed_count.
+    progress: optional callable receiving counter increments (messages_fetched=..., chunks_embedded=...)
+    check_cancelled: called between stages; raise from it to abort the sync.
+    wait: if another sync of this user is running, wait for it (True) or raise
+    SyncInProgressError (False).
+    The caller owns the session and rolls back on error.
+    """
+    lock = _user_lock(user.id)
+    if not lock.acquire(blocking=False):
+        if not wait:
+            raise SyncInProgressError("A sync is already running for this account")
+        while not lock.acquire(timeout=LOCK_POLL_INTERVAL):
+            check_cancelled()
+    try:
+        return _sync_sent_emails(db, user, limit, full, progress, check_cancelled)
+    finally:
+        lock.release()
+
+def _sync_sent_emails(db: Session, user: User, limit: int, full: bool, progress, check_cancelled):
+    service = gmail_service.get_gmail_service(user)
+    state = db.query(GmailSyncState).filter(GmailSyncState.user_id == user.id).first()
+    if not state:
+        state = GmailSyncState(user_id=user.id)
+        db.add(state)
+
+    # 1. Work out which sent emails are new
+    mode = "incremental"
+    new_ids = None
+    with metrics.span("sync.list"):
+        if state.history_id and not full:
+            try:
+                new_ids, latest_history_id = gmail_service.list_new_message_ids(
+                    service, state.history_id, label_id='SENT'
+                )
+            except gmail_service.HistoryExpiredError:
+                new_ids = None  # cursor too old, fall back to a backfill
+
+        if new_ids is None:
+            mode = "full"
+            # Read the cursor before listing so nothing sent meanwhile is missed
+            latest_history_id = gmail_service.get_history_id(service)
+            messages = gmail_service.list_emails(service, label_ids=['SENT'], max_results=limit)
+            new_ids = [msg['id'] for msg in messages]
+            state.last_full_sync_at = datetime.utcnow()
+
+    already_indexed = set()
+    if new_ids:
+        already_indexed = {
+            row.message_id for row in db.query(IndexedMessage.message_id).filter(
+                IndexedMessage.user_id == user.id,
+                IndexedMessage.message_id.in_(new_ids)
+            )
+        }
+    to_fetch = [msg_id for msg_id in new_ids if msg_id not in already_indexed]
+
+    _report(progress, messages_listed=len(new_ids), already_indexed=len(already_indexed))
+    check_cancelled()
+
+    # 2. Get full content, batched
+    with metrics.span("sync.fetch"):
+        failed_ids = []
+        full_msgs = gmail_service.get_email_details_batch(service, to_fetch, failed_ids=failed_ids)
+    _report(progress, messages_fetched=len(full_msgs), errors=len(to_fetch) - len(full_msgs))
+    check_cancelled()
+    
+    with metrics.span("sync.decode"):
+        # Body of each message (nested multipart, declared charsets); the snippet if it has none
+        email_texts = [mime_service.extract_body(full_msg) for full_msg in full_msgs]
+
+    # 3. Clean (batched; plain-text bodies skip HTML parsing)
+    with metrics.span("sync.clean"):
+        cleaned_texts = cleaning_service.clean_email_bodies(email_texts)
+
+    to_index = []
+    for full_msg, cleaned_text in zip(full_msgs, cleaned_texts):
+        if len(cleaned_text) < 50: # Skip very short emails
+            continue
+            
+        to_index.append({
+            "text": cleaned_text,
+            "metadata": {"source": "sent_email", "email_id": full_msg['id']},
+            "doc_id_prefix": f"email_{full_msg['id']}"
+        })
+
+    # 4. Index all emails together (large embedding batches, few upserts)
+    with metrics.span("sync.index"):
+        index_stats = rag_service.add_documents_bulk(
+            user.id, to_index,
+            on_batch=lambda n_chunks: _report(progress, chunks_embedded=n_chunks)
+        )
+
+    # 5. Remember every fetched message, even the skipped ones, so none is re-fetched.
+    # Advance the cursor unless Gmail kept failing on some messages: with the
+    # old cursor the next sync lists them again (the indexed ones are skipped)
+    _mark_indexed(db, user.id, [full_msg['id'] for full_msg in full_msgs])
+    if not failed_ids:
+        state.history_id = str(latest_history_id) if latest_history_id else state.history_id
+    state.last_synced_at = datetime.utcnow()
+    db.commit()
+
+    return {
+        "status": "partial" if failed_ids else "success",
+        "synced_count": len(to_index),
+        "mode": mode,
+        "fetched_count": len(full_msgs),
+        "failed_count": len(failed_ids),
+        "already_indexed_count": len(already_indexed),
+        "chunks_indexed": index_stats["chunks"],
+        "chunks_per_sec": index_stats["chunks_per_sec"]
+    }
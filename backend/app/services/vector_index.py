@@ -0,0 +1,297 @@
+"""
+Compact in-process vector index for one tenant's chunks, an alternative to a
+Chroma collection for small tenants (see LOCAL_INDEX_ENABLED in rag_service).
+
+Layout of an index directory:
+    vectors.f16 - L2-normalised embeddings, one float16 row per chunk, memory-mapped
+    chunks.db   - SQLite sidecar: chunk id -> row, document text and metadata
+
+Search is an exact (brute-force) dot product over all rows and a vectorized
+top-k: below ~10k chunks that is cheaper than an HNSW lookup in Chroma, and
+the matrix takes half the memory of float32. Deleted rows are masked out and
+reused by later inserts. Upsert / query / delete mirror the Chroma collection
+calls rag_service makes, and query returns the same result shape.
+"""
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+import numpy as np
+
+VECTORS_FILE = "vectors.f16"
+CHUNKS_FILE = "chunks.db"
+MIN_CAPACITY = 1024  # rows allocated up front; the file doubles when full
+BLOCK_ROWS = 1024  # float16 rows upcast at a time when scoring straight from the file
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+class MatrixCache:
+    """
+    LRU of float32 copies of recently queried index matrices, bounded in bytes.
+    Scoring a float32 matrix is several times faster than upcasting the float16
+    file block by block on every query; indexes that do not fit use the file.
+    """
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # index -> float32 matrix
+        self._lock = threading.Lock()
+
+    def get(self, index):
+        with self._lock:
+            matrix = self._data.get(index)
+            if matrix is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(index)
+            self.hits += 1
+            return matrix
+
+    def put(self, index, matrix: np.ndarray):
+        if matrix.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(index, None)
+            if old is not None:
+                self.bytes -= old.nbytes
+            self._data[index] = matrix
+            self.bytes += matrix.nbytes
+            while self.bytes > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self.bytes -= evicted.nbytes
+
+    def discard(self, index):
+        with self._lock:
+            matrix = self._data.pop(index, None)
+            if matrix is not None:
+                self.bytes -= matrix.nbytes
+
+    def stats(self) -> dict:
+        return {"matrices": len(self._data), "mb": round(self.bytes / (1024 * 1024), 1),
+                "max_mb": round(self.max_bytes / (1024 * 1024), 1), "hits": self.hits, "misses": self.misses}
+
+class LocalVectorIndex:
+    """
+    One tenant's chunks in `path`. Thread-safe; callers that must see a
+    consistent index across several calls hold `lock` (re-entrant). Once
+    closed (or destroyed), every call raises ValueError.
+    """
+    def __init__(self, path: str, matrix_cache: MatrixCache = None):
+        self.path = path
+        self.lock = threading.RLock()
+        self.closed = False
+        self._matrix_cache = matrix_cache
+        os.makedirs(path, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(path, CHUNKS_FILE), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " id TEXT PRIMARY KEY,"
+            " row INTEGER NOT NULL UNIQUE,"
+            " document TEXT,"
+            " metadata TEXT)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.commit()
+        self._rows = dict(self._conn.execute("SELECT id, row FROM chunks"))  # chunk id -> row
+        dim = self._conn.execute("SELECT value FROM info WHERE key = 'dim'").fetchone()
+        self.dim = int(dim[0]) if dim else None
+        self._matrix = None
+        self._live = np.zeros(0, dtype=bool)  # rows holding a chunk
+        if self.dim:
+            self._map(max(MIN_CAPACITY, max(self._rows.values(), default=-1) + 1))
+            self._live[list(self._rows.values())] = True
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(path, CHUNKS_FILE))
+
+    def _map(self, min_capacity: int):
+        # (Re)map the vectors file, growing it to at least min_capacity rows
+        file_path = os.path.join(self.path, VECTORS_FILE)
+        row_bytes = self.dim * np.dtype(np.float16).itemsize
+        size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+        if size < min_capacity * row_bytes:
+            with open(file_path, "ab") as f:
+                f.truncate(min_capacity * row_bytes)
+            size = min_capacity * row_bytes
+        if self._matrix is not None:
+            self._matrix.flush()
+        capacity = size // row_bytes
+        self._matrix = np.memmap(file_path, dtype=np.float16, mode="r+", shape=(capacity, self.dim))
+        live = np.zeros(capacity, dtype=bool)
+        live[:len(self._live)] = self._live
+        self._live = live
+
+    def _check_open(self):
+        if self.closed:
+            raise ValueError(f"Vector index {self.path} is closed")
+
+    def count(self) -> int:
+        return len(self._rows)
+
+    def upsert(self, ids: list[str], embeddings, documents: list[str] = None, metadatas: list[dict] = None):
+        """
+        Inserts chunks, or replaces those whose id is already in the index.
+        """
+        if not ids:
+            return
+        if len(set(ids)) != len(ids):
+            raise ValueError("Duplicate ids in upsert")
+        vectors = _normalize(np.asarray(embeddings, dtype=np.float32))
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [None] * len(ids)
+        with self.lock:
+            self._check_open()
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self._conn.execute("INSERT INTO info (key, value) VALUES ('dim', ?)", (str(self.dim),))
+                self._map(MIN_CAPACITY)
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match the index ({self.dim})")
+
+            new_ids = [chunk_id for chunk_id in ids if chunk_id not in self._rows]
+            free = np.flatnonzero(~self._live)
+            if len(free) < len(new_ids):
+                capacity = len(self._live)
+                self._map(max(capacity * 2, capacity + len(new_ids) - len(free)))
+                free = np.flatnonzero(~self._live)
+            assigned = dict(zip(new_ids, free.tolist()))
+            rows = [self._rows.get(chunk_id, assigned.get(chunk_id)) for chunk_id in ids]
+
+            # Vectors first: rows are only reachable once the sidecar commit names them
+            self._matrix[rows] = vectors.astype(np.float16)
+            self._matrix.flush()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (id, row, document, metadata) VALUES (?, ?, ?, ?)",
+                [(chunk_id, row, document, json.dumps(metadata) if metadata is not None else None)
+                 for chunk_id, row, document, metadata in zip(ids, rows, documents, metadatas)]
+            )
+            self._conn.commit()
+            self._rows.update(zip(ids, rows))
+            self._live[rows] = True
+            if self._matrix_cache is not None:
+                self._matrix_cache.discard(self)
+
+    def delete(self, ids: list[str]) -> int:
+        """
+        Removes chunks by id (unknown ids are ignored). Returns the number removed.
+        """
+        with self.lock:
+            self._check_open()
+            removed = [chunk_id for chunk_id in ids if chunk_id in self._rows]
+            if not removed:
+                return 0
+            self._conn.executemany("DELETE FROM chunks WHERE id = ?", [(chunk_id,) for chunk_id in removed])
+            self._conn.commit()
+            self._live[[self._rows.pop(chunk_id) for chunk_id in removed]] = False
+            if self._matrix_cache is not None:
+                self._matrix_cache.discard(self)
+            return len(removed)
+
+    def _scores(self, queries: np.ndarray, used: int) -> np.ndarray:
+        # (n_queries, used) dot products with the first `used` rows, from the
+        # float32 copy when there is one. Scanning is memory-bound: rows past the
+        # last live one are never read, and the matrix is the left operand.
+        matrix = self._matrix_cache.get(self) if self._matrix_cache is not None else None
+        if matrix is None and self._matrix_cache is not None and used * self.dim * 4 <= self._matrix_cache.max_bytes:
+            matrix = np.array(self._matrix[:used], dtype=np.float32)
+            self._matrix_cache.put(self, matrix)
+        if matrix is not None:
+            return (matrix @ queries.T).T
+        scores = np.empty((len(queries), used), dtype=np.float32)
+        for start in range(0, used, BLOCK_ROWS):
+            block = self._matrix[start:min(start + BLOCK_ROWS, used)].astype(np.float32)
+            scores[:, start:start + len(block)] = (block @ queries.T).T
+        return scores
+
+    def query(self, query_embeddings, n_results: int = 3) -> dict:
+        """
+        Exact nearest neighbours of each query embedding, best first. Distances
+        are squared L2 between unit vectors (2 - 2 * cosine), as Chroma's
+        default space reports them.
+        """
+        queries = _normalize(np.asarray(query_embeddings, dtype=np.float32))
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        with self.lock:
+            self._check_open()
+            k = min(n_results, len(self._rows))
+            if k == 0:
+                for key in results:
+                    results[key] = [[] for _ in queries]
+                return results
+            used = int(np.flatnonzero(self._live)[-1]) + 1  # inserts take the lowest free rows
+            scores = self._scores(queries, used)
+            scores[:, ~self._live[:used]] = -np.inf
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+            wanted = sorted(set(top.ravel().tolist()))
+            placeholders = ",".join("?" * len(wanted))
+            by_row = {row: (chunk_id, document, metadata) for row, chunk_id, document, metadata in self._conn.execute(
+                f"SELECT row, id, document, metadata FROM chunks WHERE row IN ({placeholders})", wanted
+            )}
+        for rows, row_scores in zip(top.tolist(), top_scores.tolist()):
+            chunks = [by_row[row] for row in rows]
+            results["ids"].append([chunk_id for chunk_id, _, _ in chunks])
+            results["documents"].append([document for _, document, _ in chunks])
+            results["metadatas"].append([json.loads(metadata) if metadata else None for _, _, metadata in chunks])
+            results["distances"].append([round(max(0.0, 2.0 - 2.0 * score), 6) for score in row_scores])
+        return results
+
+    def pages(self, page_size: int = 1000):
+        """
+        Yields every chunk as upsert() keyword arguments, page_size at a time
+        (for copying the index into another store). Hold `lock` while iterating.
+        """
+        self._check_open()
+        offset = 0
+        while True:
+            page = self._conn.execute(
+                "SELECT id, row, document, metadata FROM chunks ORDER BY row LIMIT ? OFFSET ?", (page_size, offset)
+            ).fetchall()
+            if not page:
+                return
+            offset += len(page)
+            yield {
+                "ids": [chunk_id for chunk_id, _, _, _ in page],
+                "embeddings": self._matrix[[row for _, row, _, _ in page]].astype(np.float32).tolist(),
+                "documents": [document for _, _, document, _ in page],
+                "metadatas": [json.loads(metadata) if metadata else None for _, _, _, metadata in page],
+            }
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            if self._matrix_cache is not None:
+                self._matrix_cache.discard(self)
+            if self._matrix is not None:
+                self._matrix.flush()
+                self._matrix = None
+            self._conn.close()
+
+    def destroy(self):
+        """
+        Closes the index and deletes its files.
+        """
+        with self.lock:
+            self.close()
+            for name in (VECTORS_FILE, CHUNKS_FILE, CHUNKS_FILE + "-wal", CHUNKS_FILE + "-shm"):
+                file_path = os.path.join(self.path, name)
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+
+    def stats(self) -> dict:
+        return {"chunks": len(self._rows), "capacity": len(self._live), "dim": self.dim}
@@ -0,0 +1,12 @@
+"""
+Offline benchmarks. Run from the backend directory, e.g.
+
+    python -m benchmarks.bench_gmail_batch
+
+Settings are required at import time by app.core.config, so dummy values are
+provided here for anything not already set in the environment or .env.
+"""
+import os
+
+for _key in ("SECRET_KEY", "GROQ_API_KEY", "GOOGLE_CLIENT_ID", "GOOGLE_CLIENT_SECRET"):
+    os.environ.setdefault(_key, "benchmark")
@@ -0,0 +1,117 @@
+"""
+Per-request authentication overhead: the previous synchronous get_current_user
+(JWT decode + blocking SQLAlchemy query in the threadpool) vs. the current one,
+on user-cache misses (the same pooled query, run from the event loop in the
+threadpool) and hits (no query). Runs against a temporary SQLite database,
+through a minimal ASGI app so dependency resolution is included.
+
+    python -m benchmarks.bench_auth --users 200 --requests 2000 --concurrency 32
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+_db_dir = tempfile.mkdtemp(prefix="bench_auth_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/bench.db"
+
+import httpx
+from fastapi import Depends, FastAPI, HTTPException
+from jose import jwt, JWTError
+
+from app.api import deps
+from app.core import security
+from app.core.config import settings
+from app.core.database import Base, SessionLocal, engine
+from app.models.user import User
+
+
+def legacy_get_current_user(token: str = Depends(deps.oauth2_scheme)):
+    # get_current_user as it was: decode, then a fresh session and a blocking query
+    db = SessionLocal()
+    try:
+        try:
+            user_id = jwt.decode(token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]).get("sub")
+        except JWTError:
+            raise HTTPException(status_code=401)
+        user = db.query(User).filter(User.id == int(user_id)).first()
+        if user is None:
+            raise HTTPException(status_code=401)
+        return user
+    finally:
+        db.close()
+
+
+def build_app():
+    app = FastAPI()
+
+    @app.get("/legacy")
+    def legacy(user: User = Depends(legacy_get_current_user)):
+        return {"id": user.id}
+
+    @app.get("/current")
+    def current(user: User = Depends(deps.get_current_user)):
+        return {"id": user.id}
+
+    return app
+
+
+async def measure(client, path, tokens, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(token):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get(path, headers={"Authorization": f"Bearer {token}"})
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.text
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(random.choice(tokens)) for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "req_per_sec": requests / elapsed,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+    }
+
+
+async def run(args):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    users = [User(email=f"user{i}@example.com", google_sub=f"sub{i}") for i in range(args.users)]
+    db.add_all(users)
+    db.commit()
+    tokens = [security.create_access_token(subject=user.id) for user in users]
+    db.close()
+
+    transport = httpx.ASGITransport(app=build_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        cases = [("sync query (before)", "/legacy", None),
+                 ("cache miss", "/current", 0),
+                 ("cache hit", "/current", settings.AUTH_USER_CACHE_TTL or 30)]
+        for label, path, ttl in cases:
+            if ttl is not None:
+                settings.AUTH_USER_CACHE_TTL = ttl
+                deps.user_cache.clear()
+            await measure(client, path, tokens, min(200, args.requests), args.concurrency)  # warm pools
+            result = await measure(client, path, tokens, args.requests, args.concurrency)
+            print(f"{label:>20}: {result['req_per_sec']:7.0f} req/s  mean {result['mean_ms']:6.2f} ms  "
+                  f"p95 {result['p95_ms']:6.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Per-email add_document vs. add_documents_bulk indexing throughput.
+Uses the real embedding model and an in-memory Chroma client.
+
+    python -m benchmarks.bench_bulk_indexing --emails 200
+"""
+import argparse
+import random
+import time
+
+import chromadb
+
+from app.services import rag_service
+
+
+def synthetic_emails(n, seed=0):
+    rng = random.Random(seed)
+    words = ("refund order shipping invoice account delay policy customer support "
+             "warehouse tracking payment return exchange warranty").split()
+    for i in range(n):
+        length = rng.randint(60, 400)
+        yield {
+            "text": " ".join(rng.choice(words) for _ in range(length)),
+            "metadata": {"source": "sent_email", "email_id": f"m{i}"},
+            "doc_id_prefix": f"email_m{i}",
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--emails", type=int, default=200)
+    args = parser.parse_args()
+
+    rag_service.chroma_client = chromadb.EphemeralClient()
+    emails = list(synthetic_emails(args.emails))
+    rag_service.get_embedding_model().encode(["warmup"])
+
+    start = time.perf_counter()
+    chunks = sum(rag_service.add_document(1, e["text"], e["metadata"], e["doc_id_prefix"]) for e in emails)
+    elapsed = time.perf_counter() - start
+    print(f"  per-email: {chunks} chunks in {elapsed:.2f}s ({chunks / elapsed:.1f} chunks/sec)")
+
+    stats = rag_service.add_documents_bulk(2, emails)
+    print(f"       bulk: {stats['chunks']} chunks in {stats['seconds']:.2f}s ({stats['chunks_per_sec']} chunks/sec)")
+
+
+if __name__ == "__main__":
+    main()
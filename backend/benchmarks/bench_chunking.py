@@ -0,0 +1,89 @@
+"""
+Fixed 1000-char slicer (previous behaviour) vs. the boundary-aware token chunker.
+Reports chunk counts, tokens sent to the model, chunks the model would truncate,
+chunking time and, with --embed, end-to-end encode throughput.
+
+    python -m benchmarks.bench_chunking --docs 200 --embed
+"""
+import argparse
+import random
+import time
+
+from app.services import chunking_service, rag_service
+
+MODEL_MAX_TOKENS = 256
+
+
+def fixed_slicer(text, chunk_size=1000, overlap=100):
+    chunks = []
+    start = 0
+    while start < len(text):
+        chunks.append(text[start:start + chunk_size])
+        start += chunk_size - overlap
+    return chunks
+
+
+def synthetic_corpus(n_docs, seed=0):
+    rng = random.Random(seed)
+    words = ("refund order shipping invoice account delay policy customer support warehouse "
+             "tracking payment return exchange warranty eligible business days receipt").split()
+    docs = []
+    for i in range(n_docs):
+        source = "policy" if i % 4 == 0 else "sent_email"
+        n_paragraphs = rng.randint(8, 30) if source == "policy" else rng.randint(1, 5)
+        paragraphs = []
+        for _ in range(n_paragraphs):
+            sentences = [
+                " ".join(rng.choice(words) for _ in range(rng.randint(6, 25))).capitalize() + "."
+                for _ in range(rng.randint(2, 7))
+            ]
+            paragraphs.append(" ".join(sentences))
+        docs.append((source, "\n\n".join(paragraphs)))
+    return docs
+
+
+def summarize(name, chunk_lists, seconds, count_tokens):
+    chunks = [c for chunks in chunk_lists for c in chunks]
+    tokens = [count_tokens(c) for c in chunks]
+    truncated = sum(1 for t in tokens if t > MODEL_MAX_TOKENS)
+    print(f"{name:>12}: {len(chunks):6d} chunks, {sum(tokens):8d} tokens, "
+          f"{truncated:5d} truncated by the model, chunked in {seconds * 1000:.1f} ms")
+    return chunks
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--embed", action="store_true", help="also time encoding with the real model")
+    args = parser.parse_args()
+
+    docs = synthetic_corpus(args.docs)
+    count_tokens = chunking_service.approx_token_count
+    if args.embed:
+        rag_service.get_embedding_model()
+        count_tokens = rag_service.count_tokens
+
+    results = {}
+    start = time.perf_counter()
+    fixed = [fixed_slicer(text) for _, text in docs]
+    results["fixed-1000"] = summarize("fixed-1000", fixed, time.perf_counter() - start, count_tokens)
+
+    start = time.perf_counter()
+    bounded = [
+        chunking_service.chunk_text(text, chunking_service.config_for(source), count_tokens=count_tokens)
+        for source, text in docs
+    ]
+    results["token-aware"] = summarize("token-aware", bounded, time.perf_counter() - start, count_tokens)
+
+    if args.embed:
+        model = rag_service.get_embedding_model()
+        model.encode(["warmup"])
+        for name, chunks in results.items():
+            start = time.perf_counter()
+            model.encode(chunks, batch_size=rag_service.EMBED_BATCH_SIZE)
+            elapsed = time.perf_counter() - start
+            print(f"{name:>12}: encoded {len(docs) / elapsed:.1f} docs/sec ({len(chunks) / elapsed:.1f} chunks/sec)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Previous clean_email_body (BeautifulSoup on every body, regex strings per line)
+vs. the fast-path EmailCleaner, on a mixed HTML / plain-text corpus.
+Fails if the cleaned output differs for any body.
+
+    python -m benchmarks.bench_cleaning --emails 2000 --backend html.parser
+"""
+import argparse
+import re
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from app.services.cleaning_service import EmailCleaner
+from benchmarks.email_corpus import build_corpus
+
+
+def legacy_clean_email_body(html_content):
+    if not html_content:
+        return ""
+    soup = BeautifulSoup(html_content, "html.parser")
+    text = soup.get_text(separator="\n")
+    text = re.sub(r'\n\s*\n', '\n\n', text)
+    lines = text.split('\n')
+    cleaned_lines = []
+    for line in lines:
+        if line.strip().startswith('>'):
+            continue
+        if re.match(r'On .* wrote:', line):
+            break
+        if re.match(r'From: .*', line):
+            break
+        cleaned_lines.append(line)
+    return "\n".join(cleaned_lines).strip()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--emails", type=int, default=2000)
+    parser.add_argument("--backend", default="html.parser", help="html.parser | lxml | auto")
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.emails)
+    cleaner = EmailCleaner(html_backend=args.backend)
+    plain = sum(1 for body in corpus if not cleaner.looks_like_html(body))
+
+    start = time.perf_counter()
+    expected = [legacy_clean_email_body(body) for body in corpus]
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = [cleaner.clean(body) for body in corpus]
+    fast_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cleaner.clean_many(corpus)
+    batch_seconds = time.perf_counter() - start
+
+    mismatches = [i for i, (a, b) in enumerate(zip(expected, actual)) if a != b]
+    print(f"corpus: {len(corpus)} emails ({plain} plain text), backend={cleaner.html_backend}")
+    print(f"  legacy: {legacy_seconds * 1000:8.1f} ms")
+    print(f"    fast: {fast_seconds * 1000:8.1f} ms  ({legacy_seconds / fast_seconds:.1f}x)")
+    print(f"   batch: {batch_seconds * 1000:8.1f} ms  ({legacy_seconds / batch_seconds:.1f}x)")
+    print(f"mismatches: {len(mismatches)}")
+    if mismatches:
+        i = mismatches[0]
+        print(f"first mismatch (#{i}):\n--- legacy\n{expected[i]!r}\n--- fast\n{actual[i]!r}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
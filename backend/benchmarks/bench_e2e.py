@@ -0,0 +1,299 @@
+"""
+End-to-end benchmark of the FastAPI app, driven in-process (httpx ASGI
+transport, lifespan included) against local fakes only:
+
+- Gmail: one synthetic FakeMailbox with SENT and INBOX messages. Sync reads it
+  through the googleapiclient stand-in, the async client through
+  fake_gmail_server; both add `--gmail-latency` per call.
+- Groq: fake_llm with `--llm-token-delay` per token.
+- Embeddings: a deterministic feature-hashing embedder and word tokenizer
+  (`--embedder hash`, the default, no model download) or the real model on EMBEDDING_BACKEND (`real`).
+
+Reports sync messages/sec and chunks/sec, and p50/p95/p99 latency of
+/gmail/inbox (page cache warm and cold) and /generate/draft. Results are
+written as JSON tagged with the git commit; `--compare` prints the change
+against an earlier results file.
+
+    python -m benchmarks.bench_e2e --sent 500 --inbox 200 --requests 200 --concurrency 8 --output e2e.json
+    python -m benchmarks.bench_e2e --compare e2e.json
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from benchmarks.email_corpus import build_corpus
+from benchmarks.fake_gmail import build_mailbox, make_message
+from benchmarks.fake_gmail_server import start_fake_gmail
+from benchmarks.fake_llm import start_fake_llm
+
+API = "/api/v1"
+_TOKEN_RE = re.compile(r"\w+")
+_WORD_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+
+
+class HashEmbedder:
+    """
+    Deterministic stand-in for SentenceTransformer: hashed bag of words,
+    L2-normalised. Similar texts get similar vectors, at no model cost.
+    """
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        import numpy as np
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in _TOKEN_RE.findall(text.lower()):
+                digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+                index = int.from_bytes(digest[:4], "little") % self.dim
+                vectors[row, index] += 1.0 if digest[4] & 1 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class WordTokenizer:
+    """
+    Stand-in for the model tokenizer with the hash embedder: words and punctuation.
+    """
+    def tokenize(self, text):
+        return _WORD_PIECE_RE.findall(text)
+
+
+def build_mailbox_for(args):
+    mailbox = build_mailbox(args.sent, label="SENT", seed=args.seed)
+    for i, body in enumerate(build_corpus(args.inbox, seed=args.seed + 1)):
+        mailbox.add_message(make_message(f"i{i:06d}", f"Question #{i}", "Customer <c@example.com>", body,
+                                         label_ids=["INBOX"]))
+    return mailbox
+
+
+def percentiles(latencies) -> dict:
+    ordered = sorted(latencies)
+    if not ordered:
+        return {}
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+    return {
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+        "p50_ms": round(rank(50) * 1000, 2),
+        "p95_ms": round(rank(95) * 1000, 2),
+        "p99_ms": round(rank(99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+async def measure(n_requests, concurrency, send, warmup: int = 0) -> dict:
+    """
+    Runs `send(i)` n_requests times with at most `concurrency` in flight, after
+    `warmup` untimed calls (lazy clients, first index load); returns request
+    counts, throughput and latency percentiles.
+    """
+    for i in range(warmup):
+        await send(i)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await send(i)
+            elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            errors += 1
+        else:
+            latencies.append(elapsed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n_requests)))
+    wall = time.perf_counter() - started
+    return {"requests": n_requests, "errors": errors, "concurrency": concurrency,
+            "requests_per_sec": round(n_requests / wall, 1), **percentiles(latencies)}
+
+
+async def run(args, gmail_server, llm_server) -> dict:
+    import httpx
+    import main
+    from app.core import security
+    from app.core.database import SessionLocal
+    from app.models.user import User
+    from app.services import inbox_service
+
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app), httpx.AsyncClient(transport=transport, base_url="http://bench",
+                                                          timeout=None) as client:
+        db = SessionLocal()
+        user = User(email="bench@example.com", google_sub="bench", access_token="token",
+                    refresh_token="refresh")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+        db.close()
+        headers = {"Authorization": f"Bearer {security.create_access_token(user_id)}"}
+
+        # 1. Full sync of the SENT mailbox: fetch, clean, chunk, embed, index
+        started = time.perf_counter()
+        response = await client.post(f"{API}/gmail/sync-sent", params={"limit": args.sent, "full": True},
+                                     headers=headers)
+        elapsed = time.perf_counter() - started
+        response.raise_for_status()
+        sync = response.json()
+        results["sync"] = {
+            "messages": sync["fetched_count"],
+            "chunks": sync["chunks_indexed"],
+            "seconds": round(elapsed, 3),
+            "messages_per_sec": round(sync["fetched_count"] / elapsed, 1),
+            "chunks_per_sec": round(sync["chunks_indexed"] / elapsed, 1),
+            "indexing_chunks_per_sec": sync["chunks_per_sec"],
+        }
+
+        # 2. Inbox: warm (page cache, historyId check only) and cold (rebuilt every time)
+        async def inbox(i):
+            return await client.get(f"{API}/gmail/inbox", params={"max_results": args.page_size},
+                                    headers=headers)
+
+        async def inbox_cold(i):
+            inbox_service.invalidate_user(user_id)
+            return await inbox(i)
+
+        for section, send in (("inbox", inbox), ("inbox_cold", inbox_cold)):
+            gmail_calls = gmail_server.requests_served
+            results[section] = await measure(args.inbox_requests, args.concurrency, send, args.warmup)
+            results[section]["gmail_calls"] = gmail_server.requests_served - gmail_calls
+
+        # 3. Drafts for incoming emails (retrieval, context packing, LLM)
+        emails = build_corpus(args.requests, seed=args.seed + 2)
+
+        async def draft(i):
+            return await client.post(f"{API}/generate/draft", json={"email_text": emails[i]}, headers=headers)
+
+        await measure(args.warmup, 1, lambda i: client.post(
+            f"{API}/generate/draft", json={"email_text": f"Warm-up question {i}"}, headers=headers))
+        llm_calls = llm_server.requests_served
+        results["draft"] = await measure(args.requests, args.concurrency, draft)
+        results["draft"]["llm_calls"] = llm_server.requests_served - llm_calls
+
+        internal = {"Authorization": f"Bearer {os.environ['INTERNAL_API_TOKEN']}"}
+        results["stats"] = (await client.get("/stats", headers=internal)).json()
+    return results
+
+
+def git_commit() -> str:
+    try:
+        # The checkout this file belongs to, whatever directory the benchmark runs from
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+HEADLINE = [
+    ("sync", "messages_per_sec", True),
+    ("sync", "chunks_per_sec", True),
+    ("inbox", "p50_ms", False), ("inbox", "p95_ms", False), ("inbox", "p99_ms", False),
+    ("inbox_cold", "p50_ms", False), ("inbox_cold", "p95_ms", False), ("inbox_cold", "p99_ms", False),
+    ("draft", "p50_ms", False), ("draft", "p95_ms", False), ("draft", "p99_ms", False),
+]
+
+
+def print_report(results: dict, baseline: dict = None):
+    for section, key, higher_is_better in HEADLINE:
+        value = results["results"][section][key]
+        line = f"{section + '.' + key:>24}: {value:>10}"
+        old = (baseline or {}).get("results", {}).get(section, {}).get(key) if baseline else None
+        if old:
+            change = (value - old) / old * 100
+            better = change > 0 if higher_is_better else change < 0
+            line += f"  (was {old}, {change:+.1f}%{'' if abs(change) < 5 else ' better' if better else ' worse'})"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sent", type=int, default=500, help="SENT messages to sync")
+    parser.add_argument("--inbox", type=int, default=200, help="INBOX messages")
+    parser.add_argument("--page-size", type=int, default=25)
+    parser.add_argument("--requests", type=int, default=200, help="/generate/draft requests")
+    parser.add_argument("--inbox-requests", type=int, default=100, help="/gmail/inbox requests per mode")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=3, help="untimed requests before each phase")
+    parser.add_argument("--gmail-latency", type=float, default=0.02, help="seconds per fake Gmail call")
+    parser.add_argument("--llm-token-delay", type=float, default=0.0, help="seconds per fake LLM token")
+    parser.add_argument("--embedder", choices=("hash", "real"), default="hash")
+    parser.add_argument("--response-cache", action="store_true", help="keep the draft response cache on")
+    parser.add_argument("--local-index", action="store_true", help="serve the tenant from the local vector index")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="results JSON of an earlier run to compare against")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_e2e_")
+    # Read by app.core.config on import, so set before importing the app
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ["EMBEDDING_CACHE_PATH"] = f"{workdir}/embedding_cache.db"
+    os.environ["WARMUP_ON_STARTUP"] = "false"
+    os.environ.setdefault("INTERNAL_API_TOKEN", "benchmark")
+    os.environ["RESPONSE_CACHE_ENABLED"] = str(args.response_cache).lower()
+    os.environ["LOCAL_INDEX_ENABLED"] = str(args.local_index).lower()
+    os.environ["LOCAL_INDEX_PATH"] = f"{workdir}/vector_index"
+
+    mailbox = build_mailbox_for(args)
+    mailbox.latency = args.gmail_latency
+    gmail_server, gmail_url = start_fake_gmail(mailbox=mailbox, latency=args.gmail_latency)
+    llm_server, llm_url = start_fake_llm(token_delay=args.llm_token_delay)
+    os.environ["GMAIL_API_BASE_URL"] = gmail_url
+    os.environ["GOOGLE_TOKEN_URI"] = f"{gmail_url}/token"
+    os.environ["GROQ_BASE_URL"] = llm_url
+
+    import chromadb
+    from app.services import gmail_service, rag_service
+    gmail_service.get_gmail_service = lambda user: mailbox
+    rag_service.chroma_client = chromadb.PersistentClient(path=f"{workdir}/chroma_db")
+    if args.embedder == "hash":
+        rag_service.ML_AVAILABLE = True
+        rag_service.embedding_model = HashEmbedder()
+        rag_service.tokenizer = WordTokenizer()
+    elif not rag_service.ML_AVAILABLE:
+        sys.exit(f"--embedder real needs chromadb and the {rag_service.settings.EMBEDDING_BACKEND} backend installed")
+
+    try:
+        results = asyncio.run(run(args, gmail_server, llm_server))
+    finally:
+        gmail_server.shutdown()
+        llm_server.shutdown()
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": vars(args),
+        "results": results,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"Comparing {report['commit']} against {baseline.get('commit')}")
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Embedding backends on CPU: cold start, RSS, bulk throughput and single-query
+latency, plus vector consistency against the first backend listed. Each
+backend runs in its own process so its RSS and import cost are its own.
+
+    python -m benchmarks.bench_embedding_backends --texts 512 --batch-size 64
+    python -m benchmarks.bench_embedding_backends --backends onnx onnx-int8 --model-path /models/all-MiniLM-L6-v2
+
+With --min-cosine, exits non-zero if any backend's mean cosine similarity to
+the reference falls below it (e.g. before switching a deployment to int8
+without re-indexing).
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.email_corpus import build_corpus
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_backend(args, vectors_path):
+    import numpy as np
+    from app.services import embedding_backends, rag_service
+
+    texts = build_corpus(args.texts, seed=args.seed)
+    baseline = rss_mb()
+    started = time.perf_counter()
+    backend = embedding_backends.load_backend(
+        args.backend, rag_service.EMBEDDING_MODEL_NAME, model_path=args.model_path, threads=args.threads
+    )
+    backend.encode(["warmup"])
+    load_seconds = time.perf_counter() - started
+    loaded_rss = rss_mb()
+
+    started = time.perf_counter()
+    vectors = backend.encode(texts, batch_size=args.batch_size)
+    bulk_seconds = time.perf_counter() - started
+
+    latencies = []
+    for text in texts[:args.queries]:
+        t = time.perf_counter()
+        backend.encode([text])
+        latencies.append(time.perf_counter() - t)
+    latencies.sort()
+
+    np.save(vectors_path, np.asarray(vectors, dtype=np.float32))
+    return {
+        "backend": args.backend,
+        "load_seconds": round(load_seconds, 2),
+        "rss_loaded_mb": round(loaded_rss - baseline, 1),
+        "rss_peak_mb": round(rss_mb() - baseline, 1),
+        "texts_per_sec": round(len(texts) / bulk_seconds, 1),
+        "query_p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "query_p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=["sentence-transformers", "onnx", "onnx-int8"],
+                        help="the first one is the consistency reference")
+    parser.add_argument("--texts", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=100, help="single-text encodes timed")
+    parser.add_argument("--threads", type=int, default=0, help="ONNX Runtime intra-op threads")
+    parser.add_argument("--model-path", help="local model directory instead of the Hugging Face Hub")
+    parser.add_argument("--min-cosine", type=float, help="fail if a backend's mean cosine is below this")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", help=argparse.SUPPRESS)  # run one backend in this process
+    parser.add_argument("--vectors", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.backend:
+        print(json.dumps(run_backend(args, args.vectors)))
+        return
+
+    import numpy as np
+    from app.services import embedding_backends
+
+    workdir = tempfile.mkdtemp(prefix="bench_embed_")
+    reports = []
+    for name in args.backends:
+        if not embedding_backends.backend_available(name):
+            print(f"{name:>22}: skipped, packages {embedding_backends.REQUIRED_PACKAGES.get(name)} not installed")
+            continue
+        vectors_path = os.path.join(workdir, f"{name}.npy")
+        command = [sys.executable, "-m", "benchmarks.bench_embedding_backends", "--backend", name,
+                   "--vectors", vectors_path, "--texts", str(args.texts), "--batch-size", str(args.batch_size),
+                   "--queries", str(args.queries), "--threads", str(args.threads), "--seed", str(args.seed)]
+        if args.model_path:
+            command += ["--model-path", args.model_path]
+        process = subprocess.run(command, capture_output=True, text=True)
+        if process.returncode:
+            print(f"{name:>22}: failed\n{process.stderr.strip()[-2000:]}")
+            continue
+        report = json.loads(process.stdout.strip().splitlines()[-1])
+        report["vectors"] = np.load(vectors_path)
+        reports.append(report)
+
+    failed = False
+    for report in reports:
+        consistency = embedding_backends.compare_vectors(reports[0]["vectors"], report["vectors"])
+        print(f"{report['backend']:>22}: load {report['load_seconds']:6.2f}s  rss +{report['rss_loaded_mb']:7.1f} MB "
+              f"(peak +{report['rss_peak_mb']:7.1f})  {report['texts_per_sec']:8.1f} texts/s  "
+              f"query p50 {report['query_p50_ms']:6.2f} ms p95 {report['query_p95_ms']:6.2f} ms")
+        if report is not reports[0]:
+            print(f"{'':>22}  vs {reports[0]['backend']}: mean cosine {consistency['mean_cosine']:.5f}  "
+                  f"min {consistency['min_cosine']:.5f}  top-1 neighbour agreement "
+                  f"{consistency.get('top1_agreement', 1.0):.2%}")
+            if args.min_cosine is not None and consistency["mean_cosine"] < args.min_cosine:
+                failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Sequential get_email_details vs. batched get_email_details_batch against the
+fake Gmail transport.
+
+    python -m benchmarks.bench_gmail_batch --messages 50 --latency 0.2
+"""
+import argparse
+import time
+
+from app.services import gmail_service
+from benchmarks.fake_gmail import build_mailbox
+
+
+def run_sequential(service, ids):
+    return [gmail_service.get_email_details(service, msg_id) for msg_id in ids]
+
+
+def run_batched(service, ids):
+    return gmail_service.get_email_details_batch(service, ids)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per HTTP round trip")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="per-item failure probability in batches")
+    args = parser.parse_args()
+
+    gmail_service.BATCH_RETRY_BACKOFF = 0.0
+    for name, fn in (("sequential", run_sequential), ("batched", run_batched)):
+        service = build_mailbox(args.messages, latency=args.latency, fail_rate=args.fail_rate)
+        listed = gmail_service.list_emails(service, label_ids=["SENT"], max_results=args.messages)
+        ids = [m["id"] for m in listed]
+
+        start = time.perf_counter()
+        fetched = fn(service, ids)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>10}: {len(fetched)}/{len(ids)} messages in {elapsed:.2f}s "
+              f"({service.round_trips} round trips incl. list)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Dashboard inbox page against the local Gmail mock: format='full' (the previous
+path) vs. format='metadata', and a repeat request served from the page cache
+(only the historyId check reaches Gmail). Bodies come from the email corpus;
+the metadata and cached timings include the historyId (profile) call.
+
+    python -m benchmarks.bench_inbox --messages 200 --page-size 25 --latency 0.05
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from app.core.config import settings
+from app.models.user import User
+from app.services import gmail_async, inbox_service
+from benchmarks.email_corpus import build_corpus
+from benchmarks.fake_gmail import FakeMailbox, make_message
+from benchmarks.fake_gmail_server import start_fake_gmail
+
+
+def build_inbox(n):
+    mailbox = FakeMailbox()
+    for i, body in enumerate(build_corpus(n)):
+        mailbox.add_message(make_message(f"m{i:06d}", f"Question #{i}", "Customer <c@example.com>", body))
+    return mailbox
+
+
+async def run(args, server):
+    user = User(id=1, access_token="token", refresh_token="refresh")
+    rows = []
+
+    started = time.perf_counter()
+    listing = await gmail_async.list_messages(user, max_results=args.page_size)
+    full = await gmail_async.get_messages(user, [m["id"] for m in listing["messages"]])
+    rows.append(("full", time.perf_counter() - started, len(json.dumps(full))))
+
+    calls = server.requests_served
+    started = time.perf_counter()
+    page = await inbox_service.get_inbox_page(user, args.page_size)
+    elapsed = time.perf_counter() - started
+    assert not page["cached"]
+    uncached_calls = server.requests_served - calls
+    # Payload size only, outside the timed section
+    raw = await gmail_async.get_messages(user, [e["id"] for e in page["emails"]], format="metadata",
+                                         metadata_headers=inbox_service.INBOX_HEADERS)
+    rows.append(("metadata", elapsed, len(json.dumps(raw))))
+
+    calls = server.requests_served
+    started = time.perf_counter()
+    page = await inbox_service.get_inbox_page(user, args.page_size)
+    rows.append(("cached", time.perf_counter() - started, 0))
+    assert page["cached"]
+    cached_calls = server.requests_served - calls
+
+    # A new message moves the historyId and the next request rebuilds the page
+    server.mailbox.add_message(make_message("new", "New question", "c@example.com", "Hello"))
+    page = await inbox_service.get_inbox_page(user, args.page_size)
+    assert not page["cached"] and page["emails"][0]["id"] == "new"
+
+    for name, seconds, size in rows:
+        print(f"{name:>9}: {seconds * 1000:7.1f} ms  payload {size / 1024:8.1f} KiB")
+    print(f"Gmail calls per page: {uncached_calls} uncached (profile + list + gets), {cached_calls} cached")
+    await gmail_async.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=25)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per mock API call")
+    args = parser.parse_args()
+
+    server, base_url = start_fake_gmail(mailbox=build_inbox(args.messages), latency=args.latency)
+    settings.GMAIL_API_BASE_URL = base_url
+    try:
+        asyncio.run(run(args, server))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
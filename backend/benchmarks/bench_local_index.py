@@ -0,0 +1,134 @@
+"""
+Local vector index (memory-mapped float16, exact top-k) vs. per-user Chroma
+collections, for tenants of a given size. Goes through rag_service's routing,
+with random unit vectors (no embedding model needed); each store runs in its
+own process so RSS is comparable.
+
+    python -m benchmarks.bench_local_index --tenants 20 --chunks 2000 --queries 2000
+    python -m benchmarks.bench_local_index --chunks 10000 --cache-mb 0   # score from the float16 file
+
+Reports load time, RSS, disk, query latency (single query and --batch queries
+per call, as bulk drafting issues them) and Chroma's recall@k against the
+exact results.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_vector_layout import DIM, dir_mb, percentile, rss_mb
+
+
+def unit_vectors(rng, n):
+    import numpy as np
+    vectors = rng.standard_normal((n, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def run_store(args):
+    import numpy as np
+    from app.core.config import settings
+
+    path = tempfile.mkdtemp(prefix=f"bench_{args.store}_")
+    settings.LOCAL_INDEX_ENABLED = args.store == "local"
+    settings.LOCAL_INDEX_PATH = os.path.join(path, "vector_index")
+    settings.LOCAL_INDEX_CACHE_MB = args.cache_mb
+    settings.LOCAL_INDEX_MAX_CHUNKS = max(settings.LOCAL_INDEX_MAX_CHUNKS, args.chunks)
+    import chromadb
+    from app.services import rag_service
+    rag_service.chroma_client = chromadb.PersistentClient(path=os.path.join(path, "chroma_db"))
+    rag_service.ML_AVAILABLE = True
+    rng = np.random.default_rng(args.seed)
+
+    try:
+        baseline = rss_mb()
+        started = time.perf_counter()
+        corpora = {}
+        for user_id in range(1, args.tenants + 1):
+            vectors = unit_vectors(rng, args.chunks)
+            corpora[user_id] = vectors
+            for start in range(0, args.chunks, rag_service.UPSERT_BATCH_SIZE):
+                end = min(start + rag_service.UPSERT_BATCH_SIZE, args.chunks)
+                rag_service._upsert(
+                    user_id,
+                    ids=[f"email_m{i}_0" for i in range(start, end)],
+                    embeddings=vectors[start:end].tolist(),
+                    documents=[f"tenant {user_id} chunk {i}" for i in range(start, end)],
+                    metadatas=[{"source": "sent_email"}] * (end - start),
+                )
+        load_seconds = time.perf_counter() - started
+        loaded_rss = rss_mb()
+
+        queries = [(int(rng.integers(1, args.tenants + 1)), unit_vectors(rng, args.batch))
+                   for _ in range(args.queries)]
+        results = {}
+        for mode, batch in (("single", 1), ("batch", args.batch)):
+            # Warm every tenant first (collection handles, float32 matrices)
+            for user_id in corpora:
+                rag_service._query(user_id, queries[0][1][:1].tolist(), args.k)
+            latencies, hits = [], 0
+            for user_id, vectors in queries:
+                t = time.perf_counter()
+                result = rag_service._query(user_id, vectors[:batch].tolist(), args.k)
+                latencies.append(time.perf_counter() - t)
+                exact = np.argsort(-(vectors[:batch] @ corpora[user_id].T), axis=1)[:, :args.k]
+                for found, expected in zip(result["ids"], exact):
+                    hits += len({int(chunk_id.split("_")[1][1:]) for chunk_id in found} & set(expected.tolist()))
+            latencies.sort()
+            results[mode] = {
+                "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+                "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+                "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+                f"recall@{args.k}": round(hits / (len(queries) * batch * args.k), 4),
+            }
+        return {
+            "store": args.store,
+            "load_seconds": round(load_seconds, 2),
+            "rss_loaded_mb": round(loaded_rss - baseline, 1),
+            "rss_mb": round(rss_mb() - baseline, 1),
+            "disk_mb": round(dir_mb(path), 1),
+            "query": results,
+        }
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tenants", type=int, default=20)
+    parser.add_argument("--chunks", type=int, default=2000, help="per tenant")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=16, help="query vectors per call in the batch mode")
+    parser.add_argument("--k", type=int, default=3, help="results per query")
+    parser.add_argument("--cache-mb", type=int, default=256, help="LOCAL_INDEX_CACHE_MB (0 = score from the file)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--store", choices=("chroma", "local"), help="run one store in this process")
+    args = parser.parse_args()
+
+    if args.store:
+        print(json.dumps(run_store(args)))
+        return
+
+    for store in ("chroma", "local"):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_local_index", "--store", store,
+             "--tenants", str(args.tenants), "--chunks", str(args.chunks), "--queries", str(args.queries),
+             "--batch", str(args.batch), "--k", str(args.k), "--cache-mb", str(args.cache_mb),
+             "--seed", str(args.seed)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        report = json.loads(output.strip().splitlines()[-1])
+        print(f"{store:>7}: load {report['load_seconds']:6.2f}s  rss +{report['rss_loaded_mb']:7.1f} MB "
+              f"(+{report['rss_mb']:7.1f} after queries)  disk {report['disk_mb']:7.1f} MB")
+        for mode, q in report["query"].items():
+            recall = q[f"recall@{args.k}"]
+            print(f"         {mode:>6}: p50 {q['p50_ms']:7.3f} ms  p95 {q['p95_ms']:7.3f} ms  "
+                  f"p99 {q['p99_ms']:7.3f} ms  recall@{args.k} {recall:.4f}")
+
+
+if __name__ == "__main__":
+    main()
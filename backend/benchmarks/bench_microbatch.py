@@ -0,0 +1,62 @@
+"""
+Concurrent single-query encodes: one forward pass per request vs. the shared
+micro-batcher. Uses the real embedding model; the embedding cache is bypassed.
+
+    python -m benchmarks.bench_microbatch --threads 16 --queries 50
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services import rag_service
+from app.services.embedding_batcher import MicroBatcher
+
+
+def synthetic_queries(n, seed=0):
+    rng = random.Random(seed)
+    words = ("refund order shipping invoice account delay policy customer support "
+             "warehouse tracking payment return exchange warranty").split()
+    return [" ".join(rng.choice(words) for _ in range(rng.randint(20, 120))) for _ in range(n)]
+
+
+def run(encode_one, queries, threads):
+    latencies = []
+
+    def timed(query):
+        started = time.perf_counter()
+        encode_one(query)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(timed, queries))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--queries", type=int, default=50, help="per thread")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    model = rag_service.get_embedding_model()
+    model.encode(["warmup"])
+    queries = synthetic_queries(args.threads * args.queries)
+
+    elapsed, p50, p95 = run(lambda q: model.encode([q]).tolist(), queries, args.threads)
+    print(f"     direct: {len(queries) / elapsed:7.1f} queries/sec  p50 {p50 * 1000:6.1f} ms  p95 {p95 * 1000:6.1f} ms")
+
+    batcher = MicroBatcher(rag_service._model_encode, max_batch_size=args.max_batch, max_wait=args.max_wait_ms / 1000)
+    elapsed, p50, p95 = run(lambda q: batcher.submit([q]), queries, args.threads)
+    stats = batcher.stats()
+    print(f"micro-batch: {len(queries) / elapsed:7.1f} queries/sec  p50 {p50 * 1000:6.1f} ms  p95 {p95 * 1000:6.1f} ms"
+          f"  (mean batch {stats['mean_batch_size']}, max queue depth {stats['max_queue_depth']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Previous body extraction (top-level parts only, UTF-8 assumed; the inline sync
+loop and gmail_service.extract_email_body) vs. mime_service on format='full'
+and format='raw' responses, over a corpus of real-world MIME shapes. Times go
+from the API response bytes (JSON decoding included, since 'raw' avoids the
+expanded payload) to the body text. Fails if mime_service returns a body
+other than the expected one for any message.
+
+format='raw' carries attachments inline and goes through the pure-Python
+stdlib parser, so it is also timed on the messages without attachments.
+
+    python -m benchmarks.bench_mime --messages 5000
+"""
+import argparse
+import base64
+import json
+import sys
+import time
+from collections import Counter
+
+from app.services import mime_service
+from benchmarks.mime_corpus import ATTACHMENT_SHAPES, build_mime_corpus, to_gmail_message
+
+
+def legacy_sync_body(full_msg):
+    snippet = full_msg.get('snippet', '')
+    payload = full_msg['payload']
+    body_data = ""
+    if 'parts' in payload:
+        for part in payload['parts']:
+            if part['mimeType'] == 'text/plain':
+                body_data = part['body'].get('data', '')
+                break
+    else:
+        body_data = payload['body'].get('data', '')
+    if body_data:
+        try:
+            return base64.urlsafe_b64decode(body_data).decode('utf-8')
+        except Exception:
+            return snippet
+    return snippet
+
+
+def legacy_extract_email_body(message):
+    # Without the clean_email_body call on HTML, which is not extraction
+    payload = message.get('payload', {})
+    body_text = ""
+    if 'parts' in payload:
+        for part in payload['parts']:
+            mime_type = part.get('mimeType', '')
+            body_data = part.get('body', {}).get('data', '')
+            if mime_type == 'text/plain' and body_data:
+                try:
+                    body_text = base64.urlsafe_b64decode(body_data).decode('utf-8')
+                    break
+                except Exception:
+                    pass
+            elif mime_type == 'text/html' and body_data and not body_text:
+                try:
+                    body_text = base64.urlsafe_b64decode(body_data).decode('utf-8')
+                except Exception:
+                    pass
+    else:
+        body_data = payload.get('body', {}).get('data', '')
+        if body_data:
+            try:
+                body_text = base64.urlsafe_b64decode(body_data).decode('utf-8')
+            except Exception:
+                pass
+    return body_text or message.get('snippet', '')
+
+
+def run(name, extract, responses, corpus):
+    started = time.perf_counter()
+    bodies = [extract(json.loads(response)) for response in responses]
+    seconds = time.perf_counter() - started
+    correct = Counter()
+    for item, body in zip(corpus, bodies):
+        if body.replace("\r\n", "\n").strip() == item["text"]:
+            correct[item["shape"]] += 1
+    megabytes = sum(len(response) for response in responses) / (1024 * 1024)
+    print(f"{name:>36}: {len(responses) / seconds:9.0f} msg/s  {megabytes / seconds:7.1f} MB/s  "
+          f"({megabytes:6.1f} MB)  correct body {sum(correct.values()) / len(corpus):7.2%}")
+    return correct
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = build_mime_corpus(args.messages, seed=args.seed)
+    responses = {
+        format: [json.dumps(to_gmail_message(item["id"], item["message"], item["snippet"], format=format))
+                 for item in corpus]
+        for format in ("full", "raw")
+    }
+    shapes = Counter(item["shape"] for item in corpus)
+    print(f"{len(corpus)} messages: " + ", ".join(f"{shape} {count}" for shape, count in sorted(shapes.items())))
+
+    run("legacy sync loop (full)", legacy_sync_body, responses["full"], corpus)
+    run("legacy extract_email_body (full)", legacy_extract_email_body, responses["full"], corpus)
+    results = {
+        "full": run("mime_service (full)", mime_service.extract_body, responses["full"], corpus),
+        "raw": run("mime_service (raw)", mime_service.extract_body, responses["raw"], corpus),
+    }
+
+    inline = [i for i, item in enumerate(corpus) if item["shape"] not in ATTACHMENT_SHAPES]
+    for format in ("full", "raw"):
+        run(f"mime_service ({format}, no attachments)", mime_service.extract_body,
+            [responses[format][i] for i in inline], [corpus[i] for i in inline])
+
+    failed = False
+    for format, correct in results.items():
+        for shape, count in sorted(shapes.items()):
+            if correct[shape] != count:
+                print(f"  {format}: {shape}: {count - correct[shape]} of {count} bodies differ from the expected text")
+                failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
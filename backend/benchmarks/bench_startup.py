@@ -0,0 +1,94 @@
+"""
+Cold-start benchmark: import time of the app module, time until uvicorn
+answers the health check, and how long POST /warmup takes afterwards.
+Each measurement runs in a fresh interpreter.
+
+    python -m benchmarks.bench_startup --runs 3
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _env():
+    env = dict(os.environ)
+    for key in ("SECRET_KEY", "GROQ_API_KEY", "GOOGLE_CLIENT_ID", "GOOGLE_CLIENT_SECRET", "INTERNAL_API_TOKEN"):
+        env.setdefault(key, "benchmark")
+    return env
+
+
+def measure_import():
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=_env(),
+                         capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_request(timeout=120.0, warmup=False):
+    port = _free_port()
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1).read()
+                break
+            except OSError:
+                if time.perf_counter() - started > timeout or proc.poll() is not None:
+                    raise RuntimeError("server did not come up")
+                time.sleep(0.02)
+        first_request = time.perf_counter() - started
+
+        warmup_seconds = None
+        if warmup:
+            t = time.perf_counter()
+            request = urllib.request.Request(
+                f"http://127.0.0.1:{port}/warmup", method="POST",
+                headers={"Authorization": f"Bearer {_env()['INTERNAL_API_TOKEN']}"}
+            )
+            urllib.request.urlopen(request, timeout=timeout).read()
+            warmup_seconds = time.perf_counter() - t
+        return first_request, warmup_seconds
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--warmup", action="store_true", help="also time POST /warmup")
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    firsts, warmups = [], []
+    for _ in range(args.runs):
+        first, warm = measure_first_request(warmup=args.warmup)
+        firsts.append(first)
+        if warm is not None:
+            warmups.append(warm)
+
+    print(f"import main:           median {statistics.median(imports):.3f}s  (runs: {', '.join(f'{x:.3f}' for x in imports)})")
+    print(f"time to first request: median {statistics.median(firsts):.3f}s  (runs: {', '.join(f'{x:.3f}' for x in firsts)})")
+    if warmups:
+        print(f"POST /warmup:          median {statistics.median(warmups):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
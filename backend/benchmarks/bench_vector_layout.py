@@ -0,0 +1,131 @@
+"""
+Per-user collections vs. shared sharded collections at many tenants.
+Uses a persistent Chroma client in a temp directory and random 384-d vectors
+(no embedding model needed). Each layout runs in its own process so RSS is comparable.
+
+    python -m benchmarks.bench_vector_layout --tenants 1000 --chunks 20 --queries 2000
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+DIM = 384
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def dir_mb(path):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names) / (1024 * 1024)
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+def run_layout(layout, tenants, chunks, queries, shards, seed=0):
+    import chromadb
+    from app.core.config import settings
+    from app.services import rag_service
+
+    settings.VECTOR_STORE_LAYOUT = layout
+    settings.VECTOR_STORE_SHARDS = shards
+    path = tempfile.mkdtemp(prefix=f"chroma_{layout}_")
+    rag_service.chroma_client = chromadb.PersistentClient(path=path)
+    rng = random.Random(seed)
+
+    def vector():
+        return [rng.uniform(-1, 1) for _ in range(DIM)]
+
+    try:
+        baseline = rss_mb()
+        started = time.perf_counter()
+        for user_id in range(1, tenants + 1):
+            collection = rag_service._cached_collection(rag_service.collection_name(user_id))
+            collection.upsert(
+                ids=rag_service._tenant_ids(user_id, [f"email_m{i}_0" for i in range(chunks)]),
+                embeddings=[vector() for _ in range(chunks)],
+                documents=[f"tenant {user_id} chunk {i}" for i in range(chunks)],
+                metadatas=[rag_service._tenant_metadata(user_id, {"source": "sent_email"}) for _ in range(chunks)],
+            )
+        load_seconds = time.perf_counter() - started
+
+        def query(user_id, cached):
+            name = rag_service.collection_name(user_id)
+            if cached:
+                collection = rag_service._cached_collection(name)
+            else:
+                collection = rag_service.get_chroma_client().get_or_create_collection(name=name)
+            return collection.query(query_embeddings=[vector()], n_results=3,
+                                    where=rag_service._tenant_filter(user_id))
+
+        results = {}
+        for cached in (False, True):
+            latencies = []
+            for _ in range(queries):
+                user_id = rng.randint(1, tenants)
+                t = time.perf_counter()
+                result = query(user_id, cached)
+                latencies.append(time.perf_counter() - t)
+                assert all(doc.startswith(f"tenant {user_id} ") for doc in result["documents"][0])
+            latencies.sort()
+            results["cached_handles" if cached else "get_or_create"] = {
+                "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            }
+        return {
+            "layout": layout,
+            "collections": len(rag_service._list_collection_names(rag_service.get_chroma_client())),
+            "load_seconds": round(load_seconds, 2),
+            "rss_mb": round(rss_mb() - baseline, 1),
+            "disk_mb": round(dir_mb(path), 1),
+            "query": results,
+        }
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tenants", type=int, default=1000)
+    parser.add_argument("--chunks", type=int, default=20, help="per tenant")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--shards", type=int, default=16)
+    parser.add_argument("--layout", choices=("per_user", "shared"), help="run one layout in this process")
+    args = parser.parse_args()
+
+    if args.layout:
+        print(json.dumps(run_layout(args.layout, args.tenants, args.chunks, args.queries, args.shards)))
+        return
+
+    for layout in ("per_user", "shared"):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_vector_layout", "--layout", layout,
+             "--tenants", str(args.tenants), "--chunks", str(args.chunks),
+             "--queries", str(args.queries), "--shards", str(args.shards)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        report = json.loads(output.strip().splitlines()[-1])
+        query = report["query"]
+        print(f"{layout:>9}: {report['collections']:5d} collections  load {report['load_seconds']:6.2f}s  "
+              f"rss +{report['rss_mb']:7.1f} MB  disk {report['disk_mb']:7.1f} MB")
+        for mode, q in query.items():
+            print(f"           {mode:>15}: p50 {q['p50_ms']:6.2f} ms  p95 {q['p95_ms']:6.2f} ms  p99 {q['p99_ms']:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
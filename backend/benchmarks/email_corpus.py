@@ -0,0 +1,72 @@
+"""
+Synthetic but realistic email bodies for cleaning benchmarks: plain-text
+replies with quoted history, Gmail and Outlook style HTML, entities,
+forwarded headers and signatures.
+"""
+import random
+
+_SENTENCES = [
+    "Thanks for getting back to me so quickly.",
+    "I have attached the invoice for last month's order.",
+    "Could you confirm whether the refund has been processed?",
+    "Our warehouse shipped the replacement on Tuesday.",
+    "Please allow 5-7 business days for the credit to appear.",
+    "Let me know if you need anything else from our side.",
+    "The tracking number is 1Z999AA10123456784.",
+    "We apologise for the inconvenience caused by the delay.",
+]
+
+
+def _paragraphs(rng, n):
+    return [" ".join(rng.sample(_SENTENCES, rng.randint(2, 4))) for _ in range(n)]
+
+
+def plain_reply(rng):
+    body = "\n\n".join(_paragraphs(rng, rng.randint(1, 4)))
+    quoted = "\n".join("> " + line for line in _paragraphs(rng, 3))
+    return (f"Hi Sam,\n\n{body}\n\nBest regards,\nAlex\n\n"
+            f"On Mon, 3 Jun 2024 at 10:15, Sam Customer <sam@example.com> wrote:\n{quoted}\n")
+
+
+def plain_forward(rng):
+    body = "\n\n".join(_paragraphs(rng, 2))
+    return (f"FYI, see below.\n\n{body}\n\n---------- Forwarded message ---------\n"
+            f"From: Billing <billing@example.com>\nDate: Tue, 4 Jun 2024\nSubject: Invoice\n\n"
+            + "\n".join(_paragraphs(rng, 2)))
+
+
+def plain_short(rng):
+    return rng.choice(_SENTENCES) + "\n\nCheers,\nAlex"
+
+
+def plain_with_ampersand(rng):
+    return "Hi team,\n\n" + " ".join(_paragraphs(rng, 1)) + "\n\nQ&A session moved to 3pm. Terms & conditions apply.\n"
+
+
+def gmail_html(rng):
+    paras = "".join(f"<div>{p}</div><div><br></div>" for p in _paragraphs(rng, rng.randint(1, 4)))
+    quote = "".join(f"<div>{p}</div>" for p in _paragraphs(rng, 3))
+    return (f'<div dir="ltr">{paras}<div>Best,<br>Alex</div></div><br>'
+            f'<div class="gmail_quote"><div dir="ltr" class="gmail_attr">On Mon, Jun 3, 2024 at 10:15 AM '
+            f'Sam &lt;<a href="mailto:sam@example.com">sam@example.com</a>&gt; wrote:<br></div>'
+            f'<blockquote class="gmail_quote" style="margin:0px 0px 0px 0.8ex">{quote}</blockquote></div>')
+
+
+def outlook_html(rng):
+    paras = "".join(f'<p class="MsoNormal">{p}<o:p></o:p></p>' for p in _paragraphs(rng, rng.randint(2, 5)))
+    return ('<html xmlns:o="urn:schemas-microsoft-com:office:office"><head>'
+            '<meta http-equiv="Content-Type" content="text/html; charset=utf-8">'
+            '<style><!-- p.MsoNormal {margin:0cm; font-size:11.0pt;} --></style></head>'
+            f'<body lang="EN-GB"><div class="WordSection1">{paras}'
+            '<p class="MsoNormal">Kind regards,<br>Alex&nbsp;Smith<br>Support &amp; Operations</p>'
+            '<div style="border:none;border-top:solid #E1E1E1 1.0pt"><p class="MsoNormal">'
+            '<b>From:</b> Sam &lt;sam@example.com&gt;<br><b>Sent:</b> 03 June 2024 10:15</p></div>'
+            f'{paras}</div></body></html>')
+
+
+GENERATORS = [plain_reply, plain_forward, plain_short, plain_with_ampersand, gmail_html, outlook_html]
+
+
+def build_corpus(n, seed=0):
+    rng = random.Random(seed)
+    return [rng.choice(GENERATORS)(rng) for _ in range(n)]
@@ -0,0 +1,274 @@
+"""
+Offline stand-in for the googleapiclient Gmail service.
+
+Mimics the small slice of the `build('gmail', 'v1')` resource API that
+gmail_service uses (users().messages().list/get, users().drafts().create,
+users().history().list, users().getProfile, new_batch_http_request) and sleeps `latency` seconds per simulated HTTP
+round trip, so batched vs. sequential fetching can be compared without
+network access or credentials.
+"""
+import base64
+import random
+import threading
+import time
+
+
+class FakeHttpError(Exception):
+    def __init__(self, status, reason=""):
+        super().__init__(f"HTTP {status}: {reason}")
+        self.status = status
+        self.reason = reason
+
+
+def _b64(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode("utf-8")).decode("ascii")
+
+
+def make_message(msg_id: str, subject: str, sender: str, body: str, label_ids=None,
+                 thread_id: str = None) -> dict:
+    """
+    Builds a Gmail API message resource (format='full') with a
+    multipart/alternative payload, like most real mail clients send.
+    """
+    return {
+        "id": msg_id,
+        "threadId": thread_id or f"t{msg_id}",
+        "labelIds": label_ids or ["INBOX"],
+        "snippet": body[:100],
+        "payload": {
+            "mimeType": "multipart/alternative",
+            "headers": [
+                {"name": "Subject", "value": subject},
+                {"name": "From", "value": sender},
+                {"name": "To", "value": "me@example.com"},
+            ],
+            "body": {"size": 0},
+            "parts": [
+                {
+                    "partId": "0",
+                    "mimeType": "text/plain",
+                    "headers": [{"name": "Content-Type", "value": "text/plain; charset=UTF-8"}],
+                    "body": {"size": len(body), "data": _b64(body)},
+                },
+                {
+                    "partId": "1",
+                    "mimeType": "text/html",
+                    "headers": [{"name": "Content-Type", "value": "text/html; charset=UTF-8"}],
+                    "body": {"size": len(body), "data": _b64(f"<div>{body}</div>")},
+                },
+            ],
+        },
+    }
+
+
+class _Request:
+    def __init__(self, mailbox, fn):
+        self._mailbox = mailbox
+        self._fn = fn
+
+    def execute(self):
+        self._mailbox.round_trip()
+        return self._fn()
+
+
+class _BatchRequest:
+    def __init__(self, mailbox, callback):
+        self._mailbox = mailbox
+        self._callback = callback
+        self._requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        if len(self._requests) >= FakeMailbox.BATCH_LIMIT:
+            raise ValueError(f"Batch can hold at most {FakeMailbox.BATCH_LIMIT} requests")
+        request_id = request_id or str(len(self._requests))
+        self._requests.append((request_id, request, callback or self._callback))
+
+    def execute(self):
+        # One round trip for the whole batch; items fail independently
+        self._mailbox.round_trip()
+        for request_id, request, callback in self._requests:
+            try:
+                self._mailbox.maybe_fail()
+                response, exception = request._fn(), None
+            except Exception as e:
+                response, exception = None, e
+            if callback:
+                callback(request_id, response, exception)
+
+
+class _Messages:
+    def __init__(self, mailbox):
+        self._mailbox = mailbox
+
+    def list(self, userId="me", labelIds=None, maxResults=100, pageToken=None, **kwargs):
+        return _Request(self._mailbox, lambda: self._mailbox.list_messages(labelIds, maxResults, pageToken))
+
+    def get(self, userId="me", id=None, format="full", **kwargs):
+        return _Request(self._mailbox, lambda: self._mailbox.get_message(id, format, **kwargs))
+
+
+class _Drafts:
+    def __init__(self, mailbox):
+        self._mailbox = mailbox
+
+    def create(self, userId="me", body=None):
+        return _Request(self._mailbox, lambda: self._mailbox.create_draft(body))
+
+
+class _History:
+    def __init__(self, mailbox):
+        self._mailbox = mailbox
+
+    def list(self, userId="me", startHistoryId=None, labelId=None, historyTypes=None, pageToken=None,
+             maxResults=100, **kwargs):
+        return _Request(self._mailbox, lambda: self._mailbox.list_history(
+            startHistoryId, labelId, pageToken, maxResults))
+
+
+class _Users:
+    def __init__(self, mailbox):
+        self._mailbox = mailbox
+
+    def messages(self):
+        return _Messages(self._mailbox)
+
+    def drafts(self):
+        return _Drafts(self._mailbox)
+
+    def history(self):
+        return _History(self._mailbox)
+
+    def getProfile(self, userId="me"):
+        return _Request(self._mailbox, lambda: {
+            "emailAddress": "me@example.com",
+            "messagesTotal": len(self._mailbox.messages),
+            "historyId": str(self._mailbox.history_id),
+        })
+
+
+class FakeMailbox:
+    """
+    In-memory mailbox that also acts as the fake Gmail service object.
+    latency: seconds slept per HTTP round trip (single call or whole batch).
+    fail_rate: probability that an individual batched item returns a 429.
+    """
+    BATCH_LIMIT = 100
+
+    def __init__(self, latency: float = 0.0, fail_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.messages = {}
+        self.order = []  # newest first, like Gmail's list
+        self.drafts = []
+        self.history = []  # (history_id, message_id)
+        self.history_id = 1000
+        self.history_floor = 0  # history.list below this id returns 404
+        self.round_trips = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    # -- service API --------------------------------------------------------
+    def users(self):
+        return _Users(self)
+
+    def new_batch_http_request(self, callback=None):
+        return _BatchRequest(self, callback)
+
+    # -- helpers ------------------------------------------------------------
+    def round_trip(self):
+        with self._lock:
+            self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def maybe_fail(self):
+        if self.fail_rate and self._rng.random() < self.fail_rate:
+            raise FakeHttpError(429, "rateLimitExceeded")
+
+    def add_message(self, message: dict):
+        self.messages[message["id"]] = message
+        self.order.insert(0, message["id"])
+        self.history_id += 1
+        self.history.append((self.history_id, message["id"]))
+        return message
+
+    def expire_history(self):
+        """Simulates Gmail dropping old history records (cursor expiry)."""
+        self.history_floor = self.history_id
+
+    def list_history(self, start_history_id, label_id, page_token=None, max_results=100):
+        start_history_id = int(start_history_id)
+        if start_history_id < self.history_floor:
+            raise FakeHttpError(404, "notFound")
+        records = [
+            {"id": str(hid), "messagesAdded": [{"message": {
+                "id": msg_id,
+                "threadId": self.messages[msg_id]["threadId"],
+                "labelIds": self.messages[msg_id]["labelIds"],
+            }}]}
+            for hid, msg_id in self.history
+            if hid > start_history_id and (not label_id or label_id in self.messages[msg_id]["labelIds"])
+        ]
+        start = int(page_token or 0)
+        result = {"history": records[start:start + max_results], "historyId": str(self.history_id)}
+        if start + max_results < len(records):
+            result["nextPageToken"] = str(start + max_results)
+        return result
+
+    def list_messages(self, label_ids, max_results, page_token=None):
+        ids = [m for m in self.order
+               if not label_ids or set(label_ids) <= set(self.messages[m]["labelIds"])]
+        start = int(page_token or 0)
+        page = ids[start:start + max_results]
+        result = {
+            "messages": [{"id": m, "threadId": self.messages[m]["threadId"]} for m in page],
+            "resultSizeEstimate": len(ids),
+        }
+        if start + max_results < len(ids):
+            result["nextPageToken"] = str(start + max_results)
+        return result
+
+    def get_message(self, msg_id, format="full", metadataHeaders=None, **kwargs):
+        if msg_id not in self.messages:
+            raise FakeHttpError(404, "notFound")
+        message = self.messages[msg_id]
+        if format in ("metadata", "minimal"):
+            # Like Gmail: no body parts; metadata keeps the requested headers only
+            trimmed = {key: value for key, value in message.items() if key != "payload"}
+            if format == "metadata":
+                wanted = {name.lower() for name in metadataHeaders or []}
+                headers = [h for h in message["payload"]["headers"] if not wanted or h["name"].lower() in wanted]
+                trimmed["payload"] = {"mimeType": message["payload"]["mimeType"], "headers": headers}
+            return trimmed
+        return message
+
+    def create_draft(self, body):
+        draft = {"id": f"r{len(self.drafts)}", "message": body.get("message", {})}
+        self.drafts.append(draft)
+        return draft
+
+
+def build_mailbox(n_messages: int, label: str = "SENT", latency: float = 0.0,
+                  fail_rate: float = 0.0, seed: int = 0) -> FakeMailbox:
+    """
+    Returns a FakeMailbox pre-populated with `n_messages` synthetic emails.
+    """
+    rng = random.Random(seed)
+    topics = ["refund", "shipping delay", "invoice", "password reset", "order status", "cancellation"]
+    mailbox = FakeMailbox(latency=latency, fail_rate=fail_rate, seed=seed)
+    for i in range(n_messages):
+        topic = rng.choice(topics)
+        body = (
+            f"Hi there,\n\nThanks for reaching out about your {topic}. "
+            f"We have looked into ticket #{1000 + i} and everything is on track. "
+            "Please let us know if there is anything else we can help with.\n\n"
+            "Best regards,\nSupport Team"
+        )
+        mailbox.add_message(make_message(
+            msg_id=f"m{i:06d}",
+            subject=f"Re: {topic} #{1000 + i}",
+            sender="Customer <customer@example.com>",
+            body=body,
+            label_ids=[label],
+        ))
+    return mailbox
@@ -0,0 +1,196 @@
+"""
+Local HTTP mock of the Gmail REST API (and Google's token endpoint), backed by
+FakeMailbox. Point the async Gmail client at it with
+
+    GMAIL_API_BASE_URL=http://127.0.0.1:8098 GOOGLE_TOKEN_URI=http://127.0.0.1:8098/token uvicorn main:app
+
+    python -m benchmarks.fake_gmail_server --port 8098 --messages 500 --latency 0.05 --quota-rps 20
+
+Serves users/me/messages (list, get), users/me/drafts (create), users/me/profile
+and users/me/history. Rate limiting is per bearer token: a token bucket of
+`quota_rps` calls per second answers 429 rateLimitExceeded when empty, and
+`fail_rate` adds random 429s. Tokens listed in `expired_tokens` get a 401 until
+refreshed through POST /token.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.fake_gmail import FakeHttpError, build_mailbox
+
+API_PREFIX = "/gmail/v1/users/me/"
+
+
+class _TokenBucket:
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class FakeGmailHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    # -- plumbing -----------------------------------------------------------
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, reason, message="", headers=None):
+        self._send_json(status, {"error": {
+            "code": status,
+            "message": message or reason,
+            "errors": [{"reason": reason, "message": message or reason}],
+        }}, headers)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    def _admit(self) -> bool:
+        """Latency, auth and rate limiting shared by every API call."""
+        server = self.server
+        with server.lock:
+            server.requests_served += 1
+        if server.latency:
+            time.sleep(server.latency)
+        token = self.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not token or token in server.expired_tokens:
+            self._send_error(401, "authError", "Invalid Credentials")
+            return False
+        with server.lock:
+            bucket = server.buckets.setdefault(token, _TokenBucket(server.quota_rps)) if server.quota_rps else None
+            limited = (bucket is not None and not bucket.take()) or \
+                (server.fail_rate and server.rng.random() < server.fail_rate)
+            if limited:
+                server.rate_limited += 1
+        if limited:
+            self._send_error(429, "rateLimitExceeded", "User-rate limit exceeded",
+                             {"Retry-After": str(server.retry_after)} if server.retry_after else None)
+            return False
+        return True
+
+    # -- routes -------------------------------------------------------------
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path == "/token":
+            form = parse_qs(self._read_body().decode())
+            if form.get("grant_type") != ["refresh_token"] or not form.get("refresh_token"):
+                self._send_error(400, "invalid_grant")
+                return
+            self._send_json(200, {"access_token": f"fresh-{uuid.uuid4().hex[:12]}",
+                                  "expires_in": 3599, "token_type": "Bearer"})
+            return
+        body = self._read_body()
+        if not self._admit():
+            return
+        if url.path == API_PREFIX + "drafts":
+            self._send_json(200, self.server.mailbox.create_draft(json.loads(body or b"{}")))
+            return
+        self._send_error(404, "notFound")
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if not url.path.startswith(API_PREFIX):
+            self._send_error(404, "notFound")
+            return
+        if not self._admit():
+            return
+        mailbox = self.server.mailbox
+        query = parse_qs(url.query)
+        path = url.path[len(API_PREFIX):]
+        try:
+            if path == "messages":
+                payload = mailbox.list_messages(
+                    query.get("labelIds"), int(query.get("maxResults", ["100"])[0]),
+                    query.get("pageToken", [None])[0])
+            elif path.startswith("messages/"):
+                payload = mailbox.get_message(
+                    path[len("messages/"):], query.get("format", ["full"])[0],
+                    metadataHeaders=query.get("metadataHeaders"))
+            elif path == "profile":
+                payload = {"emailAddress": "me@example.com", "messagesTotal": len(mailbox.messages),
+                           "historyId": str(mailbox.history_id)}
+            elif path == "history":
+                payload = mailbox.list_history(
+                    query.get("startHistoryId", ["0"])[0], query.get("labelId", [None])[0],
+                    query.get("pageToken", [None])[0], int(query.get("maxResults", ["100"])[0]))
+            else:
+                self._send_error(404, "notFound")
+                return
+        except FakeHttpError as e:
+            self._send_error(e.status, e.reason)
+            return
+        self._send_json(200, payload)
+
+
+def start_fake_gmail(port: int = 0, mailbox=None, messages: int = 100, label: str = "INBOX",
+                     latency: float = 0.0, quota_rps: float = 0.0, fail_rate: float = 0.0,
+                     retry_after: float = None, expired_tokens=(), seed: int = 0):
+    """
+    Starts the mock in a daemon thread. Returns (server, base_url); the mailbox is
+    server.mailbox, counters are server.requests_served and server.rate_limited.
+    Call server.shutdown() to stop it.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeGmailHandler)
+    server.daemon_threads = True
+    server.mailbox = mailbox or build_mailbox(messages, label=label, seed=seed)
+    server.latency = latency
+    server.quota_rps = quota_rps
+    server.fail_rate = fail_rate
+    server.retry_after = retry_after
+    server.expired_tokens = set(expired_tokens)
+    server.buckets = {}
+    server.rng = random.Random(seed)
+    server.lock = threading.Lock()
+    server.requests_served = 0
+    server.rate_limited = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8098)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--label", default="INBOX")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--quota-rps", type=float, default=0.0, help="per-token calls/sec, 0 = unlimited")
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    server, base_url = start_fake_gmail(args.port, messages=args.messages, label=args.label,
+                                        latency=args.latency, quota_rps=args.quota_rps,
+                                        fail_rate=args.fail_rate)
+    print(f"Fake Gmail listening on {base_url} "
+          f"(set GMAIL_API_BASE_URL={base_url} GOOGLE_TOKEN_URI={base_url}/token)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Local fake of Groq's OpenAI-compatible chat completions API.
+
+Serves POST /openai/v1/chat/completions, both regular and `stream: true`
+(server-sent events), with a configurable per-token delay. Point the app at it with
+
+    GROQ_BASE_URL=http://127.0.0.1:8099 uvicorn main:app
+
+    python -m benchmarks.fake_llm --port 8099 --token-delay 0.02
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = (
+    "Thank you for reaching out. We have reviewed your request and, in line with "
+    "our policy, our team will follow up with the details shortly. Please let us "
+    "know if there is anything else we can help with."
+)
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    reply = DEFAULT_REPLY
+    token_delay = 0.0
+    first_token_delay = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        self.server.requests_served += 1
+
+        prompt_tokens = sum(len(m.get("content", "").split()) for m in request.get("messages", []))
+        tokens = [word + " " for word in self.reply.split()]
+        model = request.get("model", "fake-model")
+        created = int(time.time())
+
+        if request.get("stream"):
+            self._stream(tokens, model, created)
+            return
+
+        time.sleep(self.first_token_delay + self.token_delay * len(tokens))
+        body = json.dumps({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens).strip()},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(tokens),
+                "total_tokens": prompt_tokens + len(tokens),
+            },
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, tokens, model, created):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        time.sleep(self.first_token_delay)
+        for i, token in enumerate(tokens):
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"role": "assistant", "content": token} if i == 0 else {"content": token},
+                    "finish_reason": None,
+                }],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+            time.sleep(self.token_delay)
+        final = {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        }
+        self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode())
+        self.wfile.flush()
+
+
+def start_fake_llm(port: int = 0, token_delay: float = 0.0, first_token_delay: float = 0.0,
+                   reply: str = DEFAULT_REPLY):
+    """
+    Starts the fake server in a daemon thread. Returns (server, base_url);
+    call server.shutdown() to stop it.
+    """
+    handler = type("ConfiguredFakeLLMHandler", (FakeLLMHandler,), {
+        "token_delay": token_delay,
+        "first_token_delay": first_token_delay,
+        "reply": reply,
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    server.requests_served = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--first-token-delay", type=float, default=0.2)
+    args = parser.parse_args()
+    server, base_url = start_fake_llm(args.port, args.token_delay, args.first_token_delay)
+    print(f"Fake LLM listening on {base_url} (set GROQ_BASE_URL={base_url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
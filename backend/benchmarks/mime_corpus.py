@@ -0,0 +1,159 @@
+"""
+Gmail messages in the MIME shapes real mail clients send, built with the stdlib
+email package and rendered as API resources for format='full' (JSON-expanded
+payload, attachments by id) and format='raw' (the whole RFC 2822 message).
+Each message records the body text an extractor should return.
+
+Shapes: plain text, Gmail multipart/alternative, alternative + attachment,
+Outlook mixed/related/alternative with an inline image, HTML-only
+notifications, Latin-1 and windows-1252 bodies, CJK/Cyrillic charsets, and a
+forward attached as message/rfc822.
+"""
+import base64
+import html
+import random
+from email.mime.application import MIMEApplication
+from email.mime.image import MIMEImage
+from email.mime.message import MIMEMessage
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from benchmarks.email_corpus import build_corpus
+
+_LATIN = ["Merci pour votre réponse rapide.", "La facture est jointe à ce message.",
+          "Nous espérons vous revoir bientôt, à très vite !", "Gruß aus München, schöne Grüße."]
+_SMART = ["We’ve shipped your order — it’s on its way.", "“Thanks,” she said, “that’s perfect.”",
+          "Price: €42 … including VAT."]
+_CJK = {
+    "shift_jis": ["ご連絡ありがとうございます。", "請求書を添付いたします。", "よろしくお願いいたします。"],
+    "gb2312": ["感谢您的来信。", "发票已附上，请查收。", "祝好！"],
+    "koi8-r": ["Спасибо за ваше письмо.", "Счёт во вложении.", "С уважением, Алекс."],
+}
+ATTACHMENT_SHAPES = ("alternative_attachment", "outlook_related", "forward_attached")
+
+
+def _html(text: str) -> str:
+    paragraphs = "".join(f"<p>{html.escape(p)}</p>" for p in text.split("\n\n"))
+    return f'<html><head><meta charset="utf-8"></head><body><div dir="ltr">{paragraphs}</div></body></html>'
+
+
+def _attachment(rng, filename: str, size: int):
+    part = MIMEApplication(rng.randbytes(size), Name=filename)
+    part["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return part
+
+
+def _alternative(text: str, charset: str = "utf-8"):
+    alternative = MIMEMultipart("alternative")
+    alternative.attach(MIMEText(text, "plain", charset))
+    alternative.attach(MIMEText(_html(text), "html", charset))
+    return alternative
+
+
+def _shape(rng, body: str):
+    """
+    One message of a randomly drawn shape: (shape, MIME message, expected mime type, expected text).
+    """
+    shape = rng.choices(
+        ["plain", "alternative", "alternative_attachment", "outlook_related", "html_only",
+         "latin1", "windows1252", "cjk", "forward_attached"],
+        weights=[15, 30, 15, 10, 10, 5, 5, 5, 5]
+    )[0]
+    if shape == "plain":
+        return shape, MIMEText(body, "plain", "utf-8"), "text/plain", body
+    if shape == "alternative":
+        return shape, _alternative(body), "text/plain", body
+    if shape == "alternative_attachment":
+        message = MIMEMultipart("mixed")
+        message.attach(_alternative(body))
+        message.attach(_attachment(rng, "invoice.pdf", rng.randint(20_000, 200_000)))
+        return shape, message, "text/plain", body
+    if shape == "outlook_related":
+        related = MIMEMultipart("related")
+        related.attach(_alternative(body))
+        image = MIMEImage(rng.randbytes(rng.randint(2_000, 20_000)), "png")
+        image["Content-ID"] = "<image001.png@01D9>"
+        image["Content-Disposition"] = 'inline; filename="image001.png"'
+        related.attach(image)
+        message = MIMEMultipart("mixed")
+        message.attach(related)
+        message.attach(_attachment(rng, "report.docx", rng.randint(20_000, 100_000)))
+        return shape, message, "text/plain", body
+    if shape == "html_only":
+        markup = _html(body)
+        return shape, MIMEText(markup, "html", "utf-8"), "text/html", markup
+    if shape == "latin1":
+        text = "\n\n".join(rng.sample(_LATIN, 3))
+        return shape, MIMEText(text, "plain", "iso-8859-1"), "text/plain", text
+    if shape == "windows1252":
+        text = "\n\n".join(rng.sample(_SMART, 2))
+        return shape, _alternative(text, "windows-1252"), "text/plain", text
+    if shape == "cjk":
+        charset = rng.choice(sorted(_CJK))
+        text = "\n".join(_CJK[charset])
+        return shape, MIMEText(text, "plain", charset), "text/plain", text
+    # forward_attached: short note, the original attached as message/rfc822
+    note = "FYI, forwarding the thread below."
+    message = MIMEMultipart("mixed")
+    message.attach(MIMEText(note, "plain", "utf-8"))
+    message.attach(MIMEMessage(_alternative(body)))
+    return shape, message, "text/plain", note
+
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode("ascii")
+
+
+def _payload(message, part_id: str = "") -> dict:
+    # Mirrors the Gmail API's format='full' payload: headers per part, nested
+    # `parts`, inline bodies as base64url data, attachments by attachmentId
+    filename = message.get_filename() or ""
+    resource = {
+        "partId": part_id,
+        "mimeType": message.get_content_type(),
+        "filename": filename,
+        "headers": [{"name": name, "value": str(value)} for name, value in message.items()],
+    }
+    if message.is_multipart():
+        resource["body"] = {"size": 0}
+        resource["parts"] = [_payload(child, f"{part_id}.{i}" if part_id else str(i))
+                             for i, child in enumerate(message.get_payload())]
+        return resource
+    data = message.get_payload(decode=True) or b""
+    if filename:
+        resource["body"] = {"attachmentId": f"att{abs(hash((part_id, len(data))))}", "size": len(data)}
+    else:
+        resource["body"] = {"size": len(data), "data": _b64url(data)}
+    return resource
+
+
+def to_gmail_message(msg_id: str, message, snippet: str, format: str = "full", label_ids=None) -> dict:
+    """
+    Gmail API message resource for a stdlib MIME message, in format 'full' or 'raw'.
+    """
+    resource = {"id": msg_id, "threadId": f"t{msg_id}", "labelIds": label_ids or ["INBOX"], "snippet": snippet,
+                "sizeEstimate": len(message.as_bytes())}
+    if format == "raw":
+        resource["raw"] = _b64url(message.as_bytes())
+    else:
+        resource["payload"] = _payload(message)
+    return resource
+
+
+def build_mime_corpus(n: int, seed: int = 0) -> list[dict]:
+    """
+    n messages of mixed shapes: dicts with id, shape, message (the MIME object),
+    snippet, and the expected body mime_type and text.
+    """
+    rng = random.Random(seed)
+    bodies = [body for body in build_corpus(n * 2, seed=seed) if "<" not in body][:n]
+    corpus = []
+    for i in range(n):
+        body = bodies[i % len(bodies)].replace("\r\n", "\n").strip()
+        shape, message, mime_type, text = _shape(rng, body)
+        message["Subject"] = f"Message {i}"
+        message["From"] = "Customer <customer@example.com>"
+        message["To"] = "me@example.com"
+        corpus.append({"id": f"m{i:06d}", "shape": shape, "message": message, "snippet": body[:100],
+                       "mime_type": mime_type, "text": text})
+    return corpus
@@ -1,12 +1,40 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from app.api import deps
+from app.core import metrics
+from app.core.config import settings
 from app.core.database import engine, Base
-from app.models import user # Import models to register them
+from app.models import user, sync_state, job # Import models to register them
 import os
+import threading
+import time
 
-Base.metadata.create_all(bind=engine)
+def warmup() -> dict:
+    """
+    Initializes the lazily created heavy components (embedding model, Chroma, Groq).
+    """
+    from app.services import rag_service, llm_service
+    started = time.perf_counter()
+    timings = rag_service.warmup()
+    llm_service.warmup()
+    timings["total"] = round(time.perf_counter() - started, 3)
+    return timings
 
-app = FastAPI(title="AutoGmail SaaS API", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs once the server starts, not at import time
+    Base.metadata.create_all(bind=engine)
+    from app.services import job_service
+    job_service.mark_interrupted_jobs()
+    if settings.WARMUP_ON_STARTUP:
+        threading.Thread(target=warmup, name="warmup", daemon=True).start()
+    yield
+    from app.services import gmail_async
+    await gmail_async.aclose()
+
+app = FastAPI(title="AutoGmail SaaS API", version="0.1.0", lifespan=lifespan)
 
 # CORS Setup
 # Allow origins from environment variable or use defaults
@@ -25,14 +53,54 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Inbox pagination cursor and cache validator, opt-in per-stage timings
+    expose_headers=["X-Next-Page-Token", "ETag", "Server-Timing"],
 )
+# Outermost, so request latency includes CORS handling
+app.add_middleware(metrics.MetricsMiddleware)
 
 @app.get("/")
 def health_check():
     return {"status": "ok", "message": "AutoGmail API is running"}
 
-from app.api import auth, gmail, documents, generate
+# Operational endpoints: INTERNAL_API_TOKEN only, see deps.require_internal_token
+internal = [Depends(deps.require_internal_token)]
+
+@app.post("/warmup", dependencies=internal)
+async def warmup_endpoint():
+    """
+    Loads the heavy components now; call before routing traffic to a new instance.
+    """
+    return {"status": "warm", "seconds": await run_in_threadpool(warmup)}
+
+@app.get("/stats", dependencies=internal)
+def runtime_stats():
+    """
+    Counters of the in-process embedding cache, embedding micro-batcher, local vector index, context packer,
+    draft response cache, async Gmail client and job runner.
+    """
+    from app.services import rag_service, context_service, response_cache, gmail_async, job_service
+    return {
+        "embedding_cache": rag_service.embedding_cache_stats(),
+        "embedding_batcher": rag_service.embedding_batcher_stats(),
+        "vector_store": rag_service.vector_store_stats(),
+        "context": context_service.context_stats(),
+        "response_cache": response_cache.cache_stats(),
+        "gmail": gmail_async.client_stats(),
+        "jobs": job_service.runner_stats(),
+    }
+
+@app.get("/metrics", dependencies=internal)
+def prometheus_metrics():
+    """
+    Request and stage latency histograms, Gmail API calls, LLM tokens and
+    embedding batch sizes in the Prometheus text format.
+    """
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+from app.api import auth, gmail, documents, generate, jobs
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["auth"])
 app.include_router(gmail.router, prefix="/api/v1/gmail", tags=["gmail"])
 app.include_router(documents.router, prefix="/api/v1/documents", tags=["documents"])
 app.include_router(generate.router, prefix="/api/v1/generate", tags=["generate"])
+app.include_router(jobs.router, prefix="/api/v1/jobs", tags=["jobs"])
@@ -0,0 +1,6 @@
+"""
+Maintenance commands. Run from the backend directory, e.g.
+
+    python -m scripts.migrate_vector_store
+    python -m scripts.move_local_indexes
+"""
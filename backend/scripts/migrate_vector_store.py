@@ -0,0 +1,32 @@
+"""
+Moves per-user Chroma collections (user_<id>_docs) into the shared, sharded
+layout. Run it before switching VECTOR_STORE_LAYOUT to "shared":
+
+    python -m scripts.migrate_vector_store                  # copy, keep the old collections
+    python -m scripts.migrate_vector_store --delete-source  # copy, then delete them
+"""
+import argparse
+import time
+
+from app.core.config import settings
+from app.services import rag_service
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--delete-source", action="store_true",
+                        help="delete each per-user collection after it has been copied")
+    parser.add_argument("--page-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"Migrating per-user collections into {settings.VECTOR_STORE_SHARDS} shared shards")
+    started = time.perf_counter()
+    stats = rag_service.migrate_to_shared_layout(delete_source=args.delete_source, page_size=args.page_size)
+    print(f"Copied {stats['chunks']} chunks from {stats['collections']} collections "
+          f"({stats['deleted']} deleted) in {time.perf_counter() - started:.1f}s")
+    if settings.VECTOR_STORE_LAYOUT != "shared":
+        print('Set VECTOR_STORE_LAYOUT="shared" to serve from the new layout.')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""
+Copies every tenant's local vector index (LOCAL_INDEX_PATH) into Chroma.
+Run it before turning LOCAL_INDEX_ENABLED off, or the chunks of tenants
+still on the local index stop being searched:
+
+    python -m scripts.move_local_indexes
+"""
+import time
+
+from app.core.config import settings
+from app.services import rag_service
+
+
+def main():
+    print(f"Moving local vector indexes in {settings.LOCAL_INDEX_PATH} to Chroma")
+    started = time.perf_counter()
+    stats = rag_service.move_local_indexes_to_chroma()
+    print(f"Moved {stats['chunks']} chunks of {stats['tenants']} tenants in {time.perf_counter() - started:.1f}s")
+    if settings.LOCAL_INDEX_ENABLED:
+        print("Set LOCAL_INDEX_ENABLED=false to keep new chunks in Chroma.")
+
+
+if __name__ == "__main__":
+    main()
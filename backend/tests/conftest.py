@@ -0,0 +1,26 @@
+"""
+Settings are read at import time, so the required ones (dummy values) and a
+throwaway SQLite database are set before any app module is imported.
+"""
+import os
+import tempfile
+
+for _key in ("SECRET_KEY", "GROQ_API_KEY", "GOOGLE_CLIENT_ID", "GOOGLE_CLIENT_SECRET"):
+    os.environ.setdefault(_key, "test")
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='autogmail_test_')}/test.db"
+os.environ["WARMUP_ON_STARTUP"] = "false"
+
+import pytest
+
+from app.core.database import Base, SessionLocal, engine
+from app.models import job, sync_state, user  # noqa: F401  register the tables
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
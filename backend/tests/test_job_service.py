@@ -0,0 +1,47 @@
+import threading
+import time
+
+from app.models.job import Job
+from app.services import job_service
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_cancel_after_job_completed(db):
+    job = job_service.submit(db, user_id=1, kind="test", fn=lambda ctx: {"ok": True})
+    assert job.status == "queued"  # the caller's copy, loaded before the job ran
+
+    wait_until(lambda: job.id not in job_service._running)
+    cancelled = job_service.cancel(db, job)
+
+    assert cancelled.status == "succeeded"
+    assert cancelled.result == {"ok": True}
+    assert not cancelled.cancel_requested
+    assert job.id not in job_service._cancel_requested
+
+
+def test_cancel_running_job(db):
+    started, release = threading.Event(), threading.Event()
+
+    def run(ctx):
+        started.set()
+        release.wait(5)
+        ctx.check_cancelled()
+        return {}
+
+    job = job_service.submit(db, user_id=2, kind="test", fn=run)
+    assert started.wait(5)
+    cancelled = job_service.cancel(db, job)
+    assert cancelled.cancel_requested
+    assert job.id in job_service._cancel_requested
+
+    release.set()
+    wait_until(lambda: job.id not in job_service._running)
+    db.expire_all()
+    assert db.get(Job, job.id).status == "cancelled"
+    assert job.id not in job_service._cancel_requested
@@ -0,0 +1,22 @@
+import pytest
+
+from app.models.sync_state import IndexedMessage
+from app.services import sync_service
+
+
+def stored_ids(db, user_id):
+    return sorted(row.message_id for row in db.query(IndexedMessage.message_id).filter(IndexedMessage.user_id == user_id))
+
+
+@pytest.mark.parametrize("dialect_insert", [True, False], ids=["insert-or-ignore", "portable"])
+def test_mark_indexed_skips_stored_ids(db, monkeypatch, dialect_insert):
+    user_id = 10 if dialect_insert else 11
+    if not dialect_insert:
+        monkeypatch.setattr(sync_service, "_INSERTS", {})  # as on a database without ON CONFLICT support
+
+    sync_service._mark_indexed(db, user_id, ["a", "b"])
+    db.commit()
+    sync_service._mark_indexed(db, user_id, ["b", "c", "c"])
+    db.commit()
+
+    assert stored_ids(db, user_id) == ["a", "b", "c"]